@@ -0,0 +1,31 @@
+from typing import Dict
+import numpy as np
+import utils.aq_exposures as aq_exps
+from utils.igraphs import Edge as E
+
+class AqColumns:
+    """An instance of AqColumns holds a complete set of the AQI and AQ cost columns of the edges (e.g. aqi, aqc_5,
+    baqc_5) from a single AQI update. The columns are read-only (the given arrays are made read-only, not copied), so 
+    that a set of columns can be shared by any number of routing requests: an AQI update publishes a new instance 
+    instead of modifying the current one. A routing request pins the current instance at the start of the request and
+    uses it throughout, so that all of its paths and exposures are based on the same AQI data.
+
+    Attributes:
+        generation: A number that is incremented by every published set of AQ columns (0 = no AQI data).
+        aqi_data: The name of the AQI data file from which the columns were calculated.
+        arrays: The AQI and AQ cost columns by edge attribute (aligned to edge ids).
+        aqi_classes: The AQI classes of the edges (0 = missing AQI), derived from the AQI column once per AQI update.
+    """
+
+    def __init__(self, generation: int, arrays: Dict[str, np.ndarray], aqi_data: str = ''):
+        self.generation = generation
+        self.aqi_data = aqi_data
+        self.arrays: Dict[str, np.ndarray] = {}
+        for attr, values in arrays.items():
+            values = np.asarray(values, dtype=np.float64)
+            values.setflags(write=False)
+            self.arrays[attr] = values
+        self.aqi_classes: np.ndarray = None
+        if E.aqi.value in self.arrays:
+            self.aqi_classes = aq_exps.get_aqi_classes(self.arrays[E.aqi.value])
+            self.aqi_classes.setflags(write=False)
@@ -0,0 +1,171 @@
+from typing import List, Dict, Tuple, Iterator, Optional
+import traceback
+import time
+import numpy as np
+from shapely.geometry import Point
+import utils.geometry as geom_utils
+import utils.routing as routing_utils
+from app.path_finder import PathFinder, exposure_attrs, get_path_names
+from app.graph_handler import GraphHandler
+from app.graph_overlay import GraphOverlay
+from app.constants import TravelMode, RoutingMode
+from app.logger import Logger
+
+class BatchPathFinder:
+    """An instance of BatchPathFinder finds green paths for a batch of origin-destination (OD) pairs of the same travel
+    and routing mode. The coordinates of all OD pairs are projected at once and the OD pairs are grouped by origin, so
+    that each origin is snapped (and linked) to the graph only once: the OD pairs of an origin share a graph overlay,
+    in which each destination gets its own node and linking edges. If an origin has at least min_shared_search_dests
+    destinations, the paths to all of them are found with a single search per edge weight from the origin (instead of
+    separate searches for each OD pair). All OD pairs of the batch use the same (pinned) AQ columns.
+
+    The results are either the paths of the OD pairs as GeoJSON (find_paths) or only the lengths and exposures of 
+    the paths as a matrix (get_exposure_matrix), e.g. from one origin to many destinations for accessibility analysis.
+
+    Attributes:
+        od_pairs: The OD pairs as lists of [orig_lat, orig_lon, dest_lat, dest_lon].
+        edges: A boolean variable indicating whether the edge FeatureCollections should be included in the results.
+        min_shared_search_dests: The minimum number of destinations of an origin for searching their paths at once.
+    """
+
+    def __init__(self,
+        logger: Logger,
+        travel_mode: TravelMode,
+        routing_mode: RoutingMode,
+        G: GraphHandler,
+        od_pairs: List[List[float]],
+        edges: bool = False,
+        min_shared_search_dests: int = 5
+    ):
+        self.log = logger
+        self.travel_mode = travel_mode
+        self.routing_mode = routing_mode
+        self.G = G
+        self.od_pairs = [[float(coord) for coord in od_pair] for od_pair in od_pairs]
+        if (not all(len(od_pair) == 4 for od_pair in self.od_pairs)):
+            raise ValueError('OD pairs should be given as [orig_lat, orig_lon, dest_lat, dest_lon]')
+        self.edges = edges
+        self.min_shared_search_dests = min_shared_search_dests
+        self.aq_columns = G.get_aq_columns()
+
+    def __get_od_groups(self) -> Dict[Tuple[float, float, bool], List[int]]:
+        """Returns the indexes of the OD pairs grouped by origin (and by whether the OD pair is long distance,
+        which affects snapping the origin to the graph).
+        """
+        od_coords = np.array(self.od_pairs, dtype=np.float64).reshape(-1, 4)
+        orig_xy = geom_utils.project_lat_lons(od_coords[:, 0], od_coords[:, 1])
+        dest_xy = geom_utils.project_lat_lons(od_coords[:, 2], od_coords[:, 3])
+        self.orig_points = [Point(xy) for xy in orig_xy.tolist()]
+        self.dest_points = [Point(xy) for xy in dest_xy.tolist()]
+        long_distance = np.hypot(*(orig_xy - dest_xy).T) > 5000
+        od_groups: Dict[Tuple[float, float, bool], List[int]] = {}
+        for idx, (orig_x, orig_y) in enumerate(orig_xy.tolist()):
+            od_groups.setdefault((orig_x, orig_y, bool(long_distance[idx])), []).append(idx)
+        return od_groups
+
+    def find_paths(self) -> Iterator[dict]:
+        """Finds the paths for all OD pairs and yields the results one OD pair at a time (grouped by origin, i.e. not
+        necessarily in the order of the OD pairs). Each result contains the index of the OD pair (id) and either the
+        path (and edge) FeatureCollections or an error message.
+        """
+        for od_idx, path_finder, error in self.__find_least_cost_paths():
+            if error:
+                yield { 'id': od_idx, 'error': error }
+                continue
+            try:
+                FCs = path_finder.process_paths_to_FC(edges=self.edges)
+                if self.edges:
+                    yield { 'id': od_idx, 'path_FC': FCs[0], 'edge_FC': FCs[1] }
+                else:
+                    yield { 'id': od_idx, 'path_FC': FCs }
+            except Exception as e:
+                yield { 'id': od_idx, 'error': str(e) }
+
+    def get_exposure_matrix(self) -> Tuple[List[str], np.ndarray, Dict[int, str]]:
+        """Finds the paths for all OD pairs and returns their lengths and exposures (exposure_attrs) without processing
+        the paths to GeoJSON.
+
+        Returns:
+            The names of the paths (e.g. short, q_0.1...), the exposures as an array (OD pairs x paths x exposure_attrs, 
+            NaN if missing) and error messages by the index of the OD pair.
+        """
+        path_names = get_path_names(self.routing_mode)
+        values = np.full((len(self.od_pairs), len(path_names), len(exposure_attrs)), np.nan, dtype=np.float64)
+        errors: Dict[int, str] = {}
+        for od_idx, path_finder, error in self.__find_least_cost_paths():
+            if error:
+                errors[od_idx] = error
+                continue
+            values[od_idx] = np.array(path_finder.get_path_exposures(), dtype=np.float64)
+        return path_names, values, errors
+
+    def __find_least_cost_paths(self) -> Iterator[Tuple[int, Optional[PathFinder], Optional[str]]]:
+        """Finds the least cost paths for all OD pairs and yields a PathFinder (with the paths) or an error message 
+        with the index of each OD pair.
+        """
+        start_time = time.time()
+        od_groups = self.__get_od_groups()
+        self.log.info(f'routing batch of {len(self.od_pairs)} OD pairs from {len(od_groups)} origins')
+        for (_, _, long_distance), od_idxs in od_groups.items():
+            yield from self.__find_least_cost_paths_from_origin(od_idxs, long_distance)
+        self.log.duration(start_time, f'routed batch of {len(self.od_pairs)} OD pairs', unit='ms', log_level='info')
+
+    def __find_least_cost_paths_from_origin(self, od_idxs: List[int], long_distance: bool) -> Iterator[Tuple[int, Optional[PathFinder], Optional[str]]]:
+        overlay = GraphOverlay(self.G.vcount, self.G.ecount, self.aq_columns)
+        path_finders: Dict[int, PathFinder] = {}
+        for od_idx in od_idxs:
+            # the OD points are projected at once (see __get_od_groups)
+            path_finders[od_idx] = PathFinder(
+                self.log, self.travel_mode, self.routing_mode, self.G, *self.od_pairs[od_idx], graph_overlay=overlay, 
+                orig_point=self.orig_points[od_idx], dest_point=self.dest_points[od_idx])
+        any_path_finder = path_finders[od_idxs[0]]
+        aq_sens, noise_sens = any_path_finder.aq_sens, any_path_finder.noise_sens
+        try:
+            orig_node, orig_link_edges = routing_utils.get_orig_node_and_linking_edges(
+                self.log, self.G, overlay, self.orig_points[od_idxs[0]], aq_sens, noise_sens, self.G.db_costs, long_distance=long_distance)
+        except Exception as e:
+            for od_idx in od_idxs:
+                yield od_idx, None, str(e)
+            return
+
+        for od_idx in list(od_idxs):
+            try:
+                dest_node, dest_link_edges = routing_utils.get_dest_node_and_linking_edges(
+                    self.log, self.G, overlay, self.dest_points[od_idx], orig_link_edges, aq_sens, noise_sens, self.G.db_costs, long_distance=long_distance)
+                path_finders[od_idx].set_origin_dest_nodes(orig_node, dest_node, orig_link_edges, dest_link_edges)
+            except Exception as e:
+                del path_finders[od_idx]
+                yield od_idx, None, str(e)
+
+        shared_paths = self.__get_shared_paths(orig_node['node'], path_finders, overlay)
+        for od_idx, path_finder in path_finders.items():
+            try:
+                path_finder.find_least_cost_paths(shared_paths.get(od_idx))
+            except Exception as e:
+                yield od_idx, None, str(e)
+                continue
+            yield od_idx, path_finder, None
+
+    def __get_shared_paths(self, orig_node: int, path_finders: Dict[int, PathFinder], overlay: GraphOverlay) -> Dict[int, List[List[int]]]:
+        """Returns the paths of the OD pairs (by index) from a single search per edge weight from the origin, if the origin
+        has enough destinations. OD pairs of which the paths are not returned are routed separately.
+        """
+        dest_nodes = {
+            od_idx: path_finder.dest_node['node'] for od_idx, path_finder in path_finders.items()
+            if path_finder.dest_node['node'] != orig_node
+        }
+        if (len(set(dest_nodes.values())) < self.min_shared_search_dests):
+            return {}
+        start_time = time.time()
+        try:
+            paths_by_weight = self.G.get_least_cost_paths_to_many(
+                orig_node, list(set(dest_nodes.values())), next(iter(path_finders.values())).get_path_weights(), overlay=overlay)
+        except Exception:
+            self.log.error('exception in finding least cost paths to many destinations:')
+            self.log.error(traceback.format_exc())
+            return {}
+        self.log.duration(start_time, f'found paths to {len(dest_nodes)} destinations', unit='ms', log_level='info')
+        return {
+            od_idx: [paths[dest_node] for paths in paths_by_weight]
+            for od_idx, dest_node in dest_nodes.items() if all(dest_node in paths for paths in paths_by_weight)
+        }
@@ -12,3 +12,8 @@ class PathType(Enum):
     SHORT = 'short'
     CLEAN = RoutingMode.CLEAN.value
     QUIET = RoutingMode.QUIET.value
+
+class PathsFormat(Enum):
+    GEOJSON = 'geojson'
+    POLYLINE = 'polyline'
+    BINARY = 'binary'
@@ -0,0 +1,84 @@
+import os
+import select
+import struct
+import ctypes
+import ctypes.util
+from typing import List
+from app.logger import Logger
+
+# inotify constants (see inotify(7))
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+inotify_event_header = struct.Struct('iIII')
+
+class FileWatcher:
+    """An instance of FileWatcher waits for new files in a directory. On Linux, the directory is watched with inotify
+    (via ctypes, no extra dependencies), in which case wait() returns as soon as a file is written (closed) to or moved
+    to the directory. If inotify is not available (e.g. on other platforms or if the directory does not exist yet),
+    wait() simply sleeps for the timeout, i.e. the caller falls back to polling the directory.
+
+    Attributes:
+        directory: The path of the watched directory.
+        inotify_fd: The file descriptor of the inotify instance (None if falling back to polling).
+    """
+
+    def __init__(self, logger: Logger, directory: str, use_inotify: bool = True):
+        self.log = logger
+        self.directory = directory
+        self.inotify_fd = None
+        if (use_inotify):
+            try:
+                self.inotify_fd = self.__init_inotify(directory)
+            except Exception as e:
+                self.log.warning(f'could not watch directory {directory} with inotify ({e}), falling back to polling')
+
+    def __init_inotify(self, directory: str) -> int:
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if (fd < 0):
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        if (libc.inotify_add_watch(fd, os.fsencode(directory), IN_CLOSE_WRITE | IN_MOVED_TO) < 0):
+            errno = ctypes.get_errno()
+            os.close(fd)
+            raise OSError(errno, 'inotify_add_watch failed')
+        return fd
+
+    def is_event_driven(self) -> bool:
+        return self.inotify_fd is not None
+
+    def wait(self, timeout: float) -> List[str]:
+        """Waits until new files are written or moved to the directory or until timeout (s) has passed.
+
+        Returns:
+            The names of the new files (an empty list if timeout passed or when polling).
+        """
+        if (self.inotify_fd is None):
+            select.select([], [], [], max(timeout, 0.0))
+            return []
+        readable, _, _ = select.select([self.inotify_fd], [], [], max(timeout, 0.0))
+        if (not readable):
+            return []
+        return self.__read_events()
+
+    def __read_events(self) -> List[str]:
+        try:
+            buffer = os.read(self.inotify_fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        file_names = []
+        offset = 0
+        while offset + inotify_event_header.size <= len(buffer):
+            _, _, _, name_len = inotify_event_header.unpack_from(buffer, offset)
+            offset += inotify_event_header.size
+            name = buffer[offset:offset + name_len].rstrip(b'\0')
+            offset += name_len
+            if name:
+                file_names.append(os.fsdecode(name))
+        return file_names
+
+    def close(self):
+        if (self.inotify_fd is not None):
+            os.close(self.inotify_fd)
+            self.inotify_fd = None
@@ -1,59 +1,146 @@
 import time
-import ast
 import gc
 import random
+import threading
 import traceback
-import pandas as pd
-from shapely.geometry import LineString
+import numpy as np
 from os import listdir
-from datetime import datetime
-from apscheduler.schedulers.background import BackgroundScheduler
+from datetime import datetime, timedelta
+from app.file_watcher import FileWatcher
 from app.graph_handler import GraphHandler
+from app.route_cache import RouteCache
 import utils.aq_exposures as aq_exps
-import utils.igraphs as ig_utils
+import utils.aqi_updates as aqi_updates
+import utils.compiled_graphs as compiled_graphs
 from app.logger import Logger
-import utils.igraphs as ig_utils
 from utils.igraphs import Edge as E
 from typing import List, Set, Dict, Tuple, Optional
 
+class UpdateBackoff:
+    """UpdateBackoff keeps track of failed AQI updates so that a failing AQI data file is not retried right away but 
+    after an exponentially growing delay (base_delay, 2 * base_delay, ... max_delay). A successful update or new AQI 
+    data file resets the backoff.
+
+    Attributes:
+        failed_file: The name of the AQI data file of which the latest update failed (None if not backing off).
+        failures: The number of consecutive failed updates from failed_file.
+        retry_at: time.time() after which the update from failed_file may be retried.
+    """
+
+    def __init__(self, base_delay: float = 30.0, max_delay: float = 600.0):
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.failed_file: str = None
+        self.failures = 0
+        self.retry_at = 0.0
+
+    def record_failure(self, aqi_update_file: str, now: float = None) -> float:
+        """Records a failed update and returns the delay (s) before the next attempt.
+        """
+        now = time.time() if now is None else now
+        self.failures = self.failures + 1 if aqi_update_file == self.failed_file else 1
+        self.failed_file = aqi_update_file
+        delay = min(self.base_delay * 2 ** (self.failures - 1), self.max_delay)
+        self.retry_at = now + delay
+        return delay
+
+    def reset(self):
+        self.failed_file = None
+        self.failures = 0
+        self.retry_at = 0.0
+
+    def get_remaining_delay(self, now: float = None) -> float:
+        """Returns the number of seconds before the failed update may be retried (0 if not backing off).
+        """
+        if (self.failed_file is None):
+            return 0.0
+        now = time.time() if now is None else now
+        return max(self.retry_at - now, 0.0)
+
+    def allows_update(self, aqi_update_file: str, now: float = None) -> bool:
+        return aqi_update_file != self.failed_file or self.get_remaining_delay(now) == 0.0
+
 class GraphAqiUpdater:
-    """GraphAqiUpdater triggers an AQI to graph update if new AQI data is available in /aqi_cache.
+    """GraphAqiUpdater triggers an AQI to graph update if new AQI data is available in /aqi_cache. AQI data is read from
+    either a binary (.npy) or a CSV file (see utils/aqi_updates.py), the former being preferred if both exist.
 
     Attributes:
         graph_handler: A GraphHandler object via which aqi values can be updated to a graph.
+        lengths, lengths_b: Lengths and bike lengths (0 if missing) of the edges, from which the AQ costs are calculated.
         aqi_dir (str): A path to an aqi_cache -directory (e.g. 'aqi_cache/').
-        aqi_data_wip: The name of an aqi data csv file that is currently being updated to a graph.
-        aqi_data_latest: The name of the aqi data csv file that was last updated to a graph.
+        aqi_data_wip: The name of an aqi data file that is currently being updated to a graph.
+        aqi_data_latest: The name of the aqi data file that was last updated to a graph.
         aqi_data_updatetime: datetime.utcnow() of the latest aqi update.
-        scheduler: A BackgroundScheduler instance that will periodically check for new aqi data and
-            update it to a graph if available.
+        watcher: A FileWatcher of aqi_dir, which wakes up the updater thread as soon as a new AQI data file is written 
+            to aqi_dir (or after check_interval if aqi_dir cannot be watched for events).
+        backoff: An UpdateBackoff that delays the next attempt after a failed update.
+        fallback_interval: Max interval (s) of checking for new AQI data even if no file events are received.
+        route_cache: A RouteCache of routing responses to invalidate when new AQI data is published (optional).
     """
 
-    def __init__(self, logger: Logger, G: GraphHandler, aqi_dir: str = 'aqi_updates/'):
+    def __init__(self, logger: Logger, G: GraphHandler, aqi_dir: str = 'aqi_updates/', start: bool = True, route_cache: RouteCache = None):
         self.log = logger
         self.G = G
-        self.edge_df = self.create_updater_edge_df(G)
+        self.lengths = np.array(G.get_edge_array(E.length.value))
+        self.lengths_b = np.nan_to_num(G.get_edge_array(E.length_b.value))
         self.sens = aq_exps.get_aq_sensitivities()
         self.aqi_update_status = ''
         self.aqi_dir = aqi_dir
         self.aqi_data_wip = ''
         self.aqi_data_latest = ''
         self.aqi_data_updatetime = None
-        self.scheduler = BackgroundScheduler()
         self.check_interval = 5 + random.randint(1, 15)
-        self.scheduler.add_job(self.maybe_read_update_aqi_to_graph, 'interval', seconds=self.check_interval, max_instances=2)
-        self.start()
+        self.fallback_interval = 60
+        self.backoff = UpdateBackoff()
+        self.route_cache = route_cache
+        self.watcher: FileWatcher = None
+        self.__thread: threading.Thread = None
+        self.__stop_event = threading.Event()
+        if (start):
+            self.start()
         gc.collect()
 
-    def create_updater_edge_df(self, G: GraphHandler):
-        edge_df = ig_utils.get_edge_gdf(G.graph, attrs=[E.length, E.length_b])
-        edge_df[E.id_ig.name] = edge_df.index
-        edge_df = edge_df[[E.id_ig.name, E.length.name, E.length_b.name]]
-        return edge_df
-
     def start(self):
-        self.log.info('starting graph aqi updater with check interval (s): '+ str(self.check_interval))
-        self.scheduler.start()
+        self.watcher = FileWatcher(self.log, self.aqi_dir)
+        if (self.watcher.is_event_driven()):
+            self.log.info('starting graph aqi updater with file events from: '+ self.aqi_dir)
+        else:
+            self.log.info('starting graph aqi updater with check interval (s): '+ str(self.check_interval))
+        self.__stop_event.clear()
+        self.__thread = threading.Thread(target=self.__run, name='graph-aqi-updater', daemon=True)
+        self.__thread.start()
+
+    def stop(self):
+        """Signals the updater thread to stop. The thread exits (and closes the watcher) after its current wait for 
+        file events has ended.
+        """
+        self.__stop_event.set()
+
+    def __run(self):
+        while not self.__stop_event.is_set():
+            try:
+                self.maybe_read_update_aqi_to_graph()
+            except Exception:
+                self.log.error(traceback.format_exc())
+            new_files = self.watcher.wait(self.get_wait_timeout())
+            if new_files:
+                self.log.debug('new files in AQI dir: '+ ', '.join(new_files))
+        self.watcher.close()
+
+    def get_wait_timeout(self, now: datetime = None) -> float:
+        """Returns the max number of seconds to wait for file events before checking for new AQI data again. When 
+        backing off after a failed update, this is the remaining delay. With file events, the directory is still 
+        checked at the start of each hour (when the expected file name changes) and every fallback_interval seconds in
+        case an event is missed.
+        """
+        remaining_delay = self.backoff.get_remaining_delay()
+        if (remaining_delay > 0):
+            return remaining_delay
+        if (self.watcher is None or not self.watcher.is_event_driven()):
+            return self.check_interval
+        now = datetime.utcnow() if now is None else now
+        next_hour = now.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+        return min(self.fallback_interval, (next_hour - now).total_seconds() + 1)
 
     def get_aqi_update_status_response(self):
         return { 
@@ -66,25 +153,26 @@ class GraphAqiUpdater:
     def maybe_read_update_aqi_to_graph(self):
         """Triggers an AQI to graph update if new AQI data is available and not yet updated or being updated.
         """
-        new_aqi_data_csv = self.new_aqi_data_available()
-        if new_aqi_data_csv:
+        new_aqi_data_file = self.new_aqi_data_available()
+        if new_aqi_data_file and self.backoff.allows_update(new_aqi_data_file):
             try:
-                self.read_update_aqi_to_graph(new_aqi_data_csv)
+                self.read_update_aqi_to_graph(new_aqi_data_file)
+                self.backoff.reset()
             except Exception:
-                self.aqi_update_status = 'could not complete AQI update from: '+ new_aqi_data_csv
+                self.aqi_update_status = 'could not complete AQI update from: '+ new_aqi_data_file
                 self.log.error(self.aqi_update_status)
                 self.log.error(traceback.format_exc())
-                self.log.warning('waiting 60 s after exception before next AQI update attempt')
-                time.sleep(60)
+                delay = self.backoff.record_failure(new_aqi_data_file)
+                self.log.warning(f'waiting {int(delay)} s after exception before next AQI update attempt')
             finally:
                 gc.collect()
                 self.aqi_data_wip = ''
 
-    def get_expected_aqi_data_name(self) -> str:
-        """Returns the name of the expected latest aqi data csv file based on the current time, e.g. aqi_2019-11-11T17.csv.
+    def get_expected_aqi_data_name(self, extension: str = '.csv') -> str:
+        """Returns the name of the expected latest aqi data file based on the current time, e.g. aqi_2019-11-11T17.csv.
         """
         curdt = datetime.utcnow().strftime('%Y-%m-%dT%H')
-        return 'aqi_'+ curdt +'.csv'
+        return 'aqi_'+ curdt + extension
 
     def get_aqi_update_time_str(self) -> str:
         return self.aqi_data_updatetime.strftime('%y/%m/%d %H:%M:%S') if self.aqi_data_updatetime is not None else None
@@ -108,87 +196,83 @@ class GraphAqiUpdater:
             return False
 
     def new_aqi_data_available(self) -> str:
-        """Returns the name of a new AQI csv file if it's not yet updated or being updated to a graph and it exists in aqi_dir.
-        Else returns None.
+        """Returns the name of a new AQI data file (.npy or .csv) if it's not yet updated or being updated to a graph and 
+        it exists in aqi_dir. Else returns None.
         """
-        new_aqi_csv = None
+        new_aqi_file = None
         aqi_update_status = ''
 
-        aqi_data_expected = self.get_expected_aqi_data_name()
-        if (aqi_data_expected == self.aqi_data_latest):
+        aqi_data_expected = [self.get_expected_aqi_data_name(extension) for extension in aqi_updates.aqi_update_extensions]
+        if (self.aqi_data_latest in aqi_data_expected):
             aqi_update_status = 'latest AQI was updated to graph'
-        elif (aqi_data_expected == self.aqi_data_wip):
+        elif (self.aqi_data_wip in aqi_data_expected):
             aqi_update_status = 'AQI update already in progress'
-        elif (aqi_data_expected in listdir(self.aqi_dir)):
-            aqi_update_status = 'AQI update will be done from: '+ aqi_data_expected
-            new_aqi_csv = aqi_data_expected
         else:
-            aqi_update_status = 'expected AQI data is not available ('+ aqi_data_expected +')'
+            aqi_files = set(listdir(self.aqi_dir))
+            new_aqi_file = next((aqi_file for aqi_file in aqi_data_expected if aqi_file in aqi_files), None)
+            if new_aqi_file:
+                aqi_update_status = 'AQI update will be done from: '+ new_aqi_file
+            else:
+                aqi_update_status = 'expected AQI data is not available ('+ ' / '.join(aqi_data_expected) +')'
         
         if (aqi_update_status != self.aqi_update_status):
             self.log.info(aqi_update_status)
             self.aqi_update_status = aqi_update_status
-        return new_aqi_csv
+        return new_aqi_file
 
-    def get_aq_update_attrs(self, aqi: float, length: float, length_b: float):
-        aq_costs = aq_exps.get_aqi_costs(aqi, length, self.sens)
-        aq_costs_b = aq_exps.get_aqi_costs(aqi, length, self.sens, length_b=length_b, prefix='b')
-        return { 'aqi': aqi, **aq_costs, **aq_costs_b }
-
-    def get_missing_aq_update_attrs(self, length: float):
-        """Set AQI to None to all edges that did not receive AQI update. Set high AQ costs to edges with geometry and 0 to 
-        edges without.
+    def get_aq_update_arrays(self, aqis: np.ndarray, has_aqi_update: np.ndarray) -> Dict[str, np.ndarray]:
+        """Returns AQI and AQ costs for all edges as arrays aligned to edge ids. Edges that did not receive AQI update 
+        get AQI NaN (None) and high AQ costs (aqi_coeff=40) if they have geometry or zero costs if they do not.
         """
-        aq_costs = {}
-        if (length == 0.0):
-            # set zero costs to edges with null geometry
-            aq_costs = { 'aqc_'+ str(sen) : 0.0 for sen in self.sens }
-            aq_costs_b = { 'baqc_'+ str(sen) : 0.0 for sen in self.sens }
-        else:
-            # set high AQ costs to edges outside the AQI data extent (aqi_coeff=40)
-            aq_costs = { 'aqc_'+ str(sen) : round(length + length * 40, 2) for sen in self.sens }
-            aq_costs_b = { 'baqc_'+ str(sen) : round(length + length * 40, 2) for sen in self.sens }
-        return { 'aqi': None, **aq_costs, **aq_costs_b }
-    
-    def read_update_aqi_to_graph(self, aqi_updates_csv: str):
-        """Updates new AQI values and AQ costs to edges and AQI=None to edges that do not get AQI update. 
+        aq_costs = aq_exps.get_aqi_cost_arrays(aqis, self.lengths, self.sens)
+        aq_costs_b = aq_exps.get_aqi_cost_arrays(aqis, self.lengths, self.sens, lengths_b=self.lengths_b, prefix='b')
+        missing_costs = np.where(self.lengths == 0.0, 0.0, compiled_graphs.round_array(self.lengths + self.lengths * 40, 2))
+        aq_updates = { E.aqi.value: np.where(has_aqi_update, aqis, np.nan) }
+        for attr, costs in { **aq_costs, **aq_costs_b }.items():
+            aq_updates[attr] = np.where(has_aqi_update, costs, missing_costs)
+        return aq_updates
+
+    def read_update_aqi_to_graph(self, aqi_update_file: str):
+        """Updates new AQI values and AQ costs to edges and AQI=None to edges that do not get AQI update. The AQI 
+        and AQ costs of all edges are calculated off to the side as arrays aligned to edge ids and then published to 
+        the graph as a new set of AQ columns.
         """
-        self.log.info('starting AQI update from: '+ aqi_updates_csv)
-        self.aqi_data_wip = aqi_updates_csv
+        self.log.info('starting AQI update from: '+ aqi_update_file)
+        self.aqi_data_wip = aqi_update_file
+        update_start_time = time.time()
 
-        # read aqi update csv
-        edge_aqi_updates = pd.read_csv(self.aqi_dir + aqi_updates_csv)
+        # read aqi update file (binary files are memory-mapped)
+        start_time = time.time()
+        edge_ids, edge_aqis = aqi_updates.read_aqi_update_file(self.aqi_dir + aqi_update_file)
+        self.log.duration(start_time, 'read AQI update file', unit='ms', log_level='info')
 
-        # inspect how many edges will get AQI
-        aqi_update_count = len(edge_aqi_updates)
-        if (len(self.edge_df) != aqi_update_count):
-            missing_ratio = round(100 * (len(self.edge_df)-len(edge_aqi_updates)) / len(self.edge_df), 1)
+        # align AQI updates to edge ids
+        start_time = time.time()
+        valid_ids = (edge_ids >= 0) & (edge_ids < self.G.ecount)
+        if (not valid_ids.all()):
+            self.log.info(f'failed to merge AQI updates to edges, missing {np.count_nonzero(~valid_ids)} edges')
+        aqis = np.full(self.G.ecount, np.nan, dtype=np.float64)
+        aqis[edge_ids[valid_ids]] = edge_aqis[valid_ids]
+        has_aqi_update = np.zeros(self.G.ecount, dtype=bool)
+        has_aqi_update[edge_ids[valid_ids]] = True
+        aqi_update_count = np.count_nonzero(has_aqi_update)
+        if (aqi_update_count != self.G.ecount):
+            missing_ratio = round(100 * (self.G.ecount - aqi_update_count) / self.G.ecount, 1)
             self.log.info(f'AQI updates missing for {missing_ratio} % edges')
+        self.log.duration(start_time, 'aligned AQI updates to edges', unit='ms', log_level='info')
 
-        # update AQI and AQ costs to graph
-        aqi_update_df = pd.merge(self.edge_df, edge_aqi_updates, on=E.id_ig.name, how='inner')
-        if (len(aqi_update_df) != aqi_update_count):
-            self.log.info(f'failed to merge AQI updates to edge gdf, missing {aqi_update_count - len(aqi_update_df)} edges')  
-        
-        aqi_update_df['aq_updates'] = aqi_update_df.apply(lambda x: self.get_aq_update_attrs(x['aqi'], x[E.length.name], x[E.length_b.name]), axis=1)
-        self.G.update_edge_attr_to_graph(aqi_update_df, df_attr='aq_updates')
-
-        # update missing AQI and AQ costs to edges outside AQI data extent (AQI -> None)
-        missing_aqi_update_df = pd.merge(self.edge_df, edge_aqi_updates, on=E.id_ig.name, how='outer', suffixes=['', '_'], indicator=True)
-        missing_aqi_update_df = missing_aqi_update_df[missing_aqi_update_df['_merge'] == 'left_only']
-        missing_aqi_update_df['aq_updates'] = [self.get_missing_aq_update_attrs(length) for length in missing_aqi_update_df[E.length.name]]
-        self.G.update_edge_attr_to_graph(missing_aqi_update_df, df_attr='aq_updates')
-
-        # check that all edges got either AQI value or AQI=None
-        if (len(self.edge_df) != (len(missing_aqi_update_df) + len(aqi_update_df))):
-            self.log.error(f'edge count: {len(self.edge_df)} != all AQI updates: {len(missing_aqi_update_df) + len(aqi_update_df)}')
-        else:
-            self.log.info('AQI update succeeded')
+        # calculate AQI and AQ costs to all edges (AQI -> None to edges outside AQI data extent)
+        start_time = time.time()
+        aq_updates = self.get_aq_update_arrays(aqis, has_aqi_update)
+        self.log.duration(start_time, 'calculated AQ costs', unit='ms', log_level='info')
 
-        # TODO see if these help to release some memory (remove if not)
-        del edge_aqi_updates
-        del aqi_update_df
-        del missing_aqi_update_df
-        
+        # publish the new AQI and AQ costs to graph at once (requests in progress keep using the previous ones)
+        start_time = time.time()
+        aq_columns = self.G.publish_aq_columns(aq_updates, aqi_update_file)
+        self.log.duration(start_time, f'published AQ columns (generation {aq_columns.generation})', unit='ms', log_level='info')
+        if self.route_cache:
+            self.route_cache.invalidate(aq_columns.generation)
+
+        self.log.duration(update_start_time, 'AQI update succeeded', unit='ms', log_level='info')
         self.aqi_data_updatetime = datetime.utcnow()
-        self.aqi_data_latest = aqi_updates_csv
+        self.aqi_data_latest = aqi_update_file
@@ -1,103 +1,174 @@
 import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Set, Dict, Tuple
-from shapely.ops import nearest_points
+import numpy as np
 from shapely.geometry import Point, LineString
 from utils.igraphs import Edge as E, Node as N
+from utils.compiled_graphs import GraphArray as A
 import utils.igraphs as ig_utils
+import utils.compiled_graphs as compiled_graphs
 import utils.noise_exposures as noise_exps
 import utils.aq_exposures as aq_exps
 import utils.geometry as geom_utils
+import utils.path_search as path_search
+from app.graph_overlay import GraphOverlay
+from app.aq_columns import AqColumns
+from app.path_edges import PathEdges
+from app.snapping_index import SnappingIndex
 from app.logger import Logger
 
 class GraphHandler:
     """Graph handler provides functions for accessing and manipulating graph during least cost path optimization. 
     
+    The graph itself is never modified during routing: the nodes and edges linking origin and destination to the graph
+    are held in a GraphOverlay of the routing request. All arrays of the base graph are read-only and the AQ columns 
+    are only replaced as a whole (by a single writer, GraphAqiUpdater), so any number of routing requests may use the 
+    same GraphHandler concurrently (e.g. in the threads of a gthread worker) without locking.
+
     Attributes:
-        graph: An igraph graph object.
-        edge_gdf: The edges of the graph as a GeoDataFrame.
-        edges_sind: Spatial index of the edges GeoDataFrame.
-        node_gdf: The nodes of the graph as a GeoDataFrame.
-        nodes_sind: Spatial index of the nodes GeoDataFrame.
+        arrays: Read-only (memory-mapped) arrays of the compiled graph, shared by all worker processes (see utils/compiled_graphs.py).
+        aq_columns: The current AQI and AQ cost columns of the edges (AqColumns). These are private to the process and 
+            replaced as a whole by GraphAqiUpdater; routing requests pin the columns that are current at their start.
+        snapping_index: A grid index of the nodes and edge geometries for finding the nearest node and edge to a point.
         db_costs: Cost coefficients for different noise levels.
-        new_edges: New edges are first collected to dictionary and then added all at once.
-        edge_cache: A cache of path edges for current routing request. 
+        db_cost_vector: The cost coefficients of the noise levels as a vector (by noise_exposures.noise_db_bins).
+        adjacency: Memoryviews of the outgoing edges of the nodes in CSR format (used in least cost path search).
+        in_adjacency: Memoryviews of the incoming edges of the nodes in CSR format.
+        min_costs: Memoryview of the lower bounds for all edge costs.
+        node_xy: Memoryview of the coordinates of the nodes (used in A* heuristic).
+        h_scale: A coefficient for straight-line distances between nodes, by which they are lower bounds for edge costs.
+        landmark_dists_from, landmark_dists_to: Memoryviews of the least costs from and to the landmarks (see LandmarkBounds).
+        mean_dbs, db_ranges: Mean noise levels and noise level ranges of the edges, calculated once at load (the AQI 
+            classes of the edges are calculated once per AQI update, see AqColumns).
+        search_executor: A thread pool (shared by all routing requests of the process) in which the searches by the
+            edge costs of get_least_cost_paths are run in parallel (None = the searches are run one after another).
     """
 
-    def __init__(self, logger: Logger, subset: bool = False, gdf_attrs: list = []):
+    def __init__(self, logger: Logger, subset: bool = False, gdf_attrs: list = [], search_threads: int = 1):
         """Initializes a graph (and related features) used by green_paths_app and aqi_processor_app.
 
         Args:
             subset: A boolean variable indicating whether a subset of the graph should be loaded (subset is for testing / developing).
+            search_threads: The number of threads in which the searches of get_least_cost_paths are run in parallel
+                (1 = no parallel searches). Parallel searches require numba (see utils/path_search.py).
         """
         self.log = logger
         self.log.info('graph subset: '+ str(subset))
         start_time = time.time()
+        self.db_costs = noise_exps.get_db_costs(version=3)
+        self.db_cost_vector = compiled_graphs.get_db_cost_vector(self.db_costs)
+        self.noise_sens = noise_exps.get_noise_sensitivities()
         if subset:
-            self.graph = ig_utils.read_graphml('graphs/kumpula.graphml')
+            self.__meta, self.__arrays = self.__read_graph_arrays('graphs/kumpula.graphml')
         else:
-            self.graph = ig_utils.read_graphml('graphs/hma.graphml')
-        self.ecount = self.graph.ecount()
-        self.vcount = self.graph.vcount()
-        self.log.info('graph of '+ str(self.graph.ecount()) + ' edges read')
-        self.__edge_gdf = self.__get_edge_gdf()
-        self.__edge_sindex = self.__edge_gdf.sindex
-        self.__node_gdf = ig_utils.get_node_gdf(self.graph)
-        self.__nodes_sind = self.__node_gdf.sindex
-        self.db_costs = noise_exps.get_db_costs(version=3)
-        self.__set_noise_costs_to_edges()
-        self.log.info('noise costs set')
-        self.graph.es[E.aqi.value] = None # set default AQI value to None
+            self.__meta, self.__arrays = self.__read_graph_arrays('graphs/hma.graphml')
+        self.ecount = self.__meta['ecount']
+        self.vcount = self.__meta['vcount']
+        # the base graph is shared by all routing requests (threads) of the process, hence it is never modified
+        for array in self.__arrays.values():
+            array.setflags(write=False)
+        self.log.info('graph of '+ str(self.ecount) + ' edges read')
+        self.__adjacency = tuple(path_search.as_memoryview(self.__arrays[a.value]) for a in (A.out_offsets, A.out_edges, A.out_targets))
+        self.__in_adjacency = tuple(path_search.as_memoryview(self.__arrays[a.value]) for a in (A.in_offsets, A.in_edges, A.in_sources))
+        self.__min_costs = path_search.as_memoryview(self.__arrays[A.min_costs.value])
+        self.__node_xy = path_search.as_memoryview(self.__arrays[A.node_xy.value])
+        self.__h_scale = path_search.get_euclidean_heuristic_scale(
+            self.__arrays[A.node_xy.value], self.__arrays[A.edge_uv.value], self.__arrays[A.min_costs.value])
+        self.__landmark_dists_from = path_search.as_memoryview(self.__arrays[A.landmark_dists_from.value])
+        self.__landmark_dists_to = path_search.as_memoryview(self.__arrays[A.landmark_dists_to.value])
+        if (self.__h_scale < 0.9):
+            self.log.warning(f'A* heuristic is scaled by {round(self.__h_scale, 3)} (edges with lower costs than the distances between their nodes)')
+        self.__snapping_index = self.__get_snapping_index()
+        self.__mean_dbs = compiled_graphs.get_mean_noise_levels(self.__arrays)
+        self.__db_ranges = noise_exps.get_noise_ranges(self.__mean_dbs)
+        self.__mean_dbs.setflags(write=False)
+        self.__db_ranges.setflags(write=False)
+        self.__aq_columns = AqColumns(0, self.__get_initial_aq_arrays())
+        self.__aq_columns_lock = threading.Lock()
+        self.__search_executor = self.__get_search_executor(search_threads)
         self.log.duration(start_time, 'graph initialized', log_level='info')
-        self.__new_edges: Dict[Tuple[int, int], Dict] = {}
-        self.__edge_cache: Dict[int, dict] = {}
 
-    def __get_edge_gdf(self):
-        edge_gdf = ig_utils.get_edge_gdf(self.graph, attrs=[E.id_way])
-        # drop edges with identical geometry
-        edge_gdf = edge_gdf.drop_duplicates(E.id_way.name)
-        # drop edges without geometry
-        edge_gdf = edge_gdf[edge_gdf[E.geometry.name].apply(lambda geom: isinstance(geom, LineString))]
-        edge_gdf = edge_gdf[[E.geometry.name]]
-        self.log.info(f'added {len(edge_gdf)} edges to edge_gdf')
-        return edge_gdf
+    def __read_graph_arrays(self, graph_file: str) -> Tuple[dict, Dict[str, np.ndarray]]:
+        """Reads (memory-maps) the compiled version of the graph if it exists (see compile_graph.py) and falls back to 
+        parsing the GraphML file otherwise. In the latter case, the arrays are private to the process.
+        """
+        compiled_graph_dir = compiled_graphs.get_compiled_graph_dir(graph_file)
+        if compiled_graphs.compiled_graph_exists(compiled_graph_dir):
+            meta, arrays = compiled_graphs.read_compiled_arrays(compiled_graph_dir)
+            self.log.info(f'memory-mapped compiled graph: {compiled_graph_dir}')
+            if (meta['noise_sens'] != self.noise_sens):
+                self.log.warning(f'compiled graph has noise costs for sensitivities {meta["noise_sens"]}, recalculating noise costs')
+                compiled_graphs.add_noise_cost_arrays(meta, arrays, self.db_costs, self.noise_sens)
+            return meta, arrays
+        self.log.warning(f'compiled graph not found ({compiled_graph_dir}), reading GraphML: {graph_file}')
+        meta, arrays = compiled_graphs.get_compiled_arrays(ig_utils.read_graphml(graph_file, log=self.log))
+        compiled_graphs.add_noise_cost_arrays(meta, arrays, self.db_costs, self.noise_sens)
+        self.log.info('noise costs set')
+        return meta, arrays
 
-    def __set_noise_costs_to_edges(self):
-        """Updates all noise cost attributes to a graph.
+    def __get_search_executor(self, search_threads: int) -> ThreadPoolExecutor:
+        if (search_threads < 2):
+            return None
+        if (not path_search.compile_nogil_kernel()):
+            self.log.warning('numba is not installed: least cost paths are searched one after another')
+            return None
+        self.log.info(f'least cost paths are searched in parallel in {search_threads} threads')
+        return ThreadPoolExecutor(max_workers=search_threads, thread_name_prefix='path-search')
+
+    def __get_initial_aq_arrays(self) -> Dict[str, np.ndarray]:
+        """Returns AQI and AQ cost columns for all edges with value NaN (AQI = None). 
+        """
+        aq_sens = aq_exps.get_aq_sensitivities()
+        aq_attrs = [E.aqi.value] + ['aqc_'+ str(sen) for sen in aq_sens] + ['baqc_'+ str(sen) for sen in aq_sens]
+        return { attr: np.full(self.ecount, np.nan, dtype=np.float64) for attr in aq_attrs }
+
+    def __get_snapping_index(self) -> SnappingIndex:
+        start_time = time.time()
+        # drop edges with identical geometry (keep the first edge of each way)
+        _, edge_ids = np.unique(self.__arrays[E.id_way.value], return_index=True)
+        edge_ids = np.sort(edge_ids)
+        # drop edges without geometry
+        edge_ids = edge_ids[self.__arrays[A.has_geom.value][edge_ids]]
+        snapping_index = SnappingIndex(
+            self.__arrays[A.node_xy.value], edge_ids, self.__arrays[A.geom_offsets.value], self.__arrays[A.geom_coords.value])
+        self.log.duration(start_time, f'added {len(edge_ids)} edges to snapping index', unit='ms', log_level='info')
+        return snapping_index
+
+    def get_edge_array(self, attr: str, aq_columns: AqColumns = None) -> np.ndarray:
+        """Returns an edge attribute (e.g. length or cost) of all edges of the graph as a (read-only) array. AQI and AQ 
+        costs are returned from the given (pinned) AQ columns or from the current ones if not given.
+        """
+        aq_columns = aq_columns if aq_columns is not None else self.__aq_columns
+        if attr in aq_columns.arrays:
+            return aq_columns.arrays[attr]
+        return self.__arrays[attr]
+
+    def get_aq_columns(self) -> AqColumns:
+        """Returns the current AQI and AQ cost columns. Routing requests should call this once at their start and 
+        use the returned columns throughout the request.
         """
-        sens = noise_exps.get_noise_sensitivities()
-        for edge in self.graph.es:
-            # first add estimated exposure to noise level of 40 dB to edge attrs
-            edge_attrs = edge.attributes()
-            noises = edge_attrs[E.noises.value]
-            db_40_exp = noise_exps.estimate_db_40_exp(edge_attrs[E.noises.value], edge_attrs[E.length.value])
-            if (db_40_exp > 0.0):
-                noises[40] = db_40_exp
-            self.graph.es[edge.index][E.noises.value] = noises
-            
-            # then calculate and update noise costs to edges
-            updates = {}
-            for sen, cost_attr in [(sen, 'nc_'+ str(sen)) for sen in sens]: # iterate dict of noise sensitivities and respective cost attribute names
-                if (not noises and isinstance(edge_attrs[E.geometry.value], LineString)):
-                    # these are edges outside the extent of the noise data (having valid geometry)
-                    # -> set high noise costs to avoid them in finding quiet paths
-                    noise_cost = edge_attrs[E.length.value] * 20
-                elif (not isinstance(edge_attrs[E.geometry.value], LineString)):
-                    # set noise cost 0 to all edges without geometry
-                    noise_cost = 0.0
-                else:
-                    # else calculate normal noise exposure based noise cost coefficient
-                    noise_cost = noise_exps.get_noise_cost(noises=noises, db_costs=self.db_costs, sen=sen)
-                updates[cost_attr] = round(edge_attrs[E.length.value] + noise_cost, 2)
-                bike_length = edge_attrs[E.length_b.value] if edge_attrs[E.length_b.value] else edge_attrs[E.length.value]
-                updates['b'+ cost_attr] = round(bike_length + noise_cost, 2) # biking costs
-            self.graph.es[edge.index].update_attributes(updates)
-
-    def update_edge_attr_to_graph(self, edge_gdf, df_attr: str):
-        """Updates the given edge attribute from a DataFrame to a graph. 
+        return self.__aq_columns
+
+    def publish_aq_columns(self, aq_arrays: Dict[str, np.ndarray], aqi_data: str = '') -> AqColumns:
+        """Replaces the AQI and AQ cost columns of the graph with a complete set of new columns (aligned to edge ids). 
+        The columns are replaced with a single reference swap, so any request sees either the previous or the new 
+        columns, never a mix of them.
         """
-        for edge in edge_gdf.itertuples():
-            updates: dict = getattr(edge, df_attr)
-            self.graph.es[getattr(edge, E.id_ig.name)].update_attributes(updates)
+        with self.__aq_columns_lock:
+            current = self.__aq_columns
+            if (set(aq_arrays.keys()) != set(current.arrays.keys())):
+                raise ValueError(f'Expected AQ columns {sorted(current.arrays.keys())}, got {sorted(aq_arrays.keys())}')
+            for attr, values in aq_arrays.items():
+                if (len(values) != self.ecount):
+                    raise ValueError(f'Expected {self.ecount} values for edge attribute {attr}, got {len(values)}')
+            self.__aq_columns = AqColumns(current.generation + 1, aq_arrays, aqi_data)
+            return self.__aq_columns
+
+    def __get_aq_columns(self, overlay: GraphOverlay = None) -> AqColumns:
+        if (overlay is not None and overlay.aq_columns is not None):
+            return overlay.aq_columns
+        return self.__aq_columns
 
     def find_nearest_node(self, point: Point) -> int:
         """Finds the nearest node to a given point.
@@ -109,56 +180,67 @@ class GraphHandler:
         Returns:
             The name of the nearest node (number). None if no nearest node is found.
         """
-        for radius in [50, 100, 500]:
-            possible_matches_index = list(self.__node_gdf.sindex.intersection(point.buffer(radius).bounds))
-            if (len(possible_matches_index) > 0):
-                break
-        if (len(possible_matches_index) == 0):
+        nearest = self.__snapping_index.find_nearest_node(point.x, point.y)
+        if (nearest is None):
             self.log.warning('no near node found')
             return None
-        possible_matches = self.__node_gdf.iloc[possible_matches_index]
-        points_union = possible_matches.geometry.unary_union
-        nearest_geom = nearest_points(point, points_union)[1]
-        nearest = possible_matches.geometry.geom_equals(nearest_geom)
-        nearest_point =  possible_matches.loc[nearest]
-        nearest_node_id = nearest_point.index.tolist()[0]
-        return nearest_node_id
+        return nearest[0]
 
     def __get_node_by_id(self, node_id: int) -> dict:
         try:
-            return self.graph.vs[node_id].attributes()
+            if (node_id < 0 or node_id >= self.vcount): raise IndexError
+            return { N.geometry.value: Point(self.__arrays[A.node_xy.value][node_id]) }
         except Exception:
             self.log.warning('could not find node by id: '+ str(node_id))
             return None
 
-    def __get_edge_by_id(self, edge_id: int) -> dict:
+    def __get_edge_by_id(self, edge_id: int, overlay: GraphOverlay = None) -> dict:
+        if overlay and edge_id in overlay.edges:
+            # length_b is not set to linking edges
+            return { E.length_b.value: None, **overlay.edges[edge_id] }
         try:
-            return self.graph.es[edge_id].attributes()
+            if (edge_id < 0 or edge_id >= self.ecount): raise IndexError
+            return self.__get_edge_attrs(edge_id, self.__get_aq_columns(overlay))
         except Exception:
             self.log.warning('could not find edge by id: '+ str(edge_id))
             return None
 
+    def __get_edge_attrs(self, edge_id: int, aq_columns: AqColumns, geoms: bool = True) -> dict:
+        """Returns the attributes of an edge as dictionary (as they would be stored in igraph edge attributes). 
+        The geometries (as LineStrings) are omitted if geoms=False.
+        """
+        edge = {
+            E.id_ig.value: edge_id,
+            E.uv.value: tuple(self.__arrays[A.edge_uv.value][edge_id].tolist()),
+            E.noises.value: compiled_graphs.get_noises(self.__arrays, edge_id)
+        }
+        if geoms:
+            edge[E.geometry.value] = compiled_graphs.get_line_geom(self.__arrays, edge_id)
+            edge[E.geom_wgs.value] = compiled_graphs.get_line_geom(self.__arrays, edge_id, wgs=True)
+        for attr in self.__meta['edge_attrs']:
+            value = self.__arrays[attr][edge_id].item()
+            edge[attr] = value if not np.isnan(value) else None
+        for attr, values in aq_columns.arrays.items():
+            value = values[edge_id].item()
+            edge[attr] = value if not np.isnan(value) else None
+        return edge
+
     def get_node_point_geom(self, node_id: int) -> Point:
         return self.__get_node_by_id(node_id)[N.geometry.value]
 
-    def find_nearest_edge(self, point: Point) -> dict:
-        """Finds the nearest edge to a given point and returns it as dictionary of edge attributes.
+    def find_nearest_edge(self, point: Point, overlay: GraphOverlay = None) -> dict:
+        """Finds the nearest edge to a given point and returns it as dictionary of edge attributes (with AQI from 
+        the AQ columns pinned to the overlay, if given). The distance to the edge and the nearest point on the edge are
+        added to the dictionary as 'dist' and 'nearest_point'.
         """
-        for radius in [35, 150, 400, 650]:
-            possible_matches_index = list(self.__edge_gdf.sindex.intersection(point.buffer(radius).bounds))
-            if (len(possible_matches_index) > 0):
-                possible_matches = self.__edge_gdf.iloc[possible_matches_index].copy()
-                possible_matches['distance'] = [geom.distance(point) for geom in possible_matches[E.geometry.name]]
-                shortest_dist = possible_matches['distance'].min()
-                if (shortest_dist < radius):
-                    break
-        if (len(possible_matches_index) == 0):
+        nearest = self.__snapping_index.find_nearest_edge(point.x, point.y)
+        if (nearest is None):
             self.log.error('no near edges found')
             return None
-        nearest = possible_matches['distance'] == shortest_dist
-        edge_id = possible_matches.loc[nearest].index[0]
-        edge = self.__get_edge_by_id(edge_id)
-        edge['dist'] = round(shortest_dist, 2)
+        edge_id, dist, nearest_point = nearest
+        edge = self.__get_edge_by_id(edge_id, overlay)
+        edge['dist'] = round(dist, 2)
+        edge['nearest_point'] = Point(nearest_point)
         return edge
 
     def format_edge_dict_for_debugging(self, edge: dict) -> dict:
@@ -166,57 +248,114 @@ class GraphHandler:
         edge_d = { E(k).name if k in [item.value for item in E] else k: v for k, v in edge.items() }
         edge_d[E.geometry.name] = str(edge_d[E.geometry.name])
         edge_d[E.geom_wgs.name] = str(edge_d[E.geom_wgs.name])
+        if ('nearest_point' in edge_d):
+            edge_d['nearest_point'] = str(edge_d['nearest_point'])
         return edge_d
 
-    def get_edges_from_edge_ids(self, edge_ids: List[int]) -> List[dict]:
-        """Loads edge attributes from graph by ordered list of edges representing a path.
+    def get_path_edges(self, edge_ids: List[int], overlay: GraphOverlay = None) -> PathEdges:
+        """Gathers the attributes of the edges of a path (from the graph and from the overlay of the routing request) 
+        as arrays: the attributes of the edges of the graph are gathered from the edge arrays and the summaries of the
+        edges calculated at load (or at AQI update) at once, i.e. no dictionaries or geometries are built for them.
+        Edges without geometry (or with length 0) are omitted.
         """
-        path_edges = []
-        for edge_id in edge_ids:
-            edge_d = self.__edge_cache.get(edge_id)
-            if edge_d:
-                path_edges.append(edge_d)
+        aq_columns = self.__get_aq_columns(overlay)
+        edge_ids = np.asarray(edge_ids, dtype=np.int64)
+        in_base = edge_ids < self.ecount
+        base_ids = edge_ids[in_base]
+        lengths = np.empty(len(edge_ids), dtype=np.float64)
+        lengths_b = np.empty(len(edge_ids), dtype=np.float64)
+        aqis = np.empty(len(edge_ids), dtype=np.float64)
+        aqi_classes = np.empty(len(edge_ids), dtype=np.int64)
+        db_ranges = np.empty(len(edge_ids), dtype=np.int64)
+        noises_missing = np.empty(len(edge_ids), dtype=bool)
+        wgs_counts = np.empty(len(edge_ids), dtype=np.int64)
+        valid = np.empty(len(edge_ids), dtype=bool)
+        lengths[in_base] = self.__arrays[E.length.value][base_ids]
+        lengths_b[in_base] = self.__arrays[E.length_b.value][base_ids]
+        aqis[in_base] = aq_columns.arrays[E.aqi.value][base_ids]
+        aqi_classes[in_base] = aq_columns.aqi_classes[base_ids]
+        db_ranges[in_base] = self.__db_ranges[base_ids]
+        noises_missing[in_base] = self.__arrays[A.noises_missing.value][base_ids]
+        wgs_ranges = self.__arrays[A.wgs_ranges.value][base_ids]
+        wgs_counts[in_base] = wgs_ranges[:, 1] - wgs_ranges[:, 0]
+        valid[in_base] = self.__arrays[A.has_geom.value][base_ids]
+        valid &= ~in_base | (lengths != 0.0)
+        noise_bins = noise_exps.aggregate_exposure_bins(self.__arrays[A.noise_matrix.value], edge_ids[in_base & valid])
+
+        for pos in np.flatnonzero(~in_base).tolist():
+            edge = overlay.edges[int(edge_ids[pos])]
+            length = edge[E.length.value]
+            valid[pos] = length != 0.0 and isinstance(edge[E.geometry.value], LineString)
+            if (not valid[pos]):
                 continue
-
-            edge = self.__get_edge_by_id(edge_id)
-            # omit edges with null geometry
-            if (edge[E.length.value] == 0.0 or not isinstance(edge[E.geometry.value], LineString)):
-                continue
-            edge_d = {}
-            edge_d['length'] = edge[E.length.value]
-            edge_d['length_b'] = edge[E.length_b.value] if edge[E.length_b.value] else 0
-            edge_d['aqi'] = edge[E.aqi.value]
-            edge_d['aqi_cl'] = aq_exps.get_aqi_class(edge_d['aqi']) if edge_d['aqi'] else None
-            edge_d['noises'] = edge[E.noises.value]
-            mean_db = noise_exps.get_mean_noise_level(edge_d['noises'], edge_d['length']) if edge_d['noises'] else 0
-            edge_d['dBrange'] = noise_exps.get_noise_range(mean_db)
-            edge_d['coords'] = edge[E.geometry.value].coords
-            edge_d['coords_wgs'] = edge[E.geom_wgs.value].coords
-            self.__edge_cache[edge_id] = edge_d
-            path_edges.append(edge_d)
-        return path_edges
-
-    def __get_new_node_id(self) -> int:
-        """Returns an unique node id that can be used in creating a new node to a graph.
+            aqi = edge[E.aqi.value]
+            noises = edge[E.noises.value]
+            lengths[pos] = length
+            lengths_b[pos] = edge[E.length_b.value] if edge[E.length_b.value] else 0
+            aqis[pos] = aqi if aqi is not None else np.nan
+            aqi_classes[pos] = aq_exps.get_aqi_class(aqi) if aqi else 0
+            db_ranges[pos] = noise_exps.get_noise_range(noise_exps.get_mean_noise_level(noises, length) if noises else 0)
+            noises_missing[pos] = noises is None
+            wgs_counts[pos] = len(edge[E.geom_wgs.value].coords)
+            for db, exp in (noises.items() if noises else ()):
+                noise_bins[db - noise_exps.noise_db_bins[0]] += exp
+
+        lengths_b[np.isnan(lengths_b)] = 0
+        # AQI 0.0 is treated as missing
+        aqi_classes[aqis == 0.0] = 0
+        return PathEdges(
+            ids=edge_ids[valid],
+            lengths=lengths[valid],
+            lengths_b=lengths_b[valid],
+            aqis=aqis[valid],
+            aqi_classes=aqi_classes[valid],
+            db_ranges=db_ranges[valid],
+            noises_missing=noises_missing[valid],
+            noise_bins=noise_bins,
+            wgs_counts=wgs_counts[valid])
+
+    def get_path_coords(self, edge_ids: np.ndarray, overlay: GraphOverlay = None, wgs: bool = False) -> np.ndarray:
+        """Returns the projected (or WGS84) coordinates of a sequence of edges (e.g. PathEdges.ids) concatenated to a 
+        single array (n x 2). The coordinates of the edges of the graph are gathered from the packed coordinates at once.
         """
-        return self.graph.vcount()
+        in_base = edge_ids < self.ecount
+        coords, counts = compiled_graphs.get_edges_coords(self.__arrays, edge_ids[in_base], wgs=wgs)
+        if (in_base.all()):
+            return coords
+        # insert the coordinates of the overlay edges between the ones of the edges of the graph
+        offsets = np.concatenate([[0], np.cumsum(counts)])
+        base_counts = np.cumsum(in_base)
+        geom_attr = E.geom_wgs.value if wgs else E.geometry.value
+        parts = []
+        start = 0
+        for pos in np.flatnonzero(~in_base).tolist():
+            end = base_counts[pos]
+            parts.append(coords[offsets[start]:offsets[end]])
+            parts.append(np.asarray(overlay.edges[int(edge_ids[pos])][geom_attr].coords, dtype=np.float64).reshape(-1, 2))
+            start = end
+        parts.append(coords[offsets[start]:])
+        return np.concatenate(parts)
+
+    def get_path_exposures(self, edge_ids: List[int], overlay: GraphOverlay = None) -> Tuple[float, float, float]:
+        """Returns the length, the noise exposure index (nei) and the air pollution exposure index (aqc) of a path
+        without building its geometry (or processing it to a Path). The values equal the ones of Path.
 
-    def add_new_node_to_graph(self, point: Point) -> int:
-        """Adds a new node to a graph at a specified location (Point) and returns the id of the new node.
+        Returns:
+            length, nei, aqc (nei and aqc are None if noise data or valid AQI is missing from any edge of the path).
         """
-        new_node_id = self.__get_new_node_id()
-        attrs = { N.geometry.value: point }
-        self.graph.add_vertex(**attrs)
-        return new_node_id
+        edges = self.get_path_edges(edge_ids, overlay)
+        length = round(sum(edges.lengths.tolist()), 2)
 
-    def __get_new_edge_id(self) -> int:
-        return self.graph.ecount()
+        nei = None
+        if (not edges.noises_missing.any() and edges.noise_bins.any()):
+            noise_bins = compiled_graphs.round_array(edges.noise_bins, 2)
+            nei = round(noise_exps.get_noise_cost_from_bins(noise_bins, self.db_cost_vector), 1)
 
-    def __add_new_edges_to_graph(self, edge_uvs: List[Tuple[int, int]]) -> List[int]:
-        """Adds new edges to graph and returns their ids as list."""
-        new_edge_id = self.__get_new_edge_id()
-        self.graph.add_edges(edge_uvs)
-        return [new_edge_id + edge_number for edge_number in range(0, len(edge_uvs))]
+        aqc = None
+        if (not (np.isnan(edges.aqis) | (edges.aqis < 0.95)).any()):
+            aqc = round(aq_exps.get_total_aqi_cost_from_arrays(edges.aqis, edges.lengths), 2)
+
+        return length, nei, aqc
 
     def __get_link_edge_aqi_cost_estimates(self, edge_dict: dict, link_geom: 'LineString', sens) -> dict:
         """Returns aqi exposures and costs for a split edge based on aqi exposures on the original edge
@@ -235,6 +374,7 @@ class GraphHandler:
             return { E.aqi.value: edge_dict['aqi'], **aqi_costs, **aqi_costs_b }
 
     def create_linking_edges_for_new_node(self, 
+        overlay: GraphOverlay,
         new_node: int,
         split_point: Point,
         edge: dict,
@@ -242,8 +382,9 @@ class GraphHandler:
         noise_sens: list,
         db_costs: dict,
         origin: bool) -> dict:
-        """Creates new edges from a new node that connect the node to the existing nodes in the graph. Also estimates and sets the edge cost attributes
-        for the new edges based on attributes of the original edge on which the new node was added. 
+        """Creates new edges from a new node that connect the node to the existing nodes in the graph and adds them to the 
+        overlay of the routing request. Also estimates and sets the edge cost attributes for the new edges based on attributes 
+        of the original edge on which the new node was added. 
 
         Returns:
             A dictionary containing the following keys:
@@ -279,87 +420,148 @@ class GraphHandler:
         link1_attrs = { **link1_noise_cost_attrs, **link1_aqi_cost_attrs }
         link2_attrs = { **link2_noise_cost_attrs, **link2_aqi_cost_attrs }
 
-        # add linking edges with noise cost attributes to graph (save for loading them to graph later)
         if origin:
             # add linking edges from new node to existing nodes
-            self.__new_edges.update({
-                (new_node, node_from): { E.uv.value: (new_node, node_from), **link1_attrs, **link1_rev_geom_attrs },
-                (new_node, node_to): { E.uv.value: (new_node, node_to), **link2_attrs, **link2_geom_attrs },
-            })
             link1_d = { E.uv.value: (new_node, node_from), **link1_attrs, **link1_rev_geom_attrs }
             link2_d = { E.uv.value: (new_node, node_to), **link2_attrs, **link2_geom_attrs }
         else:
             # add linking edges from existing nodes to new node
-            self.__new_edges.update({
-                (node_from, new_node): { E.uv.value: (node_from, new_node), **link1_attrs, **link1_geom_attrs },
-                (node_to, new_node): { E.uv.value: (node_to, new_node), **link2_attrs, **link2_rev_geom_attrs }
-            })
             link1_d = { E.uv.value: (node_from, new_node), **link1_attrs, **link1_geom_attrs }
             link2_d = { E.uv.value: (node_to, new_node), **link2_attrs, **link2_rev_geom_attrs }
+        # add linking edges with cost attributes to the overlay (only one edge per node pair)
+        for link_d in { link_d[E.uv.value]: link_d for link_d in (link1_d, link2_d) }.values():
+            overlay.add_edge(link_d)
         
         self.log.duration(time_func, 'created links for new node (GraphHandler function)', unit='ms')
         return { 'node_from': node_from, 'new_node': new_node, 'node_to': node_to, 'link1': link1_d, 'link2': link2_d }
 
-    def load_new_edges_to_graph(self) -> None:
-        time_add_edges = time.time()
-        if self.__new_edges:
-            new_edge_ids = self.__add_new_edges_to_graph(list(self.__new_edges.keys()))
-            new_edge_attrs: List[dict] = list(self.__new_edges.values())
-            for idx, edge_id in enumerate(new_edge_ids):
-                for key, value in new_edge_attrs[idx].items():
-                    self.graph.es[edge_id][key] = value
-
-        self.__new_edges = {}
-        self.log.duration(time_add_edges, 'loaded new features to graph', unit='ms')
+    def __get_node_xy(self, node_id: int, overlay: GraphOverlay = None) -> Tuple[float, float]:
+        if overlay and node_id in overlay.nodes:
+            return overlay.nodes[node_id].coords[0][:2]
+        return tuple(self.__arrays[A.node_xy.value][node_id].tolist())
 
-    def get_least_cost_path(self, orig_node: int, dest_node: int, weight: str='length') -> List[int]:
+    def __get_heuristic_scale(self, overlay: GraphOverlay, weight: str) -> float:
+        """Returns the scale of the A* heuristic, adjusted (if needed) to the costs of the linking edges of the routing request.
+        """
+        h_scale = self.__h_scale
+        for edge in overlay.edges.values():
+            (x1, y1), (x2, y2) = (self.__get_node_xy(node_id, overlay) for node_id in edge[E.uv.value])
+            dist = ((x2 - x1)**2 + (y2 - y1)**2) ** 0.5
+            if (dist > 0):
+                h_scale = min(h_scale, edge[weight] / dist)
+        return h_scale
+
+    def get_landmark_bounds(self, orig_node: int, dest_node: int, overlay: GraphOverlay, reverse: bool = False) -> path_search.LandmarkBounds:
+        """Returns lower bounds for the costs to the destination (or from the origin if reverse=True), using the 
+        landmarks that best bound the cost between the origin and the destination.
+        """
+        orig_anchors = overlay.get_base_nodes(orig_node)
+        dest_anchors = overlay.get_base_nodes(dest_node, incoming=True)
+        landmarks = path_search.select_landmarks(self.__landmark_dists_from, self.__landmark_dists_to, orig_anchors, dest_anchors)
+        if (reverse):
+            # costs from the origin are costs to it in the reversed graph
+            return path_search.LandmarkBounds(self.__landmark_dists_to, self.__landmark_dists_from, landmarks, orig_anchors)
+        return path_search.LandmarkBounds(self.__landmark_dists_from, self.__landmark_dists_to, landmarks, dest_anchors)
+
+    def get_least_cost_path(self, 
+        orig_node: int, 
+        dest_node: int, 
+        weight: str='length', 
+        overlay: GraphOverlay = None, 
+        algorithm: path_search.SearchAlgorithm = path_search.SearchAlgorithm.ASTAR_LANDMARKS,
+        stats: dict = None
+        ) -> List[int]:
         """Calculates a least cost path by the given edge weight.
 
         Args:
             orig_node: The name of the origin node (int).
             dest_node: The name of the destination node (int).
             weight: The name of the edge attribute to use as cost in the least cost path optimization.
+            overlay: The new nodes and edges of the routing request (linking origin and destination to the graph).
+            algorithm: A* with landmark lower bounds (default), bidirectional A* or Dijkstra's algorithm.
+            stats: An optional dictionary to which the number of settled nodes is set (for benchmarking).
         Returns:
             The least cost path as a sequence of edges (ids).
         """
         if (orig_node != dest_node):
+            overlay = overlay if overlay else GraphOverlay(self.vcount, self.ecount)
             try:
-                s_path = self.graph.get_shortest_paths(orig_node, to=dest_node, weights=weight, mode=1, output="epath")
-                return s_path[0]
+                weights = path_search.as_memoryview(self.get_edge_array(weight, overlay.aq_columns))
+                if (algorithm == path_search.SearchAlgorithm.BIDIRECTIONAL_ASTAR):
+                    return path_search.find_least_cost_path_bidirectional(
+                        self.__adjacency, self.__in_adjacency, weights, self.__node_xy,
+                        self.__get_heuristic_scale(overlay, weight), orig_node, dest_node,
+                        overlay_out_edges=overlay.out_edges,
+                        overlay_in_edges=overlay.in_edges,
+                        overlay_weights=overlay.get_edge_weights(weight),
+                        overlay_node_xy={ node_id: point.coords[0][:2] for node_id, point in overlay.nodes.items() },
+                        stats=stats)
+                return path_search.find_least_cost_path(
+                    *self.__adjacency, weights, orig_node, dest_node,
+                    overlay_out_edges=overlay.out_edges,
+                    overlay_weights=overlay.get_edge_weights(weight),
+                    h_dists=self.get_landmark_bounds(orig_node, dest_node, overlay) if (algorithm == path_search.SearchAlgorithm.ASTAR_LANDMARKS) else {},
+                    stats=stats)
             except:
                 raise Exception(f'Could not find paths by {weight}')
         else:
             raise Exception('Origin and destination are the same location')
 
-    def reset_edge_cache(self):
-        self.__edge_cache = {}
+    def get_least_cost_paths(self, orig_node: int, dest_node: int, weights: List[str], overlay: GraphOverlay = None) -> List[List[int]]:
+        """Calculates least cost paths by multiple edge weights (e.g. length and noise costs of all noise sensitivities).
+        This is a lot faster than calling get_least_cost_path for each weight, since the searches share a single search
+        from the destination (see utils/path_search.py). The searches by the weights are run in parallel if the 
+        GraphHandler has a search executor. The durations of the searches are logged.
 
-    def delete_added_linking_edges(self, 
-        orig_edges: dict=None,
-        orig_node: dict=None, 
-        dest_edges: dict=None,
-        dest_node: dict=None, 
-        ) -> None:
-        """Deletes linking edges from the graph. Needed after routing in order to keep the graph unchanged.
+        Returns:
+            The least cost paths as sequences of edges (ids) in the order of the weights.
         """
-        delete_node_ids = []
-
-        if orig_edges:
-            # delete node because it was not in the graph before routing
-            delete_node_ids.append(orig_node['node'])
-        
-        if dest_edges:
-            # delete node because it was not in the graph before routing
-            delete_node_ids.append(dest_node['node'])
-
+        if (orig_node == dest_node):
+            raise Exception('Origin and destination are the same location')
+        if (overlay is None):
+            overlay = GraphOverlay(self.vcount, self.ecount)
+        stats = {}
         try:
-            self.graph.delete_vertices(delete_node_ids)
-            self.log.debug(f'deleted {len(delete_node_ids)} nodes')
-        except Exception:
-            self.log.error('could not delete added nodes or edges from the graph')
+            paths = path_search.find_least_cost_paths(
+                self.__adjacency,
+                self.__in_adjacency,
+                [path_search.as_memoryview(self.get_edge_array(weight, overlay.aq_columns)) for weight in weights],
+                self.__min_costs,
+                orig_node, 
+                dest_node,
+                overlay_out_edges=overlay.out_edges,
+                overlay_in_edges=overlay.in_edges,
+                overlay_weights_list=[overlay.get_edge_weights(weight) for weight in weights],
+                overlay_min_weights=overlay.get_min_edge_weights(weights),
+                orig_bounds=self.get_landmark_bounds(orig_node, dest_node, overlay, reverse=True),
+                dest_bounds=self.get_landmark_bounds(orig_node, dest_node, overlay),
+                executor=self.__search_executor,
+                stats=stats)
+        except:
+            raise Exception(f'Could not find paths by {weights}')
+        search_times = ', '.join(f'{weight}: {round(duration, 1)}' for weight, duration in zip(weights, stats['search_ms']))
+        self.log.info(
+            f'searched paths {"in parallel " if self.__search_executor else ""}in ms - '
+            f'backward search: {round(stats["backward_search_ms"], 1)}, {search_times}')
+        return paths
+
+    def get_least_cost_paths_to_many(self, orig_node: int, dest_nodes: List[int], weights: List[str], overlay: GraphOverlay = None) -> List[Dict[int, List[int]]]:
+        """Calculates least cost paths from one origin to many destinations by multiple edge weights, with one search
+        per weight (see find_least_cost_paths_to_many in utils/path_search.py).
 
-        # make sure that graph has the expected number of edges and nodes after routing
-        if (self.graph.ecount() != self.ecount):
-            self.log.error('graph has incorrect number of edges: '+ str(self.graph.ecount()) + ' is not '+ str(self.ecount))
-        if (self.graph.vcount() != self.vcount):
-            self.log.error('graph has incorrect number of nodes: '+ str(self.graph.vcount()) + ' is not '+ str(self.vcount))
+        Returns:
+            The least cost paths as sequences of edges (ids) by destination node, in the order of the weights. 
+            Destinations that cannot be reached are omitted.
+        """
+        if (overlay is None):
+            overlay = GraphOverlay(self.vcount, self.ecount)
+        return [
+            path_search.find_least_cost_paths_to_many(
+                *self.__adjacency,
+                path_search.as_memoryview(self.get_edge_array(weight, overlay.aq_columns)),
+                orig_node,
+                dest_nodes,
+                overlay_out_edges=overlay.out_edges,
+                overlay_weights=overlay.get_edge_weights(weight))
+            for weight in weights
+        ]
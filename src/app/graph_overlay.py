@@ -0,0 +1,65 @@
+from typing import List, Set, Dict, Tuple
+from shapely.geometry import Point
+from utils.igraphs import Edge as E
+from app.aq_columns import AqColumns
+
+class GraphOverlay:
+    """An instance of GraphOverlay holds the new nodes and edges that link the origin and destination of a single routing
+    request to the graph. The least cost path search consults the overlay in addition to the (read-only) base graph,
+    so the base graph is never modified and the overlay is simply dropped after the request. The overlay also pins the
+    AQ columns of the graph that were current at the start of the request.
+
+    Attributes:
+        base_vcount: The number of nodes in the base graph (ids of the new nodes start from this).
+        base_ecount: The number of edges in the base graph (ids of the new edges start from this).
+        nodes: Geometries of the new nodes by node id.
+        edges: Attributes of the new edges by edge id.
+        out_edges: New outgoing edges by source node as lists of (edge id, target node).
+        in_edges: New incoming edges by target node as lists of (edge id, source node).
+        aq_columns: The AQI and AQ cost columns of the graph used in the routing request (None = the current ones).
+    """
+
+    def __init__(self, base_vcount: int, base_ecount: int, aq_columns: AqColumns = None):
+        self.base_vcount = base_vcount
+        self.base_ecount = base_ecount
+        self.aq_columns = aq_columns
+        self.nodes: Dict[int, Point] = {}
+        self.edges: Dict[int, dict] = {}
+        self.out_edges: Dict[int, List[Tuple[int, int]]] = {}
+        self.in_edges: Dict[int, List[Tuple[int, int]]] = {}
+
+    def add_node(self, point: Point) -> int:
+        """Adds a new node at a specified location (Point) and returns the id of the new node.
+        """
+        new_node_id = self.base_vcount + len(self.nodes)
+        self.nodes[new_node_id] = point
+        return new_node_id
+
+    def add_edge(self, edge_attrs: dict) -> int:
+        """Adds a new edge (with source & target nodes in the uv attribute) and returns the id of the new edge.
+        """
+        new_edge_id = self.base_ecount + len(self.edges)
+        source, target = edge_attrs[E.uv.value]
+        self.edges[new_edge_id] = edge_attrs
+        self.out_edges.setdefault(source, []).append((new_edge_id, target))
+        self.in_edges.setdefault(target, []).append((new_edge_id, source))
+        return new_edge_id
+
+    def get_base_nodes(self, node: int, incoming: bool = False) -> List[int]:
+        """Returns the nodes of the base graph that are reached from the given node via the new edges (or from which 
+        the node is reached if incoming=True). For nodes of the base graph, returns the node itself.
+        """
+        if (node < self.base_vcount):
+            return [node]
+        edges = self.in_edges if incoming else self.out_edges
+        return sorted(set(
+            base_node for _, other in edges.get(node, []) for base_node in self.get_base_nodes(other, incoming)
+        ))
+
+    def get_edge_weights(self, weight: str) -> Dict[int, float]:
+        return { edge_id: attrs[weight] for edge_id, attrs in self.edges.items() }
+
+    def get_min_edge_weights(self, weights: List[str]) -> Dict[int, float]:
+        """Returns the least of the given cost attributes of each new edge (i.e. a lower bound for all of them).
+        """
+        return { edge_id: min(attrs[weight] for weight in weights) for edge_id, attrs in self.edges.items() }
@@ -1,60 +1,85 @@
 from shapely.geometry import Point, LineString
 from typing import List, Set, Dict, Tuple, Optional
+import numpy as np
 import utils.geometry as geom_utils
+import utils.geojson as geojson
 from app.path_noises import PathNoiseAttrs
 from app.path_aqi_attrs import PathAqiAttrs
+from app.path_edges import PathEdges
 from app.graph_handler import GraphHandler
+from app.graph_overlay import GraphOverlay
 from app.constants import RoutingMode, PathType
 
+# the columns of PathEdges by which the edges of paths are grouped
+edge_group_columns = { 'dBrange': 'db_ranges', 'aqi_cl': 'aqi_classes' }
+
 class Path:
-    """An instance of Path holds all attributes of a path and provides methods for manipulating them.
+    """An instance of Path holds all attributes of a path and provides methods for manipulating them. The edges of the
+    path are held as arrays of their attributes (PathEdges), from which the attributes of the path are aggregated. The 
+    coordinates (and the geometry) of the path are only gathered from the graph when they are first needed.
     """
+    __slots__ = (
+        'orig_node', 'edge_ids', 'edges', 'edge_groups', 'name', 'path_type', 'cost_coeff', 'length', 'length_b',
+        'len_diff', 'len_diff_rat', 'missing_aqi', 'missing_noises', 'noise_attrs', 'aqi_attrs', 
+        '__G', '__overlay', '__geometry', '__wgs_coords'
+    )
 
     def __init__(self, orig_node: int, edge_ids: List[int], name: str, path_type, cost_coeff: float=0.0):
         self.orig_node: int = orig_node
         self.edge_ids: List[int] = edge_ids
-        self.edges: List[dict] = []
-        self.edge_groups: List[Tuple[int, List[dict]]] = []
+        self.edges: PathEdges = None
+        self.edge_groups: List[Tuple[int, int, int]] = []
         self.name: str = name
         self.path_type: PathType = path_type
         self.cost_coeff: float = cost_coeff
-        self.geometry = None
         self.length: float = None
+        self.length_b: float = None
         self.len_diff: float = 0
         self.len_diff_rat: float = None
         self.missing_aqi: bool = False
         self.missing_noises: bool = False
         self.noise_attrs: PathNoiseAttrs = None
         self.aqi_attrs: PathAqiAttrs = None
+        self.__G: GraphHandler = None
+        self.__overlay: GraphOverlay = None
+        self.__geometry: LineString = None
+        self.__wgs_coords: np.ndarray = None
     
     def set_path_name(self, path_name: str): self.name = path_name
 
     def set_path_type(self, path_type: str): self.path_type = path_type
 
-    def set_path_edges(self, G: GraphHandler) -> None:
-        """Iterates through the path's node list and loads the respective edges (& their attributes) from a graph.
+    def set_path_edges(self, G: GraphHandler, overlay: GraphOverlay = None) -> None:
+        """Gathers the attributes of the edges of the path from a graph (and from the overlay of the routing request).
+        """
+        self.__G = G
+        self.__overlay = overlay
+        self.edges = G.get_path_edges(self.edge_ids, overlay)
+
+    @property
+    def geometry(self) -> LineString:
+        """The (projected) geometry of the path, built when first needed (e.g. in filtering out similar paths).
         """
-        self.edges = G.get_edges_from_edge_ids(self.edge_ids)
+        if (self.__geometry is None):
+            coords = self.__G.get_path_coords(self.edges.ids, self.__overlay)
+            self.__geometry = LineString(coords) if len(coords) > 0 else LineString()
+        return self.__geometry
 
     def aggregate_path_attrs(self) -> None:
-        """Aggregates path attributes form list of edges.
+        """Aggregates path attributes from the edge arrays.
         """
-        path_coords = [coord for edge in self.edges for coord in edge['coords']]
-        self.geometry = LineString(path_coords)
-        self.length = round(sum(edge['length'] for edge in self.edges ), 2)
-        self.length_b = round(sum(edge['length_b'] for edge in self.edges ), 2)
-        self.missing_noises = True if (None in [edge['noises'] for edge in self.edges]) else False
-        self.missing_aqi = True if (None in [edge['aqi'] for edge in self.edges]) else False
+        self.length = round(sum(self.edges.lengths.tolist()), 2)
+        self.length_b = round(sum(self.edges.lengths_b.tolist()), 2)
+        self.missing_noises = bool(self.edges.noises_missing.any())
+        self.missing_aqi = bool(np.isnan(self.edges.aqis).any())
         if (not self.missing_noises):
-            noises_list = [edge['noises'] for edge in self.edges]
-            self.noise_attrs = PathNoiseAttrs(noises_list)
+            self.noise_attrs = PathNoiseAttrs(self.edges.noise_bins)
         if (not self.missing_aqi):
-            aqi_exp_list = [(edge['aqi'], edge['length']) for edge in self.edges]
-            self.aqi_attrs = PathAqiAttrs(aqi_exp_list)
+            self.aqi_attrs = PathAqiAttrs(self.edges.aqis, self.edges.aqi_classes, self.edges.lengths)
 
-    def set_noise_attrs(self, db_costs: dict) -> None:
+    def set_noise_attrs(self, db_cost_vector: np.ndarray) -> None:
         if self.noise_attrs:
-            self.noise_attrs.set_noise_attrs(db_costs, self.length)
+            self.noise_attrs.set_noise_attrs(db_cost_vector, self.length)
 
     def set_aqi_attrs(self) -> None:
         if self.aqi_attrs:
@@ -69,37 +94,50 @@ class Path:
             self.aqi_attrs.set_aqi_diff_attrs(shortest_path.aqi_attrs, len_diff=self.len_diff)
     
     def aggregate_edge_groups_by_attr(self, group_attr: str) -> None:
-        cur_group = []
-        cur_group_id: int = 0
-        for edge in self.edges:
-            # add edge to current or new group based on group_attr
-            if (edge[group_attr] == cur_group_id):
-                cur_group.append(edge)
-            else:
-                # before creating a new group, add the current group to self.edge_groups
-                if (cur_group != []): self.edge_groups.append((cur_group_id, cur_group))
-                # create new edge group and add edge there
-                cur_group = []
-                cur_group_id = edge[group_attr]
-                cur_group.append(edge)
-        self.edge_groups.append((cur_group_id, cur_group))
+        """Groups the consecutive edges of the path with the same value of an attribute (dBrange or aqi_cl) to edge
+        groups of (value, start, end), where start and end (exclusive) are indexes to the edges of the path.
+        """
+        values = getattr(self.edges, edge_group_columns[group_attr])
+        if (len(values) == 0):
+            self.edge_groups = [(0, 0, 0)]
+            return
+        bounds = [0] + (np.flatnonzero(np.diff(values)) + 1).tolist() + [len(values)]
+        self.edge_groups = [
+            # AQI class 0 = missing AQI
+            (value if value != 0 else None, start, end)
+            for value, start, end in zip(values[bounds[:-1]].tolist(), bounds[:-1], bounds[1:])
+        ]
 
     def get_edge_groups_as_features(self) -> List[dict]:
         features = []
-        for group in self.edge_groups:
-            group_coords = [coords for edge in group[1] for coords in edge['coords_wgs']]
-            group_coords = geom_utils.round_coordinates(group_coords, digits=6)       
+        for value, start, end in self.edge_groups:
+            group_coords = geom_utils.round_coordinates(self.get_wgs_coords(start, end).tolist(), digits=6)
             feature = self.__get_geojson_feature_dict(group_coords)
-            feature['properties'] = { 'value': group[0], 'path': self.name, 'p_len_diff': self.len_diff, 'p_length': self.length }
+            feature['properties'] = self.__get_edge_group_props(value)
             features.append(feature)
         return features
 
+    def get_edge_groups_as_features_json(self) -> List[bytes]:
+        """Returns the edge groups as GeoJSON features serialized to JSON (see get_edge_groups_as_features).
+        """
+        return [
+            geojson.get_line_feature(self.get_wgs_coords(start, end), self.__get_edge_group_props(value))
+            for value, start, end in self.edge_groups
+        ]
+
     def get_as_geojson_feature(self) -> dict:
-        wgs_coords = [coord for edge in self.edges for coord in edge['coords_wgs']]
-        wgs_coords = geom_utils.round_coordinates(wgs_coords, digits=6)
+        wgs_coords = geom_utils.round_coordinates(self.get_wgs_coords().tolist(), digits=6)
 
         feature_d = self.__get_geojson_feature_dict(wgs_coords)
+        feature_d['properties'] = self.get_geojson_props()
+        return feature_d
+
+    def get_as_geojson_feature_json(self) -> bytes:
+        """Returns the path as GeoJSON feature serialized to JSON (see get_as_geojson_feature).
+        """
+        return geojson.get_line_feature(self.get_wgs_coords(), self.get_geojson_props())
 
+    def get_geojson_props(self) -> dict:
         props = {
             'type' : self.path_type.value,
             'id' : self.name,
@@ -113,8 +151,33 @@ class Path:
         }
         noise_props = self.noise_attrs.get_noise_props_dict() if self.noise_attrs is not None else {}
         aqi_props = self.aqi_attrs.get_aqi_props_dict() if self.aqi_attrs is not None else {}
-        feature_d['properties'] = { **props, **noise_props, **aqi_props }
-        return feature_d
+        return { **props, **noise_props, **aqi_props }
+
+    def get_wgs_coords(self, start: int = 0, end: int = None) -> np.ndarray:
+        """Returns the WGS84 coordinates of the path (or of some of its edges by index range, e.g. of an edge group) as
+        a single array (n x 2).
+        """
+        if (self.__wgs_coords is None):
+            self.__wgs_coords = self.__G.get_path_coords(self.edges.ids, self.__overlay, wgs=True)
+        if (start == 0 and end is None):
+            return self.__wgs_coords
+        coord_offsets = self.__get_coord_offsets()
+        return self.__wgs_coords[coord_offsets[start]:coord_offsets[len(self.edges) if end is None else end]]
+
+    def get_edge_group_coord_ranges(self) -> List[Tuple[int, int, int]]:
+        """Returns the edge groups as (value, start, end) tuples, where start and end (exclusive) are indexes to the
+        coordinates of the path (see get_wgs_coords).
+        """
+        coord_offsets = self.__get_coord_offsets().tolist()
+        return [(value, coord_offsets[start], coord_offsets[end]) for value, start, end in self.edge_groups]
+
+    def __get_coord_offsets(self) -> np.ndarray:
+        """Returns the offsets of the coordinates of the edges in the coordinates of the path (edge count + 1).
+        """
+        return np.concatenate([[0], np.cumsum(self.edges.wgs_counts)])
+
+    def __get_edge_group_props(self, value) -> dict:
+        return { 'value': value, 'path': self.name, 'p_len_diff': self.len_diff, 'p_length': self.length }
 
     def __get_geojson_feature_dict(self, coords: List[tuple]) -> dict:
         """Returns a dictionary with GeoJSON schema and geometry based on the given geometry. The returned dictionary can be used as a
@@ -1,12 +1,16 @@
 from typing import List, Set, Dict, Tuple, Optional
+import numpy as np
 import utils.aq_exposures as aq_exps
 
 class PathAqiAttrs:
-    """Holds and manipulates all AQI related path attributes.
+    """Holds and manipulates all AQI related path attributes. The AQI exposures of the path are given as arrays of
+    the AQI values, AQI classes and lengths of its edges.
     """
 
-    def __init__(self, aqi_exp_list: List[Tuple[float, float]]):
-        self.aqi_exp_list = aqi_exp_list
+    def __init__(self, aqis: np.ndarray, aqi_classes: np.ndarray, lengths: np.ndarray):
+        self.aqis = aqis
+        self.aqi_classes = aqi_classes
+        self.lengths = lengths
         self.aqi_m: float = None
         self.aqc: float = None
         self.aqc_norm: float = None
@@ -18,10 +22,10 @@ class PathAqiAttrs:
         self.aqc_diff_score: float = None
 
     def set_aqi_stats(self, length: float) -> None:
-        self.aqi_m = aq_exps.get_mean_aqi(self.aqi_exp_list)
-        self.aqc = aq_exps.get_total_aqi_cost_from_exps(self.aqi_exp_list)
+        self.aqi_m = aq_exps.get_mean_aqi_from_arrays(self.aqis, self.lengths)
+        self.aqc = aq_exps.get_total_aqi_cost_from_arrays(self.aqis, self.lengths)
         self.aqc_norm = round(self.aqc / length, 3)
-        self.aqi_cl_exps = aq_exps.aggregate_aqi_class_exps(self.aqi_exp_list)
+        self.aqi_cl_exps = aq_exps.aggregate_aqi_class_exps_from_arrays(self.aqi_classes, self.lengths)
         self.aqi_pcts = aq_exps.get_aqi_class_pcts(self.aqi_cl_exps, length)
 
     def set_aqi_diff_attrs(self, s_path_aqi_attrs: 'PathAqiAttrs', len_diff: float) -> None:
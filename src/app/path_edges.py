@@ -0,0 +1,43 @@
+import numpy as np
+
+class PathEdges:
+    """An instance of PathEdges holds the attributes of the edges of a path as arrays (in the order of the path), as
+    gathered from the edge arrays of the graph at once (see GraphHandler.get_path_edges). Edges without geometry (or
+    with length 0) are omitted. The noise exposures are only held as their sums over the edges.
+
+    Attributes:
+        ids: The ids of the edges.
+        lengths: The lengths of the edges.
+        lengths_b: The bike lengths of the edges (0 if missing).
+        aqis: The AQI values of the edges (NaN = missing).
+        aqi_classes: The AQI classes of the edges (0 = missing AQI).
+        db_ranges: The noise level ranges (lower limits) of the mean noise levels of the edges.
+        noises_missing: A boolean array telling whether noise data is missing from the edges.
+        noise_bins: The noise exposures (m) of the edges summed by dB level (see noise_exposures.noise_db_bins).
+        wgs_counts: The numbers of WGS84 coordinates of the edges.
+    """
+    __slots__ = ('ids', 'lengths', 'lengths_b', 'aqis', 'aqi_classes', 'db_ranges', 'noises_missing', 'noise_bins', 'wgs_counts')
+
+    def __init__(self,
+        ids: np.ndarray,
+        lengths: np.ndarray,
+        lengths_b: np.ndarray,
+        aqis: np.ndarray,
+        aqi_classes: np.ndarray,
+        db_ranges: np.ndarray,
+        noises_missing: np.ndarray,
+        noise_bins: np.ndarray,
+        wgs_counts: np.ndarray
+    ):
+        self.ids = ids
+        self.lengths = lengths
+        self.lengths_b = lengths_b
+        self.aqis = aqis
+        self.aqi_classes = aqi_classes
+        self.db_ranges = db_ranges
+        self.noises_missing = noises_missing
+        self.noise_bins = noise_bins
+        self.wgs_counts = wgs_counts
+
+    def __len__(self) -> int:
+        return len(self.ids)
@@ -2,32 +2,61 @@ from typing import List, Set, Dict, Tuple
 import traceback
 import time
 import json
+from shapely.geometry import Point
 import utils.noise_exposures as noise_exps 
 import utils.aq_exposures as aq_exps 
 import utils.geometry as geom_utils
+import utils.geojson as geojson
 import utils.routing as routing_utils
 from app.path import Path
 from app.path_set import PathSet
 from app.graph_handler import GraphHandler
-from app.constants import TravelMode, RoutingMode, PathType
+from app.graph_overlay import GraphOverlay
+from app.constants import TravelMode, RoutingMode, PathType, PathsFormat
 from app.logger import Logger
 from utils.igraphs import Edge as E
 
+exposure_attrs = ['length', 'len_diff', 'nei', 'aqc']
+
+def get_path_names(routing_mode: RoutingMode) -> List[str]:
+    """Returns the names of the shortest path and the green paths (in the order of PathFinder.get_path_weights()).
+    """
+    if (routing_mode == RoutingMode.CLEAN):
+        return ['short'] + ['aq_'+ str(sen) for sen in aq_exps.get_aq_sensitivities()]
+    return ['short'] + ['q_'+ str(sen) for sen in noise_exps.get_noise_sensitivities()]
+
 class PathFinder:
     """An instance of PathFinder is responsible for orchestrating all routing related tasks from finding the 
-    origin & destination nodes to returning the paths as GeoJSON feature collection.
+    origin & destination nodes to returning the paths as GeoJSON feature collection. The nodes & edges linking origin
+    and destination to the graph are held in a graph overlay of the PathFinder, so the (shared) graph is not modified.
+    A batch of routing requests may share a graph overlay (see BatchPathFinder), in which case the (already projected)
+    origin and destination points may also be given.
     
     """
 
-    def __init__(self, logger: Logger, travel_mode: TravelMode, routing_mode: RoutingMode, G: GraphHandler, orig_lat, orig_lon, dest_lat, dest_lon):
+    def __init__(self, 
+        logger: Logger, 
+        travel_mode: TravelMode, 
+        routing_mode: RoutingMode, 
+        G: GraphHandler, 
+        orig_lat, 
+        orig_lon, 
+        dest_lat, 
+        dest_lon, 
+        graph_overlay: GraphOverlay = None,
+        orig_point: Point = None,
+        dest_point: Point = None
+    ):
         self.log = logger
         self.travel_mode = travel_mode
         self.routing_mode = routing_mode
         self.G = G
+        # pin the current AQ columns, so that an AQI update during the request does not affect its paths
+        self.graph_overlay = graph_overlay if graph_overlay else GraphOverlay(G.vcount, G.ecount, G.get_aq_columns())
         orig_latLon = {'lat': float(orig_lat), 'lon': float(orig_lon)}
         dest_latLon = {'lat': float(dest_lat), 'lon': float(dest_lon)}
-        self.orig_point = geom_utils.project_geom(geom_utils.get_point_from_lat_lon(orig_latLon))
-        self.dest_point = geom_utils.project_geom(geom_utils.get_point_from_lat_lon(dest_latLon))
+        self.orig_point = orig_point if orig_point is not None else geom_utils.project_geom(geom_utils.get_point_from_lat_lon(orig_latLon))
+        self.dest_point = dest_point if dest_point is not None else geom_utils.project_geom(geom_utils.get_point_from_lat_lon(dest_latLon))
         self.noise_sens = noise_exps.get_noise_sensitivities()
         self.aq_sens = aq_exps.get_aq_sensitivities()
         self.path_set = PathSet(self.log, routing_mode)
@@ -46,38 +75,62 @@ class PathFinder:
         start_time = time.time()
         try:
             orig_node, dest_node, orig_link_edges, dest_link_edges = routing_utils.get_orig_dest_nodes_and_linking_edges(
-                self.log, self.G, self.orig_point, self.dest_point, self.aq_sens, self.noise_sens, self.G.db_costs)
-            self.orig_node = orig_node
-            self.dest_node = dest_node
-            self.orig_link_edges = orig_link_edges
-            self.dest_link_edges = dest_link_edges
+                self.log, self.G, self.graph_overlay, self.orig_point, self.dest_point, self.aq_sens, self.noise_sens, self.G.db_costs)
+            self.set_origin_dest_nodes(orig_node, dest_node, orig_link_edges, dest_link_edges)
             self.log.duration(start_time, 'origin & destination nodes set', unit='ms', log_level='info')
         except Exception as e:
             self.log.error('exception in finding nearest nodes:')
             self.log.error(traceback.format_exc())
             raise Exception(str(e))
 
-    def find_least_cost_paths(self):
-        """Finds both shortest and least cost paths. 
+    def set_origin_dest_nodes(self, orig_node: dict, dest_node: dict, orig_link_edges: dict, dest_link_edges: dict):
+        self.orig_node = orig_node
+        self.dest_node = dest_node
+        self.orig_link_edges = orig_link_edges
+        self.dest_link_edges = dest_link_edges
+
+    def get_route_cache_key(self, paths_format: PathsFormat = PathsFormat.GEOJSON) -> str:
+        """Returns a key that identifies the routing response of the request (see RouteCache): travel & routing mode,
+        the snapped origin and destination, the name of the AQI data file of the AQ columns used in routing and the
+        format of the response. Thus requests from & to (almost) the same locations on the graph get the same key in
+        all worker processes.
+        """
+        orig_key, dest_key = (
+            '-'.join(str(value) for value in routing_utils.get_snapped_node_key(node, link_edges))
+            for node, link_edges in ((self.orig_node, self.orig_link_edges), (self.dest_node, self.dest_link_edges))
+        )
+        aqi_data = self.graph_overlay.aq_columns.aqi_data
+        return '/'.join([self.travel_mode.value, self.routing_mode.value, orig_key, dest_key, aqi_data if aqi_data else 'no_aqi', paths_format.value])
+
+    def get_path_weights(self) -> List[str]:
+        """Returns the edge attributes by which the shortest path and the green paths are searched (in this order).
+        """
+        sens = self.aq_sens if (self.routing_mode == RoutingMode.CLEAN) else self.noise_sens
+        # use aqi costs if optimizing fresh air (clean) paths - else use noise costs
+        cost_prefix = 'aqc_' if (self.routing_mode == RoutingMode.CLEAN) else 'nc_'
+        cost_prefix = 'b'+ cost_prefix if (self.travel_mode == TravelMode.BIKE) else cost_prefix
+        return [E.length.value] + [cost_prefix + str(sen) for sen in sens]
+
+    def find_least_cost_paths(self, paths: List[List[int]] = None):
+        """Finds both shortest and least cost paths. The paths (as edge ids in the order of get_path_weights()) may also
+        be given, if they were already found by a search shared by many routing requests (see BatchPathFinder).
 
         Raises:
             Only meaningful exception strings that can be shown in UI.
         """
         sens = self.aq_sens if (self.routing_mode == RoutingMode.CLEAN) else self.noise_sens
+        path_names = get_path_names(self.routing_mode)
         try:
             start_time = time.time()
-            shortest_path = self.G.get_least_cost_path(self.orig_node['node'], self.dest_node['node'], weight=E.length.value)
+            # search shortest & all least cost paths at once (sharing the bounding search from the destination)
+            shortest_path, *least_cost_paths = paths if paths else self.G.get_least_cost_paths(
+                self.orig_node['node'], self.dest_node['node'], self.get_path_weights(), overlay=self.graph_overlay)
             self.path_set.set_shortest_path(Path(
                 orig_node=self.orig_node['node'],
                 edge_ids=shortest_path,
                 name='short',
                 path_type=PathType.SHORT))
-            for sen in sens:
-                # use aqi costs if optimizing fresh air (clean) paths - else use noise costs
-                cost_attr = 'aqc_'+ str(sen) if (self.routing_mode == RoutingMode.CLEAN) else 'nc_'+ str(sen)
-                cost_attr = 'b'+ cost_attr if (self.travel_mode == TravelMode.BIKE) else cost_attr
-                path_name = 'aq_'+ str(sen) if (self.routing_mode == RoutingMode.CLEAN) else 'q_'+ str(sen)
-                least_cost_path = self.G.get_least_cost_path(self.orig_node['node'], self.dest_node['node'], weight=cost_attr)
+            for sen, path_name, least_cost_path in zip(sens, path_names[1:], least_cost_paths):
                 self.path_set.add_green_path(Path(
                     orig_node=self.orig_node['node'],
                     edge_ids=least_cost_path,
@@ -90,6 +143,15 @@ class PathFinder:
             self.log.error(traceback.format_exc())
             raise Exception('Could not find paths')
 
+    def get_path_exposures(self) -> List[List[float]]:
+        """Returns the length, len_diff, nei and aqc (exposure_attrs) of the shortest path and the green paths (in the 
+        order of get_path_names) without loading the edges of the paths (see GraphHandler.get_path_exposures). Unlike
+        in process_paths_to_FC, none of the paths are filtered out. Missing exposures are None.
+        """
+        exposures = [self.G.get_path_exposures(path.edge_ids, self.graph_overlay) for path in self.path_set.get_all_paths()]
+        shortest_length = exposures[0][0]
+        return [[length, round(length - shortest_length, 1), nei, aqc] for length, nei, aqc in exposures]
+
     def process_paths_to_FC(self, edges: bool = True, FCs_to_files: bool = False) -> dict:
         """Loads & collects path attributes from the graph for all paths. Also aggregates and filters out nearly identical 
         paths based on geometries and length. 
@@ -99,16 +161,8 @@ class PathFinder:
         Raises:
             Only meaningful exception strings that can be shown in UI.
         """
-        start_time = time.time()
         try:
-            self.path_set.filter_out_unique_edge_sequence_paths()
-            self.path_set.set_path_edges(self.G)
-            self.path_set.aggregate_path_attrs()
-            self.path_set.filter_out_green_paths_missing_exp_data()
-            self.path_set.set_path_exp_attrs(self.G.db_costs)
-            self.path_set.filter_out_unique_geom_paths(buffer_m=50)
-            self.path_set.set_green_path_diff_attrs()
-            self.log.duration(start_time, 'aggregated paths', unit='ms', log_level='info')
+            self.__aggregate_paths()
             
             start_time = time.time()
             path_FC = self.path_set.get_paths_as_feature_collection()
@@ -131,12 +185,56 @@ class PathFinder:
             self.log.error(traceback.format_exc())
             raise Exception('Error in processing paths')
 
-    def delete_added_graph_features(self):
-        """Keeps a graph clean by removing new nodes & edges created during routing from the graph.
+    def process_paths_to_json(self, edges: bool = True) -> bytes:
+        """Same as process_paths_to_FC, but writes the FeatureCollections directly to a serialized JSON object
+        ({ path_FC, edge_FC }) from the coordinate arrays of the paths, without building them as dictionaries first.
+
+        Raises:
+            Only meaningful exception strings that can be shown in UI.
         """
-        self.log.debug('deleting created nodes & edges from the graph')
-        self.G.delete_added_linking_edges(
-            orig_edges=self.orig_link_edges,
-            orig_node=self.orig_node, 
-            dest_edges=self.dest_link_edges,
-            dest_node=self.dest_node)
+        try:
+            self.__aggregate_paths()
+
+            start_time = time.time()
+            FCs = { 'path_FC': self.path_set.get_paths_as_feature_collection_json() }
+            if (edges == True):
+                FCs['edge_FC'] = self.path_set.get_edges_as_feature_collection_json()
+
+            self.log.duration(start_time, 'serialized paths & edges to JSON', unit='ms', log_level='info')
+            return geojson.get_json_object(FCs)
+
+        except Exception:
+            self.log.error('exception in processing paths:')
+            self.log.error(traceback.format_exc())
+            raise Exception('Error in processing paths')
+
+    def process_paths_to_compact(self, paths_format: PathsFormat) -> bytes:
+        """Same as process_paths_to_json, but returns the paths in a compact format (polyline or binary) in which the
+        edge groups are coordinate index ranges of the paths (see utils/compact_paths.py).
+
+        Raises:
+            Only meaningful exception strings that can be shown in UI.
+        """
+        try:
+            self.__aggregate_paths()
+
+            start_time = time.time()
+            paths = self.path_set.get_paths_as_compact(paths_format)
+            self.log.duration(start_time, f'encoded paths & edges as {paths_format.value}', unit='ms', log_level='info')
+            return paths
+
+        except Exception:
+            self.log.error('exception in processing paths:')
+            self.log.error(traceback.format_exc())
+            raise Exception('Error in processing paths')
+
+    def __aggregate_paths(self) -> None:
+        start_time = time.time()
+        self.path_set.filter_out_unique_edge_sequence_paths()
+        self.path_set.set_path_edges(self.G, self.graph_overlay)
+        self.path_set.aggregate_path_attrs()
+        self.path_set.filter_out_green_paths_missing_exp_data()
+        self.path_set.set_path_exp_attrs(self.G.db_cost_vector)
+        self.path_set.filter_out_unique_geom_paths(buffer_m=50)
+        self.path_set.set_green_path_diff_attrs()
+        self.log.duration(start_time, 'aggregated paths', unit='ms', log_level='info')
@@ -1,12 +1,18 @@
 from typing import List, Set, Dict, Tuple, Optional
+import numpy as np
 import utils.noise_exposures as noise_exps
+from utils.compiled_graphs import round_array, get_noises_from_bins
 
 class PathNoiseAttrs:
-    """Holds and manipulates all noise exposure related path attributes.
+    """Holds and manipulates all noise exposure related path attributes. The noise exposures of the path are given
+    as already aggregated over its edges as a vector of exposures by dB level (see noise_exposures.noise_db_bins),
+    from which all noise stats of the path are calculated at once.
     """
 
-    def __init__(self, noises_list: dict):
-        self.noises: dict = noise_exps.aggregate_exposures(noises_list)
+    def __init__(self, noise_bins: np.ndarray):
+        # rounded as the aggregated noise exposures (see noise_exposures.aggregate_exposures)
+        self.noise_bins: np.ndarray = round_array(noise_bins, 2)
+        self.noises: dict = get_noises_from_bins(self.noise_bins)
         self.mdB: float = None
         self.nei: float = None
         self.nei_norm: float = None
@@ -17,13 +23,13 @@ class PathNoiseAttrs:
         self.nei_diff_rat: float = None
         self.nei_diff_score: float = None
 
-    def set_noise_attrs(self, db_costs: dict, length: float) -> None:
+    def set_noise_attrs(self, db_cost_vector: np.ndarray, length: float) -> None:
         if self.noises:
-            self.mdB = noise_exps.get_mean_noise_level(self.noises, length)
-            self.nei = round(noise_exps.get_noise_cost(noises=self.noises, db_costs=db_costs), 1)
-            max_db_cost = max(db_costs.values())
+            self.mdB = noise_exps.get_mean_noise_level_from_bins(self.noise_bins, length)
+            self.nei = round(noise_exps.get_noise_cost_from_bins(self.noise_bins, db_cost_vector), 1)
+            max_db_cost = float(db_cost_vector.max())
             self.nei_norm = round(self.nei / (max_db_cost * length), 4)
-            self.noise_range_exps = noise_exps.get_noise_range_exps(self.noises, length)
+            self.noise_range_exps = noise_exps.get_noise_range_exps_from_bins(self.noise_bins)
             self.noise_pcts = noise_exps.get_noise_range_pcts(self.noise_range_exps, length)
 
     def set_noise_diff_attrs(self, s_path_noise_attrs, len_diff=0) -> None:
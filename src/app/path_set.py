@@ -1,6 +1,8 @@
 from typing import List, Set, Dict, Tuple
 import utils.paths_overlay_filter as path_overlay_filter
-from app.constants import RoutingMode, PathType
+import utils.geojson as geojson
+import utils.compact_paths as compact_paths
+from app.constants import RoutingMode, PathType, PathsFormat
 from app.logger import Logger
 from app.path import Path
 
@@ -24,14 +26,14 @@ class PathSet:
 
     def get_green_path_count(self) -> int: return len(self.green_paths)
 
-    def set_path_edges(self, G) -> None:
+    def set_path_edges(self, G, overlay=None) -> None:
         """Loads edges for all paths in the set from a graph (based on node lists of the paths).
         """
         if (self.shortest_path is not None):
-            self.shortest_path.set_path_edges(G)
+            self.shortest_path.set_path_edges(G, overlay)
         if (len(self.green_paths) > 0):
             for gp in self.green_paths:
-                gp.set_path_edges(G)
+                gp.set_path_edges(G, overlay)
 
     def aggregate_path_attrs(self) -> None:
         """Aggregates edge level path attributes to paths.
@@ -84,11 +86,11 @@ class PathSet:
             filtered_green_paths = filtered_green_paths[1:]
         self.green_paths = filtered_green_paths
 
-    def set_path_exp_attrs(self, db_costs) -> None:
-        self.shortest_path.set_noise_attrs(db_costs)
+    def set_path_exp_attrs(self, db_cost_vector) -> None:
+        self.shortest_path.set_noise_attrs(db_cost_vector)
         self.shortest_path.set_aqi_attrs()
         for path in self.green_paths:
-            path.set_noise_attrs(db_costs)
+            path.set_noise_attrs(db_cost_vector)
             path.set_aqi_attrs()
 
     def set_green_path_diff_attrs(self) -> None:
@@ -99,7 +101,43 @@ class PathSet:
         feats = [path.get_as_geojson_feature() for path in [self.shortest_path] + self.green_paths]
         return self.__as_geojson_feature_collection(feats)
 
+    def get_paths_as_feature_collection_json(self) -> bytes:
+        """Returns the paths as GeoJSON FeatureCollection serialized to JSON (without building it as a dictionary first).
+        """
+        return geojson.get_feature_collection([path.get_as_geojson_feature_json() for path in self.get_all_paths()])
+
     def get_edges_as_feature_collection(self) -> dict:
+        self.__aggregate_edge_groups()
+        feat_lists = [path.get_edge_groups_as_features() for path in [self.shortest_path] + self.green_paths]
+
+        feats = [feat for feat_list in feat_lists for feat in feat_list]
+        return self.__as_geojson_feature_collection(feats)
+
+    def get_edges_as_feature_collection_json(self) -> bytes:
+        """Returns the edge groups of the paths as GeoJSON FeatureCollection serialized to JSON (without building it 
+        as a dictionary first).
+        """
+        self.__aggregate_edge_groups()
+        return geojson.get_feature_collection([feat for path in self.get_all_paths() for feat in path.get_edge_groups_as_features_json()])
+
+    def get_paths_as_compact(self, paths_format: PathsFormat) -> bytes:
+        """Returns the paths and their edge groups in a compact format (polyline or binary, see utils/compact_paths.py),
+        where the edge groups are coordinate index ranges of the paths instead of duplicated lines.
+        """
+        edge_group_attr = self.__aggregate_edge_groups()
+        paths = self.get_all_paths()
+        coord_arrays = [path.get_wgs_coords() for path in paths]
+        props = [path.get_geojson_props() for path in paths]
+        edge_groups = [
+            [path_idx, start, end, value]
+            for path_idx, path in enumerate(paths) 
+            for value, start, end in path.get_edge_group_coord_ranges()
+        ]
+        if (paths_format == PathsFormat.POLYLINE):
+            return compact_paths.get_polyline_paths(coord_arrays, props, edge_group_attr, edge_groups)
+        return compact_paths.get_binary_paths(coord_arrays, props, edge_group_attr, edge_groups)
+
+    def __aggregate_edge_groups(self) -> str:
         if (self.routing_mode == RoutingMode.CLEAN):
             edge_group_attr = 'aqi_cl'
         else:
@@ -107,11 +145,7 @@ class PathSet:
         
         for path in [self.shortest_path] + self.green_paths:
             path.aggregate_edge_groups_by_attr(edge_group_attr)
-        
-        feat_lists = [path.get_edge_groups_as_features() for path in [self.shortest_path] + self.green_paths]
-
-        feats = [feat for feat_list in feat_lists for feat in feat_list]
-        return self.__as_geojson_feature_collection(feats)
+        return edge_group_attr
 
     def __as_geojson_feature_collection(self, features: List[dict]) -> dict:
         return {
@@ -0,0 +1,250 @@
+from typing import Hashable, Optional
+from collections import OrderedDict
+import hashlib
+import itertools
+import os
+import tempfile
+import threading
+from app.logger import Logger
+
+class RouteCacheBackend:
+    """A route cache backend holds routing responses (as serialized bytes) shared by all worker processes (and possibly
+    by all replicas) of the routing API. The backends should never fail a routing request: errors are logged and
+    handled as cache misses.
+    """
+
+    name = 'none'
+
+    def get(self, key: str) -> Optional[bytes]:
+        return None
+
+    def put(self, key: str, value: bytes) -> None:
+        pass
+
+class FileRouteCacheBackend(RouteCacheBackend):
+    """Holds the responses as files in a directory that is shared by the worker processes of a host, by default
+    in shared memory (/dev/shm) if available. The files are written atomically (renamed after writing) so that other
+    processes never read partial responses. The least recently used files are removed when the number of files exceeds
+    max_entries or their total size exceeds max_bytes (checked every prune_interval additions per process). Note that
+    the files in shared memory count against the memory limit of the container.
+    """
+
+    name = 'file'
+
+    def __init__(self, 
+        logger: Logger, 
+        directory: str = None, 
+        max_entries: int = 5000, 
+        max_bytes: int = 32 * 1024 * 1024, 
+        prune_interval: int = 100
+    ):
+        self.log = logger
+        if (directory is None):
+            shm_dir = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+            directory = os.path.join(shm_dir, 'green_paths_route_cache')
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.prune_interval = prune_interval
+        self.__put_counter = itertools.count(1)
+
+    def __get_file_path(self, key: str) -> str:
+        return os.path.join(self.directory, hashlib.sha1(key.encode('utf-8')).hexdigest())
+
+    def get(self, key: str) -> Optional[bytes]:
+        file_path = self.__get_file_path(key)
+        try:
+            with open(file_path, 'rb') as cache_file:
+                value = cache_file.read()
+            # the modification time of a file is the time of its latest use
+            os.utime(file_path)
+            return value
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            self.log.warning(f'could not read route cache file: {e}')
+            return None
+
+    def put(self, key: str, value: bytes) -> None:
+        file_path = self.__get_file_path(key)
+        tmp_file_path = f'{file_path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        try:
+            with open(tmp_file_path, 'wb') as cache_file:
+                cache_file.write(value)
+            os.replace(tmp_file_path, file_path)
+        except Exception as e:
+            self.log.warning(f'could not write route cache file: {e}')
+            # prune skips the tmp files of the writes in progress, hence the failed ones need to be removed here
+            try:
+                os.remove(tmp_file_path)
+            except OSError:
+                pass
+            return
+        # the counter is shared by the threads of the process (next() is atomic)
+        if (next(self.__put_counter) % self.prune_interval == 0):
+            self.prune()
+
+    def prune(self) -> None:
+        """Removes the least recently used files exceeding max_entries or max_bytes.
+        """
+        files = []
+        for entry in os.scandir(self.directory):
+            try:
+                if not entry.name.endswith('.tmp'):
+                    stat = entry.stat()
+                    files.append((stat.st_mtime, stat.st_size, entry.path))
+            except FileNotFoundError:
+                continue
+        # keep the most recently used files within the limits
+        total_bytes = 0
+        for idx, (_, size, file_path) in enumerate(sorted(files, reverse=True)):
+            total_bytes += size
+            if (idx < self.max_entries and total_bytes <= self.max_bytes):
+                continue
+            try:
+                os.remove(file_path)
+            except FileNotFoundError:
+                continue
+
+class RedisRouteCacheBackend(RouteCacheBackend):
+    """Holds the responses in Redis (shared by all replicas). Requires the optional redis package. The responses
+    expire after ttl seconds (if not evicted by Redis before that).
+    """
+
+    name = 'redis'
+
+    def __init__(self, logger: Logger, url: str, ttl: int = 3600, prefix: str = 'green_paths_route:'):
+        import redis
+        self.log = logger
+        self.ttl = ttl
+        self.prefix = prefix
+        self.__client = redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+
+    def get(self, key: str) -> Optional[bytes]:
+        try:
+            return self.__client.get(self.prefix + key)
+        except Exception as e:
+            self.log.warning(f'could not read route cache from redis: {e}')
+            return None
+
+    def put(self, key: str, value: bytes) -> None:
+        try:
+            self.__client.set(self.prefix + key, value, ex=self.ttl)
+        except Exception as e:
+            self.log.warning(f'could not write route cache to redis: {e}')
+
+def get_route_cache_backend(
+    logger: Logger, 
+    backend: str = 'none', 
+    directory: str = None, 
+    url: str = None, 
+    max_bytes: int = 32 * 1024 * 1024
+    ) -> RouteCacheBackend:
+    """Returns a route cache backend by name: file, redis or none. Falls back to the file backend if the redis backend
+    cannot be used (e.g. redis is not installed or url is not given).
+    """
+    if (backend == 'redis'):
+        try:
+            if (not url):
+                raise ValueError('url of redis is not set')
+            return RedisRouteCacheBackend(logger, url)
+        except Exception as e:
+            logger.warning(f'could not use redis route cache ({e}), using file route cache instead')
+            backend = 'file'
+    if (backend == 'file'):
+        try:
+            return FileRouteCacheBackend(logger, directory, max_bytes=max_bytes)
+        except Exception as e:
+            logger.warning(f'could not use file route cache: {e}')
+    return RouteCacheBackend()
+
+class RouteCache:
+    """An instance of RouteCache holds the finished responses (e.g. path & edge FeatureCollections as serialized JSON)
+    of recent routing requests, so that popular OD pairs need not be routed again. The cache is bounded to max_size
+    entries and the least recently used entries are evicted first. Responses that are not found in the cache of the
+    process are looked up from the (optional) shared backend, which holds the responses of all worker processes.
+
+    The keys should identify everything that the response depends on: the snapped origin and destination and the
+    travel and routing mode as well as the AQI data used in routing (see PathFinder.get_route_cache_key). Hence
+    responses based on previous AQI data are never served, and GraphAqiUpdater clears them from the cache as soon as
+    new AQI data is published.
+
+    Attributes:
+        max_size: The maximum number of responses held in the cache (0 = caching is disabled).
+        backend: A RouteCacheBackend shared by the worker processes.
+        hits: The number of requests that were served from the cache of the process.
+        shared_hits: The number of requests that were served from the shared backend.
+        misses: The number of requests that were not found in the cache.
+        generation: The latest generation of AQ columns of which responses were added to the cache.
+    """
+
+    def __init__(self, max_size: int = 500, backend: RouteCacheBackend = None):
+        self.max_size = max_size
+        self.backend = backend if backend else RouteCacheBackend()
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.generation = 0
+        self.__entries: OrderedDict = OrderedDict()
+        self.__lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[bytes]:
+        """Returns the cached response by key (or None if not found) and marks it as the most recently used one.
+        """
+        if (self.max_size <= 0):
+            return None
+        with self.__lock:
+            value = self.__entries.get(key)
+            if (value is not None):
+                self.__entries.move_to_end(key)
+                self.hits += 1
+                return value
+        value = self.backend.get(key)
+        with self.__lock:
+            if (value is None):
+                self.misses += 1
+                return None
+            self.shared_hits += 1
+            self.__add(key, value)
+        return value
+
+    def put(self, key: Hashable, value: bytes, generation: int = 0) -> None:
+        """Adds a response to the cache and to the shared backend (evicting the least recently used ones if the cache
+        is full). Responses of a previous generation of AQ columns (than the latest added to the cache) are not added.
+        """
+        if (self.max_size <= 0 or value is None):
+            return
+        with self.__lock:
+            if (generation < self.generation):
+                return
+            self.generation = generation
+            self.__add(key, value)
+        self.backend.put(key, value)
+
+    def __add(self, key: Hashable, value: bytes) -> None:
+        self.__entries[key] = value
+        self.__entries.move_to_end(key)
+        while (len(self.__entries) > self.max_size):
+            self.__entries.popitem(last=False)
+
+    def invalidate(self, generation: int) -> None:
+        """Removes all responses from the cache, e.g. when a new generation of AQ columns has been published.
+        """
+        with self.__lock:
+            self.generation = max(self.generation, generation)
+            self.__entries.clear()
+
+    def __len__(self) -> int:
+        return len(self.__entries)
+
+    def get_status(self) -> dict:
+        return {
+            'size': len(self.__entries),
+            'max_size': self.max_size,
+            'backend': self.backend.name,
+            'hits': self.hits,
+            'shared_hits': self.shared_hits,
+            'misses': self.misses,
+            'generation': self.generation
+        }
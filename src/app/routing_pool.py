@@ -0,0 +1,84 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict
+from app.logger import Logger
+
+class RoutingPoolFullException(Exception):
+    pass
+
+class RoutingPool:
+    """An instance of RoutingPool runs the (blocking) routing tasks of an async front end (see green_paths_asgi.py) in
+    a bounded pool of threads, so that the event loop only handles the connections of the clients. If the pool has
+    already as many tasks as it can run and queue, new tasks are rejected (RoutingPoolFullException) instead of queued
+    (the front end responds with 503).
+
+    Identical tasks (by key, e.g. the route cache key of a routing request) that are in flight at the same time are
+    coalesced: they all wait for the result of the same computation. A coalesced task is not cancelled if some (or all)
+    of the requests waiting for it are cancelled (e.g. by disconnected clients), so its result is still cached.
+
+    The pool must only be used from the thread of the event loop, so the counters and in-flight tasks need no locking.
+
+    Attributes:
+        executor: A thread pool in which the tasks are run.
+        max_tasks: The maximum number of running and queued tasks.
+        pending: The number of running and queued tasks.
+        in_flight: Futures of the running and queued tasks by key.
+        stats: Counts of the run, coalesced and rejected tasks.
+    """
+
+    def __init__(self, logger: Logger, max_workers: int = 4, max_queued: int = 16):
+        self.log = logger
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='routing')
+        self.max_tasks = max_workers + max_queued
+        self.pending = 0
+        self.in_flight: Dict[str, asyncio.Future] = {}
+        self.stats = { 'run': 0, 'coalesced': 0, 'rejected': 0 }
+
+    async def run(self, func: Callable, *args):
+        """Runs a function in the pool and returns its result.
+
+        Raises:
+            RoutingPoolFullException if the pool has no room for the task.
+        """
+        if (self.pending >= self.max_tasks):
+            self.stats['rejected'] += 1
+            self.log.warning(f'routing pool is full ({self.pending} tasks): rejected a task')
+            raise RoutingPoolFullException('Too many routing requests, please try again later')
+        self.pending += 1
+        self.stats['run'] += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+        finally:
+            self.pending -= 1
+
+    async def run_coalesced(self, key: str, func: Callable, *args):
+        """Runs a function in the pool (as run), unless a task with the same key is already in flight, in which case
+        the result of that task is returned.
+        """
+        future = self.in_flight.get(key)
+        if (future is None):
+            future = asyncio.ensure_future(self.run(func, *args))
+            self.in_flight[key] = future
+            future.add_done_callback(lambda done: self.__on_done(key, done))
+        else:
+            self.stats['coalesced'] += 1
+            self.log.debug(f'coalesced routing request: {key}')
+        # shielded, so that a cancelled request does not cancel the task of the others
+        return await asyncio.shield(future)
+
+    def __on_done(self, key: str, future: asyncio.Future) -> None:
+        self.in_flight.pop(key, None)
+        # retrieve the exception, as all requests waiting for the task may have been cancelled
+        if (not future.cancelled() and future.exception()):
+            self.log.debug(f'routing task failed: {key}')
+
+    def get_status(self) -> dict:
+        return {
+            'max_tasks': self.max_tasks,
+            'pending': self.pending,
+            'in_flight': len(self.in_flight),
+            **self.stats
+        }
+
+    def shutdown(self) -> None:
+        self.executor.shutdown(wait=False)
@@ -0,0 +1,131 @@
+import math
+from typing import Tuple
+import numpy as np
+
+class SnappingIndex:
+    """An instance of SnappingIndex finds the nearest node and the nearest edge (with the nearest point on it) to a
+    location. The nodes and the line segments of the edge geometries are bucketed to a uniform grid of cell_size (m)
+    cells, so that the candidates within a search radius are found by slicing a few rows of the grid. Distances to
+    the candidates are then calculated at once with NumPy.
+
+    Attributes:
+        origin: The minimum x and y of the grid.
+        shape: The number of columns and rows of the grid.
+        node_xy: The coordinates of the nodes (vcount x 2).
+        node_offsets, node_ids: The ids of the nodes in each cell in CSR format (by cell index).
+        coords: The packed coordinate buffer of the edge geometries.
+        seg_offsets, seg_starts, seg_edges: The line segments in each cell in CSR format (by cell index): each
+            segment is given by the index of its first coordinate in coords and by the id of its edge.
+    """
+
+    def __init__(self,
+        node_xy: np.ndarray,
+        edge_ids: np.ndarray,
+        geom_offsets: np.ndarray,
+        geom_coords: np.ndarray,
+        cell_size: float = 100.0
+    ):
+        self.cell_size = cell_size
+        # (plain ndarray views of memory-mapped arrays are faster to index)
+        self.node_xy = np.asarray(node_xy)
+        self.coords = np.asarray(geom_coords)
+        xy = np.concatenate((node_xy, geom_coords)) if len(geom_coords) else node_xy
+        self.origin = tuple(xy.min(axis=0).tolist())
+        self.shape = tuple((np.floor((xy.max(axis=0) - self.origin) / cell_size).astype(np.int64) + 1).tolist())
+
+        node_cells = self.__get_cell_index(*self.__get_cells(node_xy))
+        self.node_offsets, self.node_ids = self.__get_csr(node_cells, np.arange(len(node_xy), dtype=np.int32))
+
+        # line segments of the edges (by the index of their first coordinate)
+        edge_ids = np.asarray(edge_ids, dtype=np.int64)
+        seg_counts = np.maximum(geom_offsets[edge_ids + 1] - geom_offsets[edge_ids] - 1, 0)
+        seg_edges = np.repeat(edge_ids, seg_counts)
+        seg_starts = np.repeat(geom_offsets[edge_ids] - np.cumsum(seg_counts) + seg_counts, seg_counts) + np.arange(seg_counts.sum())
+        # bucket each segment to all cells that its bounding box overlaps
+        ix0, iy0 = self.__get_cells(np.minimum(geom_coords[seg_starts], geom_coords[seg_starts + 1]))
+        ix1, iy1 = self.__get_cells(np.maximum(geom_coords[seg_starts], geom_coords[seg_starts + 1]))
+        widths = ix1 - ix0 + 1
+        cell_counts = widths * (iy1 - iy0 + 1)
+        seg_idxs = np.repeat(np.arange(len(seg_starts)), cell_counts)
+        local_idxs = np.arange(cell_counts.sum()) - np.repeat(np.cumsum(cell_counts) - cell_counts, cell_counts)
+        seg_cells = self.__get_cell_index(
+            ix0[seg_idxs] + local_idxs % widths[seg_idxs],
+            iy0[seg_idxs] + local_idxs // widths[seg_idxs])
+        self.seg_offsets, seg_idxs = self.__get_csr(seg_cells, seg_idxs)
+        self.seg_starts = seg_starts[seg_idxs].astype(np.int64)
+        self.seg_edges = seg_edges[seg_idxs].astype(np.int32)
+
+    def __get_cells(self, xy: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        cells = np.floor((np.asarray(xy, dtype=np.float64).reshape(-1, 2) - self.origin) / self.cell_size).astype(np.int64)
+        return np.clip(cells[:, 0], 0, self.shape[0] - 1), np.clip(cells[:, 1], 0, self.shape[1] - 1)
+
+    def __get_cell(self, x: float, y: float) -> Tuple[int, int]:
+        ix = math.floor((x - self.origin[0]) / self.cell_size)
+        iy = math.floor((y - self.origin[1]) / self.cell_size)
+        return ix, iy
+
+    def __get_cell_index(self, ix: np.ndarray, iy: np.ndarray) -> np.ndarray:
+        return iy * self.shape[0] + ix
+
+    def __get_csr(self, cells: np.ndarray, values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        order = np.argsort(cells, kind='stable')
+        offsets = np.zeros(self.shape[0] * self.shape[1] + 1, dtype=np.int64)
+        np.cumsum(np.bincount(cells, minlength=self.shape[0] * self.shape[1]), out=offsets[1:])
+        return offsets, values[order]
+
+    def __get_candidates(self, offsets: np.ndarray, x: float, y: float, radius: float) -> np.ndarray:
+        """Returns the positions (in CSR values) of the nodes or segments in the cells that overlap the bounding box of
+        the search radius. The cells of each row of the grid are consecutive in the CSR values.
+        """
+        ix0, iy0 = self.__get_cell(x - radius, y - radius)
+        ix1, iy1 = self.__get_cell(x + radius, y + radius)
+        if (ix1 < 0 or iy1 < 0 or ix0 >= self.shape[0] or iy0 >= self.shape[1]):
+            return np.empty(0, dtype=np.int64)
+        ix0, iy0 = max(ix0, 0), max(iy0, 0)
+        ix1, iy1 = min(ix1, self.shape[0] - 1), min(iy1, self.shape[1] - 1)
+        rows = [
+            np.arange(offsets[iy * self.shape[0] + ix0], offsets[iy * self.shape[0] + ix1 + 1])
+            for iy in range(iy0, iy1 + 1)
+            ]
+        return np.concatenate(rows) if len(rows) > 1 else rows[0]
+
+    def find_nearest_node(self, x: float, y: float, radii: Tuple[float] = (50, 100, 500)) -> Tuple[int, float]:
+        """Returns the id of the nearest node and its distance to (x, y). The search radius is expanded through the
+        given radii until a node is found within the radius. If none is found, the nearest node in the cells of the
+        largest radius is returned (or None if there are no nodes in them).
+        """
+        for radius in radii:
+            node_ids = np.sort(self.node_ids[self.__get_candidates(self.node_offsets, x, y, radius)])
+            if (len(node_ids) == 0):
+                continue
+            dists = np.hypot(self.node_xy[node_ids, 0] - x, self.node_xy[node_ids, 1] - y)
+            nearest = np.argmin(dists)
+            if (dists[nearest] <= radius):
+                break
+        if (len(node_ids) == 0):
+            return None
+        return int(node_ids[nearest]), float(dists[nearest])
+
+    def find_nearest_edge(self, x: float, y: float, radii: Tuple[float] = (35, 150, 400, 650)) -> Tuple[int, float, Tuple[float, float]]:
+        """Returns the id of the nearest edge, its distance to (x, y) and the nearest point on the edge. The search
+        radius is expanded as in find_nearest_node. Of edges at the same distance, the one with the lowest id is returned.
+        """
+        for radius in radii:
+            seg_idxs = self.__get_candidates(self.seg_offsets, x, y, radius)
+            if (len(seg_idxs) == 0):
+                continue
+            starts = self.seg_starts[seg_idxs]
+            a = self.coords[starts]
+            d = self.coords[starts + 1] - a
+            dd = (d * d).sum(axis=1)
+            t = np.clip(((x - a[:, 0]) * d[:, 0] + (y - a[:, 1]) * d[:, 1]) / np.where(dd > 0, dd, 1.0), 0.0, 1.0)
+            points = a + t[:, None] * d
+            dists = np.hypot(points[:, 0] - x, points[:, 1] - y)
+            min_dist = dists.min()
+            if (min_dist < radius):
+                break
+        if (len(seg_idxs) == 0):
+            return None
+        nearest_segs = np.flatnonzero(dists == min_dist)
+        nearest = nearest_segs[np.argmin(self.seg_edges[seg_idxs[nearest_segs]])]
+        return int(self.seg_edges[seg_idxs[nearest]]), float(min_dist), tuple(points[nearest].tolist())
@@ -0,0 +1,75 @@
+"""
+Compares the cold-start time and memory usage of reading a graph from GraphML vs. from the compiled format.
+Each read is done in a fresh Python process so that the measurements are not affected by earlier reads.
+Besides the peak RSS, the private memory of the process is reported (on Linux): the memory-mapped arrays of
+the compiled graph are shared between worker processes and hence do not count as private memory.
+
+Usage (in the src directory):
+    python -m benchmarks.graph_load graphs/kumpula.graphml [repeats]
+
+"""
+
+import sys
+import json
+import time
+import resource
+import subprocess
+import numpy as np
+import utils.igraphs as ig_utils
+import utils.compiled_graphs as compiled_graphs
+import utils.noise_exposures as noise_exps
+
+def get_private_memory_mb() -> float:
+    """Returns the private (not shared) memory of the current process (MB) or None if not available.
+    """
+    try:
+        with open('/proc/self/smaps_rollup', 'r') as smaps:
+            private_kb = sum(int(line.split()[1]) for line in smaps if line.startswith('Private_'))
+        return round(private_kb / 1024, 1)
+    except OSError:
+        return None
+
+def read_graph(graph_format: str, graph_file: str) -> dict:
+    """Reads the graph arrays in the given format (as GraphHandler does) and returns the duration of the read (s), the 
+    peak RSS of the process (MB) and the private memory of the process (MB).
+    """
+    start_time = time.time()
+    if (graph_format == 'graphml'):
+        meta, arrays = compiled_graphs.get_compiled_arrays(ig_utils.read_graphml(graph_file))
+        compiled_graphs.add_noise_cost_arrays(meta, arrays, noise_exps.get_db_costs(version=3), noise_exps.get_noise_sensitivities())
+    else:
+        meta, arrays = compiled_graphs.read_compiled_arrays(compiled_graphs.get_compiled_graph_dir(graph_file))
+        # touch all pages of the memory-mapped arrays for a fair comparison
+        for array in arrays.values(): np.sum(array)
+    duration = time.time() - start_time
+    peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return { 
+        'format': graph_format, 
+        'ecount': meta['ecount'], 
+        'time_s': round(duration, 2), 
+        'peak_rss_mb': round(peak_rss_mb, 1), 
+        'private_mb': get_private_memory_mb() 
+        }
+
+def run_in_subprocess(graph_format: str, graph_file: str) -> dict:
+    output = subprocess.run(
+        [sys.executable, '-m', 'benchmarks.graph_load', '--read', graph_format, graph_file],
+        check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+if __name__ == '__main__':
+    if (sys.argv[1] == '--read'):
+        print(json.dumps(read_graph(sys.argv[2], sys.argv[3])))
+        sys.exit(0)
+
+    graph_file = sys.argv[1]
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    if (not compiled_graphs.compiled_graph_exists(compiled_graphs.get_compiled_graph_dir(graph_file))):
+        sys.exit(f'compiled graph not found for {graph_file}, run: python compile_graph.py {graph_file}')
+
+    for graph_format in ['graphml', 'compiled']:
+        results = [run_in_subprocess(graph_format, graph_file) for _ in range(repeats)]
+        print(f'{graph_format:>8}: edges: {results[0]["ecount"]}'
+            f' - time (s): {min(r["time_s"] for r in results)} (best of {repeats})'
+            f' - peak RSS (MB): {max(r["peak_rss_mb"] for r in results)}'
+            f' - private memory (MB): {max(r["private_mb"] or 0 for r in results)}')
@@ -0,0 +1,72 @@
+"""
+Compares the least cost path search algorithms of GraphHandler.get_least_cost_path (Dijkstra's algorithm, bidirectional
+A* and A* with landmark lower bounds) over the test OD pairs (data/tests/test_OD_lines.geojson). For each algorithm and 
+edge cost attribute (length and noise costs), the mean number of settled nodes and the mean latency of the search are 
+reported. The costs of the found paths are also compared to the ones found by Dijkstra's algorithm, as all algorithms 
+should find equally good paths.
+
+Usage (in the src directory):
+    python -m benchmarks.path_search [repeats] [--hma]
+
+"""
+
+import sys
+import time
+from typing import List, Dict
+import numpy as np
+import utils.noise_exposures as noise_exps
+from utils.path_search import SearchAlgorithm
+from utils.igraphs import Edge as E
+from app.graph_handler import GraphHandler
+from app.graph_overlay import GraphOverlay
+from app.path_finder import PathFinder
+from app.constants import TravelMode, RoutingMode
+from app.logger import Logger
+from tests.test_utils import get_test_ODs
+
+def get_path_cost(G: GraphHandler, overlay: GraphOverlay, path: List[int], weight: str) -> float:
+    weights = G.get_edge_array(weight)
+    return sum(overlay.edges[edge_id][weight] if edge_id in overlay.edges else weights[edge_id] for edge_id in path)
+
+def run_searches(log: Logger, G: GraphHandler, weights: List[str], repeats: int) -> Dict[str, Dict[str, list]]:
+    """Runs the searches for all test OD pairs and returns the numbers of settled nodes, latencies (ms) and path
+    costs by algorithm and weight.
+    """
+    results = {
+        algorithm.value: { weight: { 'settled': [], 'ms': [], 'cost': [] } for weight in weights }
+        for algorithm in SearchAlgorithm
+    }
+    for od in get_test_ODs().values():
+        path_finder = PathFinder(log, TravelMode.WALK, RoutingMode.QUIET, G,
+            od['orig_latLon']['lat'], od['orig_latLon']['lon'], od['dest_latLon']['lat'], od['dest_latLon']['lon'])
+        path_finder.find_origin_dest_nodes()
+        orig_node, dest_node = path_finder.orig_node['node'], path_finder.dest_node['node']
+        if (orig_node == dest_node): continue
+        for algorithm in SearchAlgorithm:
+            for weight in weights:
+                stats = {}
+                start_time = time.perf_counter()
+                for _ in range(repeats):
+                    path = G.get_least_cost_path(orig_node, dest_node, weight, path_finder.graph_overlay, algorithm, stats)
+                result = results[algorithm.value][weight]
+                result['ms'].append((time.perf_counter() - start_time) * 1000 / repeats)
+                result['settled'].append(stats['settled'])
+                result['cost'].append(get_path_cost(G, path_finder.graph_overlay, path, weight))
+    return results
+
+if __name__ == '__main__':
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 and sys.argv[1].isdigit() else 3
+    log = Logger(b_printing=False)
+    G = GraphHandler(log, subset='--hma' not in sys.argv)
+    weights = [E.length.value] + ['nc_'+ str(sen) for sen in noise_exps.get_noise_sensitivities()]
+    results = run_searches(log, G, weights, repeats)
+
+    dijkstra = results[SearchAlgorithm.DIJKSTRA.value]
+    print(f'{"algorithm":<20} {"weight":<8} {"settled":>8} {"ms":>7} {"speedup":>8} {"cost diffs":>10}')
+    for algorithm in SearchAlgorithm:
+        for weight in weights:
+            result = results[algorithm.value][weight]
+            cost_diffs = int(np.sum(~np.isclose(dijkstra[weight]['cost'], result['cost'])))
+            print(
+                f'{algorithm.value:<20} {weight:<8} {np.mean(result["settled"]):>8.0f} {np.mean(result["ms"]):>7.2f} '
+                f'{np.mean(dijkstra[weight]["ms"]) / np.mean(result["ms"]):>7.1f}x {cost_diffs:>10}')
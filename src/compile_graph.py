@@ -0,0 +1,37 @@
+"""
+Compiles GraphML graphs to the binary format that GraphHandler reads at startup (see utils/compiled_graphs.py).
+
+Usage:
+    python compile_graph.py                         # compiles graphs/kumpula.graphml and graphs/hma.graphml (if they exist)
+    python compile_graph.py graphs/kumpula.graphml  # compiles the given graph(s)
+
+"""
+
+import os
+import sys
+import time
+import utils.igraphs as ig_utils
+import utils.compiled_graphs as compiled_graphs
+import utils.noise_exposures as noise_exps
+from app.logger import Logger
+
+default_graph_files = ['graphs/kumpula.graphml', 'graphs/hma.graphml']
+
+def compile_graph(log: Logger, graph_file: str) -> None:
+    start_time = time.time()
+    G = ig_utils.read_graphml(graph_file, log=log)
+    log.duration(start_time, f'read {graph_file}', log_level='info')
+    compiled_graphs.export_to_compiled_graph(
+        G,
+        compiled_graphs.get_compiled_graph_dir(graph_file),
+        noise_exps.get_db_costs(version=3),
+        noise_exps.get_noise_sensitivities(),
+        source=os.path.basename(graph_file),
+        log=log)
+    log.duration(start_time, f'compiled {graph_file}', log_level='info')
+
+if __name__ == '__main__':
+    log = Logger(b_printing=True)
+    graph_files = sys.argv[1:] if len(sys.argv) > 1 else [f for f in default_graph_files if os.path.isfile(f)]
+    for graph_file in graph_files:
+        compile_graph(log, graph_file)
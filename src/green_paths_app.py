@@ -1,12 +1,18 @@
 import logging
 import os
-from flask import Flask
+import io
+import json
+import numpy as np
+from flask import Flask, Response, request, stream_with_context
 from flask_cors import CORS
+from werkzeug.datastructures import MIMEAccept
 from flask import jsonify
 from app.graph_handler import GraphHandler
 from app.graph_aqi_updater import GraphAqiUpdater
-from app.path_finder import PathFinder
-from app.constants import TravelMode, RoutingMode
+from app.path_finder import PathFinder, exposure_attrs
+from app.batch_path_finder import BatchPathFinder
+from app.route_cache import RouteCache, get_route_cache_backend
+from app.constants import TravelMode, RoutingMode, PathsFormat
 from app.logger import Logger
 import utils.geometry as geom_utils
 
@@ -24,8 +30,48 @@ if __name__ != '__main__':
 logger = Logger(app_logger=app.logger)
 
 # initialize graph
-G = GraphHandler(logger, subset=eval(os.getenv('GRAPH_SUBSET', 'False')))
-aqi_updater = GraphAqiUpdater(logger, G)
+G = GraphHandler(logger, subset=eval(os.getenv('GRAPH_SUBSET', 'False')), search_threads=int(os.getenv('SEARCH_THREADS', '1')))
+route_cache_backend = get_route_cache_backend(
+    logger, 
+    backend=os.getenv('ROUTE_CACHE_BACKEND', 'none'), 
+    directory=os.getenv('ROUTE_CACHE_DIR'), 
+    url=os.getenv('ROUTE_CACHE_URL'), 
+    max_bytes=int(os.getenv('ROUTE_CACHE_MAX_MB', '32')) * 1024 * 1024)
+route_cache = RouteCache(max_size=int(os.getenv('ROUTE_CACHE_SIZE', '500')), backend=route_cache_backend)
+aqi_updater = GraphAqiUpdater(logger, G, route_cache=route_cache)
+
+paths_format_mimetypes = {
+    PathsFormat.GEOJSON: 'application/json',
+    PathsFormat.POLYLINE: 'application/vnd.green-paths.polyline+json',
+    PathsFormat.BINARY: 'application/vnd.green-paths.binary'
+}
+
+def get_paths_format(format_param: str, accept_mimetypes: MIMEAccept) -> PathsFormat:
+    """Returns the requested format of paths: either by the format query parameter (geojson, polyline or binary)
+    or by the Accept header of the request (GeoJSON by default).
+    """
+    if (format_param):
+        return PathsFormat(format_param)
+    mimetype = accept_mimetypes.best_match(list(paths_format_mimetypes.values()), default='application/json')
+    return next(paths_format for paths_format, paths_mimetype in paths_format_mimetypes.items() if paths_mimetype == mimetype)
+
+def get_paths_response_data(path_finder: PathFinder, paths_format: PathsFormat) -> bytes:
+    """Returns the paths of a routing request (whose origin & destination nodes are already set) in the requested 
+    format, either from the route cache or by finding and processing the paths (and caching the result).
+
+    Raises:
+        Only meaningful exception strings that can be shown in UI.
+    """
+    cache_key = path_finder.get_route_cache_key(paths_format)
+    response_data = route_cache.get(cache_key)
+    if (response_data is None):
+        path_finder.find_least_cost_paths()
+        if (paths_format == PathsFormat.GEOJSON):
+            response_data = path_finder.process_paths_to_json()
+        else:
+            response_data = path_finder.process_paths_to_compact(paths_format)
+        route_cache.put(cache_key, response_data, generation=path_finder.graph_overlay.aq_columns.generation)
+    return response_data
 
 @app.route('/')
 def hello_world():
@@ -39,32 +85,99 @@ def get_short_quiet_paths(travel_mode, routing_mode, orig_lat, orig_lon, dest_la
     except Exception as e:
         return jsonify({'error': 'invalid travel_mode or routing_mode parameter in request'})
 
+    try:
+        paths_format = get_paths_format(request.args.get('format'), request.accept_mimetypes)
+    except Exception as e:
+        return jsonify({'error': 'invalid format parameter in request'})
+
     if (routing_mode == RoutingMode.CLEAN and not aqi_updater.get_aqi_updated_since_secs()):
         return jsonify({'error': 'latest air quality data not available'})
 
-    error = None
     try:
         path_finder = PathFinder(logger, travel_mode, routing_mode, G, orig_lat, orig_lon, dest_lat, dest_lon)
         path_finder.find_origin_dest_nodes()
-        path_finder.find_least_cost_paths()
-        path_FC, edge_FC = path_finder.process_paths_to_FC()
+        response_data = get_paths_response_data(path_finder, paths_format)
+
+    except Exception as e:
+        return jsonify({'error': str(e)})
+
+    return Response(response_data, mimetype=paths_format_mimetypes[paths_format])
+
+@app.route('/paths/batch', methods=['POST'])
+def get_batch_paths():
+    """Finds paths for many OD pairs at once. The request body is a JSON object with travel_mode, routing_mode, 
+    od_pairs (a list of [orig_lat, orig_lon, dest_lat, dest_lon]) and optionally edges (bool). The results are 
+    streamed as NDJSON, one line per OD pair (with the index of the OD pair as id).
+    """
+    params = request.get_json(silent=True) or {}
+    try:
+        travel_mode = TravelMode(params.get('travel_mode'))
+        routing_mode = RoutingMode(params.get('routing_mode'))
+    except Exception as e:
+        return jsonify({'error': 'invalid travel_mode or routing_mode parameter in request'})
+
+    if (routing_mode == RoutingMode.CLEAN and not aqi_updater.get_aqi_updated_since_secs()):
+        return jsonify({'error': 'latest air quality data not available'})
+
+    try:
+        batch_path_finder = BatchPathFinder(logger, travel_mode, routing_mode, G, params.get('od_pairs', []), edges=params.get('edges', False))
+    except Exception as e:
+        return jsonify({'error': 'invalid od_pairs parameter in request'})
+
+    def generate_results():
+        for result in batch_path_finder.find_paths():
+            yield json.dumps(result) + '\n'
+
+    return Response(stream_with_context(generate_results()), mimetype='application/x-ndjson')
 
+@app.route('/exposures/<travel_mode>/<routing_mode>/<orig_lat>,<orig_lon>', methods=['POST'])
+def get_exposure_matrix(travel_mode, routing_mode, orig_lat, orig_lon):
+    """Finds paths from an origin to many destinations and returns only the lengths and exposures of the paths 
+    as a matrix (destinations x paths x attributes). The request body is a JSON object with destinations (a list of
+    [lat, lon]) and optionally format: either json (default) or npz (a binary numpy archive).
+    """
+    try:
+        travel_mode = TravelMode(travel_mode)
+        routing_mode = RoutingMode(routing_mode)
     except Exception as e:
-        error = jsonify({'error': str(e)})
+        return jsonify({'error': 'invalid travel_mode or routing_mode parameter in request'})
 
-    finally:
-        path_finder.delete_added_graph_features()
-        G.reset_edge_cache()
+    if (routing_mode == RoutingMode.CLEAN and not aqi_updater.get_aqi_updated_since_secs()):
+        return jsonify({'error': 'latest air quality data not available'})
 
-        if error:
-            return error
+    params = request.get_json(silent=True) or {}
+    try:
+        od_pairs = [[orig_lat, orig_lon, *dest] for dest in params.get('destinations', [])]
+        batch_path_finder = BatchPathFinder(logger, travel_mode, routing_mode, G, od_pairs, min_shared_search_dests=1)
+    except Exception as e:
+        return jsonify({'error': 'invalid destinations parameter in request'})
+
+    try:
+        path_names, values, errors = batch_path_finder.get_exposure_matrix()
 
-    return jsonify({ 'path_FC': path_FC, 'edge_FC': edge_FC })
+    except Exception as e:
+        return jsonify({'error': str(e)})
+
+    if (params.get('format') == 'npz'):
+        npz = io.BytesIO()
+        np.savez(npz, values=values, paths=np.array(path_names), attrs=np.array(exposure_attrs), errors=np.array(sorted(errors), dtype=np.int64))
+        return Response(npz.getvalue(), mimetype='application/octet-stream')
+
+    return jsonify({
+        'paths': path_names,
+        'attrs': exposure_attrs,
+        'values': np.where(np.isnan(values), None, values).tolist(),
+        'errors': { str(idx): msg for idx, msg in errors.items() }
+    })
 
 @app.route('/aqistatus')
 def aqi_status():
     return jsonify(aqi_updater.get_aqi_update_status_response())
 
+@app.route('/routecachestatus')
+def route_cache_status():
+    return jsonify(route_cache.get_status())
+
 @app.route('/edge-attrs-near-point/<lat>,<lon>')
 def edge_attrs_near_point(lat, lon):
     point = geom_utils.project_geom(geom_utils.get_point_from_lat_lon({'lat': float(lat), 'lon': float(lon)}))
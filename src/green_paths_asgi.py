@@ -0,0 +1,112 @@
+"""
+An async (ASGI) front end of the routing API, served alongside the Flask app (green_paths_app.py) with the same graph,
+route cache and AQI updater, e.g.:
+
+    gunicorn --workers=1 --worker-class=uvicorn.workers.UvicornWorker green_paths_asgi:app
+
+The event loop only handles the connections, so slow clients do not tie up the worker. Routing requests are run in a
+bounded thread pool (ROUTING_THREADS, ROUTING_QUEUE_SIZE): identical requests (by the snapped origin & destination,
+modes and format, i.e. by the route cache key) that are in flight at the same time are coalesced to one computation,
+and new requests are answered with 503 if the pool is full.
+
+Only the paths endpoint and the status endpoints are served asynchronously. The batch and exposure endpoints remain in
+the Flask app.
+
+"""
+
+import os
+import re
+import json
+from urllib.parse import parse_qs
+from werkzeug.datastructures import MIMEAccept
+from werkzeug.http import parse_accept_header
+from app.path_finder import PathFinder
+from app.routing_pool import RoutingPool, RoutingPoolFullException
+from app.constants import TravelMode, RoutingMode
+from green_paths_app import G, logger, route_cache, aqi_updater, paths_format_mimetypes, get_paths_format, get_paths_response_data
+
+routing_pool = RoutingPool(
+    logger, max_workers=int(os.getenv('ROUTING_THREADS', '4')), max_queued=int(os.getenv('ROUTING_QUEUE_SIZE', '16')))
+
+paths_route = re.compile(r'^/paths/([^/]+)/([^/]+)/([^/,]+),([^/,]+)/([^/,]+),([^/,]+)$')
+
+def get_snapped_path_finder(travel_mode, routing_mode, orig_lat, orig_lon, dest_lat, dest_lon) -> PathFinder:
+    path_finder = PathFinder(logger, travel_mode, routing_mode, G, orig_lat, orig_lon, dest_lat, dest_lon)
+    path_finder.find_origin_dest_nodes()
+    return path_finder
+
+async def send_response(send, body: bytes, content_type: str = 'application/json', status: int = 200) -> None:
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [
+            (b'content-type', content_type.encode('ascii')),
+            (b'content-length', str(len(body)).encode('ascii')),
+            (b'access-control-allow-origin', b'*')
+        ]
+    })
+    await send({ 'type': 'http.response.body', 'body': body })
+
+async def send_json(send, obj, status: int = 200) -> None:
+    await send_response(send, json.dumps(obj).encode('utf-8'), status=status)
+
+async def get_short_quiet_paths(scope, send, travel_mode, routing_mode, orig_lat, orig_lon, dest_lat, dest_lon):
+    try:
+        travel_mode = TravelMode(travel_mode)
+        routing_mode = RoutingMode(routing_mode)
+    except Exception:
+        return await send_json(send, {'error': 'invalid travel_mode or routing_mode parameter in request'})
+
+    try:
+        format_param = parse_qs(scope.get('query_string', b'').decode('latin-1')).get('format', [None])[0]
+        headers = dict(scope.get('headers', []))
+        paths_format = get_paths_format(format_param, parse_accept_header(headers.get(b'accept', b'').decode('latin-1'), MIMEAccept))
+    except Exception:
+        return await send_json(send, {'error': 'invalid format parameter in request'})
+
+    if (routing_mode == RoutingMode.CLEAN and not aqi_updater.get_aqi_updated_since_secs()):
+        return await send_json(send, {'error': 'latest air quality data not available'})
+
+    try:
+        path_finder = await routing_pool.run(
+            get_snapped_path_finder, travel_mode, routing_mode, orig_lat, orig_lon, dest_lat, dest_lon)
+        # the route cache is also looked up in the pool, as the shared backends may block (file I/O or redis)
+        response_data = await routing_pool.run_coalesced(
+            path_finder.get_route_cache_key(paths_format), get_paths_response_data, path_finder, paths_format)
+
+    except RoutingPoolFullException as e:
+        return await send_json(send, {'error': str(e)}, status=503)
+    except Exception as e:
+        return await send_json(send, {'error': str(e)})
+
+    await send_response(send, response_data, content_type=paths_format_mimetypes[paths_format])
+
+async def handle_lifespan(receive, send) -> None:
+    while True:
+        message = await receive()
+        if (message['type'] == 'lifespan.startup'):
+            await send({ 'type': 'lifespan.startup.complete' })
+        elif (message['type'] == 'lifespan.shutdown'):
+            routing_pool.shutdown()
+            await send({ 'type': 'lifespan.shutdown.complete' })
+            return
+
+async def app(scope, receive, send):
+    if (scope['type'] == 'lifespan'):
+        return await handle_lifespan(receive, send)
+    if (scope['type'] != 'http'):
+        return
+
+    path = scope['path']
+    paths_match = paths_route.match(path)
+    if (paths_match):
+        return await get_short_quiet_paths(scope, send, *paths_match.groups())
+    if (path == '/'):
+        return await send_response(send, b'Keep calm and walk green paths.', content_type='text/html; charset=utf-8')
+    if (path == '/aqistatus'):
+        return await send_json(send, aqi_updater.get_aqi_update_status_response())
+    if (path == '/routecachestatus'):
+        return await send_json(send, route_cache.get_status())
+    if (path == '/routingpoolstatus'):
+        return await send_json(send, routing_pool.get_status())
+    await send_json(send, {'error': 'not found'}, status=404)
@@ -8,5 +8,14 @@ if [[ -z "${WORKER_COUNT}" ]]; then
   export WORKER_COUNT="1"
 fi
 
-echo "Starting green path server with ${WORKER_COUNT} workers and log level ${LOG_LEVEL}"
-gunicorn --workers=${WORKER_COUNT} --bind=0.0.0.0:5000 --log-level=${LOG_LEVEL} --timeout 450 green_paths_app:app
+if [[ -z "${THREAD_COUNT}" ]]; then
+  export THREAD_COUNT="1"
+fi
+
+if [[ "${SERVER_MODE}" == "async" ]]; then
+  echo "Starting async green path server with ${WORKER_COUNT} workers and log level ${LOG_LEVEL}"
+  gunicorn --workers=${WORKER_COUNT} --worker-class=uvicorn.workers.UvicornWorker --bind=0.0.0.0:5000 --log-level=${LOG_LEVEL} --timeout 450 green_paths_asgi:app
+else
+  echo "Starting green path server with ${WORKER_COUNT} workers (${THREAD_COUNT} threads each) and log level ${LOG_LEVEL}"
+  gunicorn --workers=${WORKER_COUNT} --threads=${THREAD_COUNT} --bind=0.0.0.0:5000 --log-level=${LOG_LEVEL} --timeout 450 green_paths_app:app
+fi
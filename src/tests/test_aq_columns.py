@@ -0,0 +1,21 @@
+import unittest
+import numpy as np
+from app.aq_columns import AqColumns
+from app.graph_overlay import GraphOverlay
+
+class TestAqColumns(unittest.TestCase):
+
+    def test_pinned_aq_columns(self):
+        aqis = np.array([1.5, np.nan])
+        aq_columns = AqColumns(1, { 'aqi': aqis, 'aqc_5': np.array([12.5, 410.0]) }, aqi_data='aqi_2020-01-01T12.csv')
+        # the columns are shared by requests, hence they cannot be modified
+        with self.assertRaises(ValueError):
+            aq_columns.arrays['aqi'][0] = 2.0
+        self.assertIs(aq_columns.arrays['aqi'], aqis)
+        self.assertEqual(aq_columns.aqi_classes.tolist(), [1, 0])
+        overlay = GraphOverlay(base_vcount=2, base_ecount=2, aq_columns=aq_columns)
+        self.assertEqual(overlay.aq_columns.generation, 1)
+        self.assertEqual(overlay.aq_columns.arrays['aqc_5'].tolist(), [12.5, 410.0])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,40 @@
+import unittest
+import numpy as np
+import utils.aq_exposures as aq_exps
+
+class TestAqExposures(unittest.TestCase):
+
+    def test_aqi_cost_arrays(self):
+        sens = aq_exps.get_aq_sensitivities()
+        # costs lying (almost) halfway between two roundings are rounded as with round() (e.g. 2.675, 1.005)
+        aqis = np.array([0.5, 0.97, 1.0, 1.87, 3.5, 1.0, 0.98])
+        lengths = np.array([10.0, 10.0, 20.0, 66.482, 5.5, 2.675, 1.005])
+        lengths_b = np.array([0.0, 12.0, np.nan, 70.0, 0.0, 0.0, 1.005])
+        costs = aq_exps.get_aqi_cost_arrays(aqis, lengths, sens)
+        costs_b = aq_exps.get_aqi_cost_arrays(aqis, lengths, sens, lengths_b=lengths_b, prefix='b')
+        for idx, (aqi, length, length_b) in enumerate(zip(aqis, lengths, np.nan_to_num(lengths_b))):
+            for attr, cost in aq_exps.get_aqi_costs(aqi, length, sens).items():
+                self.assertEqual(costs[attr][idx], cost)
+            for attr, cost in aq_exps.get_aqi_costs(aqi, length, sens, length_b=length_b, prefix='b').items():
+                self.assertEqual(costs_b[attr][idx], cost)
+        # invalid AQI gets high costs
+        self.assertEqual(costs['aqc_5'][0], 10.0 + 10.0 * 10 * 5)
+
+    def test_aqi_classes(self):
+        aqis = np.array([0.5, 1.99, 2.0, 3.5, 4.99, 5.0, 7.2])
+        self.assertEqual(aq_exps.get_aqi_classes(aqis).tolist(), [aq_exps.get_aqi_class(aqi) for aqi in aqis.tolist()])
+        self.assertEqual(aq_exps.get_aqi_classes(np.array([np.nan])).tolist(), [0])
+
+    def test_path_aqi_exposures(self):
+        aqi_exp_list = [(1.5, 3.0), (1.25, 5.0), (2.5, 10.0), (3.5, 2.0)]
+        aqis, lengths = (np.array(values) for values in zip(*aqi_exp_list))
+        self.assertEqual(aq_exps.get_mean_aqi_from_arrays(aqis, lengths), aq_exps.get_mean_aqi(aqi_exp_list))
+        self.assertAlmostEqual(aq_exps.get_total_aqi_cost_from_arrays(aqis, lengths), aq_exps.get_total_aqi_cost_from_exps(aqi_exp_list))
+        self.assertEqual(
+            aq_exps.aggregate_aqi_class_exps_from_arrays(aq_exps.get_aqi_classes(aqis), lengths), 
+            aq_exps.aggregate_aqi_class_exps(aqi_exp_list))
+        with self.assertRaises(aq_exps.InvalidAqiException):
+            aq_exps.get_total_aqi_cost_from_arrays(np.array([1.5, np.nan]), np.array([1.0, 1.0]))
+
+if __name__ == '__main__':
+    unittest.main()
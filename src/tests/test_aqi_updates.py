@@ -0,0 +1,27 @@
+import os
+import unittest
+import tempfile
+import numpy as np
+import pandas as pd
+import utils.aqi_updates as aqi_updates
+
+class TestAqiUpdates(unittest.TestCase):
+
+    def test_read_write_aqi_updates(self):
+        edge_ids = np.array([3, 0, 2])
+        aqis = np.array([2.96, 1.5, 3.17])
+        with tempfile.TemporaryDirectory() as aqi_dir:
+            npy_file = os.path.join(aqi_dir, 'aqi_2020-01-01T12.npy')
+            csv_file = os.path.join(aqi_dir, 'aqi_2020-01-01T12.csv')
+            aqi_updates.write_aqi_update_npy(npy_file, edge_ids, aqis)
+            pd.DataFrame({ 'id_ig': edge_ids, 'aqi': aqis }).to_csv(csv_file, index=False)
+            self.assertEqual(os.listdir(aqi_dir).count('aqi_2020-01-01T12.npy.tmp'), 0)
+            npy_ids, npy_aqis = aqi_updates.read_aqi_update_file(npy_file)
+            csv_ids, csv_aqis = aqi_updates.read_aqi_update_file(csv_file)
+            # binary updates are sorted by edge id and equal to the ones in csv
+            self.assertEqual(npy_ids.tolist(), [0, 2, 3])
+            self.assertEqual(npy_aqis.tolist(), [1.5, 3.17, 2.96])
+            self.assertEqual(dict(zip(npy_ids.tolist(), npy_aqis.tolist())), dict(zip(csv_ids.tolist(), csv_aqis.tolist())))
+
+if __name__ == '__main__':
+    unittest.main()
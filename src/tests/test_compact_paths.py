@@ -0,0 +1,46 @@
+import unittest
+import json
+import struct
+import numpy as np
+import utils.compact_paths as compact_paths
+
+path_coords = [
+    np.array([[24.938406, 60.16992], [24.93843, 60.170001], [24.9, 60.1]]),
+    np.array([[24.95, 60.2], [24.951234, 60.199999]])
+]
+path_props = [{ 'id': 'short', 'length': 120.4 }, { 'id': 'q_1', 'length': 130.2 }]
+edge_groups = [[0, 0, 2, 60], [0, 2, 3, 65], [1, 0, 2, 60]]
+
+class TestCompactPaths(unittest.TestCase):
+
+    def test_zigzag_varints(self):
+        self.assertEqual(compact_paths.zigzag_encode(np.array([0, -1, 1, -2, 2])).tolist(), [0, 1, 2, 3, 4])
+        self.assertEqual(compact_paths.encode_varints(np.array([1, -1, 150])), bytes([2, 1, 0xac, 0x02]))
+
+    def test_encode_polyline(self):
+        # the example of the encoded polyline algorithm format (Google Maps)
+        coords = np.array([[-120.2, 38.5], [-120.95, 40.7], [-126.453, 43.252]])
+        polyline = compact_paths.encode_polyline(coords, precision=5)
+        self.assertEqual(polyline, '_p~iF~ps|U_ulLnnqC_mqNvxq`@')
+        np.testing.assert_allclose(compact_paths.decode_polyline(polyline, precision=5), coords)
+
+    def test_polyline_paths(self):
+        paths = json.loads(compact_paths.get_polyline_paths(path_coords, path_props, 'dBrange', edge_groups))
+        self.assertEqual(paths['precision'], 6)
+        self.assertEqual(paths['edge_groups'], { 'attr': 'dBrange', 'groups': edge_groups })
+        self.assertEqual([path['properties'] for path in paths['paths']], path_props)
+        for path, coords in zip(paths['paths'], path_coords):
+            np.testing.assert_allclose(compact_paths.decode_polyline(path['polyline']), coords)
+
+    def test_binary_paths(self):
+        data = compact_paths.get_binary_paths(path_coords, path_props, 'aqi_cl', edge_groups)
+        header, coord_arrays = compact_paths.read_binary_paths(data)
+        self.assertEqual([path['coord_count'] for path in header['paths']], [3, 2])
+        self.assertEqual(header['edge_groups']['groups'], edge_groups)
+        for read_coords, coords in zip(coord_arrays, path_coords):
+            np.testing.assert_allclose(read_coords, coords)
+        # the coordinates take less than 8 bytes each
+        self.assertLess(len(data) - 8 - struct.unpack('<I', data[4:8])[0], 5 * 8)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,160 @@
+import unittest
+import tempfile
+import numpy as np
+import igraph as ig
+from shapely.geometry import Point, LineString
+import utils.compiled_graphs as compiled_graphs
+import utils.noise_exposures as noise_exps
+from utils.compiled_graphs import GraphArray as A
+from utils.igraphs import Edge as E, Node as N
+
+def get_test_graph() -> ig.Graph:
+    """Returns a small directed graph (a - b - c) with the attributes that are compiled.
+    """
+    G = ig.Graph(directed=True)
+    G.add_vertices(3)
+    G.vs[N.geometry.value] = [Point(0, 0), Point(10, 0), Point(10, 20)]
+    G.add_edges([(0, 1), (1, 0), (1, 2), (2, 1)])
+    ab = LineString([(0, 0), (5, 1), (10, 0)])
+    bc = LineString([(10, 0), (10, 20)])
+    G.es[E.uv.value] = G.get_edgelist()
+    G.es[E.id_way.value] = [0, 0, 1, 1]
+    G.es[E.geometry.value] = [ab, LineString(ab.coords[::-1]), bc, LineString(bc.coords[::-1])]
+    G.es[E.geom_wgs.value] = [ab, LineString(ab.coords[::-1]), bc, LineString(bc.coords[::-1])]
+    G.es[E.length.value] = [round(ab.length, 3), round(ab.length, 3), 20.0, 20.0]
+    G.es[E.length_b.value] = [None, None, 22.5, 22.5]
+    G.es[E.noises.value] = [{ 50: 3.2, 55: 4.0 }, { 50: 3.2, 55: 4.0 }, {}, None]
+    return G
+
+class TestCompiledGraphs(unittest.TestCase):
+
+    def test_csr_adjacency(self):
+        G = get_test_graph()
+        edge_uv = np.array(G.get_edgelist())
+        out_offsets, out_edges, out_targets = compiled_graphs.get_csr_adjacency(edge_uv, G.vcount())
+        self.assertEqual(out_offsets.tolist(), [0, 1, 3, 4])
+        self.assertEqual(out_edges.tolist(), [0, 1, 2, 3])
+        self.assertEqual(out_targets.tolist(), [1, 0, 2, 1])
+
+    def test_landmarks(self):
+        G = get_test_graph()
+        edge_uv = np.array(G.get_edgelist())
+        weights = np.array([10.0, 10.0, 20.0, 20.0])
+        landmarks, dists_from, dists_to = compiled_graphs.get_landmarks(edge_uv, G.vcount(), weights, count=2)
+        # the first landmark is the node farthest from node 0 and the second the node farthest from the first
+        self.assertEqual(landmarks.tolist(), [2, 0])
+        self.assertEqual(dists_from[:, 0].tolist(), [30.0, 20.0, 0.0])
+        self.assertEqual(dists_to[:, 1].tolist(), [0.0, 10.0, 30.0])
+
+    def test_noise_matrix(self):
+        offsets, dbs, exps, _ = compiled_graphs.pack_noises([{ 50: 3.2, 55: 4.0 }, None, { 75: 1.5 }])
+        matrix = compiled_graphs.get_noise_matrix(offsets, dbs, exps)
+        self.assertEqual(matrix.shape, (3, 40))
+        self.assertEqual(matrix[0, [10, 15]].tolist(), [3.2, 4.0])
+        self.assertEqual(matrix[1].sum(), 0.0)
+        db_costs = noise_exps.get_db_costs(version=3)
+        self.assertAlmostEqual(
+            (matrix @ compiled_graphs.get_db_cost_vector(db_costs))[2], 
+            noise_exps.get_noise_cost({ 75: 1.5 }, db_costs), places=2)
+
+    def test_shared_wgs_coords(self):
+        G = get_test_graph()
+        coords, ranges, reversed_coords = compiled_graphs.pack_shared_line_coords(
+            G.es[E.geom_wgs.value] + [None], G.es[E.id_way.value] + [2])
+        # the coordinates of the two edges of a way are stored once
+        self.assertEqual(len(coords), 5)
+        self.assertEqual(ranges.tolist(), [[0, 3], [0, 3], [3, 5], [3, 5], [5, 5]])
+        self.assertEqual(reversed_coords.tolist(), [False, True, False, True, False])
+
+    def test_mean_noise_levels(self):
+        G = get_test_graph()
+        meta, arrays = compiled_graphs.get_compiled_arrays(G)
+        compiled_graphs.add_noise_cost_arrays(meta, arrays, noise_exps.get_db_costs(version=3), noise_exps.get_noise_sensitivities())
+        mean_dbs = compiled_graphs.get_mean_noise_levels(arrays)
+        for edge_id in range(4):
+            noises = compiled_graphs.get_noises(arrays, edge_id)
+            expected = noise_exps.get_mean_noise_level(noises, arrays[E.length.value][edge_id]) if noises else 0
+            self.assertEqual(mean_dbs[edge_id], expected)
+        dbs = np.array([0.0, 49.9, 50.0, 57.5, 69.9, 70.0, 82.1])
+        self.assertEqual(noise_exps.get_noise_ranges(dbs).tolist(), [noise_exps.get_noise_range(db) for db in dbs.tolist()])
+
+    def test_path_gathers(self):
+        G = get_test_graph()
+        meta, arrays = compiled_graphs.get_compiled_arrays(G)
+        self.assertEqual(compiled_graphs.get_range_indexes(np.array([3, 0, 5]), np.array([5, 0, 6])).tolist(), [3, 4, 5])
+        path = np.array([3, 1])
+        for wgs, get_coords in ((False, compiled_graphs.get_coords), (True, compiled_graphs.get_wgs_coords)):
+            coords, counts = compiled_graphs.get_edges_coords(arrays, path, wgs=wgs)
+            self.assertEqual(counts.tolist(), [2, 3])
+            self.assertEqual(coords.tolist(), np.concatenate([get_coords(arrays, edge_id) for edge_id in path]).tolist())
+        matrix = compiled_graphs.get_noise_matrix(
+            arrays[A.noise_offsets.value], arrays[A.noise_dbs.value], arrays[A.noise_exps.value], dtype=np.float32)
+        noise_bins = noise_exps.aggregate_exposure_bins(matrix, np.array([0, 1, 2, 3]))
+        self.assertEqual(noise_bins.shape, (40,))
+        self.assertEqual(compiled_graphs.get_noises_from_bins(noise_bins), { 50: 6.4, 55: 8.0 })
+        self.assertEqual(compiled_graphs.get_noises_from_bins(noise_exps.aggregate_exposure_bins(matrix, np.array([], dtype=np.int64))), {})
+
+    def test_noise_bin_exposures(self):
+        noises = { 40: 12.25, 45: 3.5, 55: 25.0, 60: 16.125, 70: 200.0, 75: 4.0 }
+        length = 300.0
+        noise_bins = np.zeros(40)
+        for db, exp in noises.items():
+            noise_bins[db - 40] = exp
+        db_costs = noise_exps.get_db_costs(version=3)
+        self.assertEqual(
+            noise_exps.get_mean_noise_level_from_bins(noise_bins, length), noise_exps.get_mean_noise_level(noises, length))
+        self.assertEqual(
+            noise_exps.get_noise_cost_from_bins(noise_bins, compiled_graphs.get_db_cost_vector(db_costs), sen=1.3), 
+            noise_exps.get_noise_cost(noises, db_costs, sen=1.3))
+        self.assertEqual(
+            noise_exps.get_noise_range_exps_from_bins(noise_bins), dict(noise_exps.get_noise_range_exps(noises, length)))
+        self.assertEqual(noise_exps.get_noise_range_exps_from_bins(np.zeros(40)), {})
+
+    def test_recalculate_noise_costs(self):
+        G = get_test_graph()
+        meta, arrays = compiled_graphs.get_compiled_arrays(G)
+        db_costs = noise_exps.get_db_costs(version=3)
+        compiled_graphs.add_noise_cost_arrays(meta, arrays, db_costs, [0.1, 0.4])
+        compiled_graphs.add_noise_cost_arrays(meta, arrays, db_costs, [0.4, 6])
+        self.assertEqual(meta['noise_sens'], [0.4, 6])
+        self.assertEqual(meta['edge_attrs'], [E.id_way.value, E.length.value, E.length_b.value, 'nc_0.4', 'bnc_0.4', 'nc_6', 'bnc_6'])
+        self.assertNotIn('nc_0.1', arrays)
+
+    def test_round_array(self):
+        values = np.array([2.675, 0.125, 1.005, 10.0 / 3])
+        self.assertEqual(compiled_graphs.round_array(values, 2).tolist(), [round(value, 2) for value in values.tolist()])
+        self.assertEqual(compiled_graphs.round_array(np.array([3.2, 4.0], dtype=np.float32), 2).tolist(), [3.2, 4.0])
+
+    def test_export_read_compiled_graph(self):
+        G = get_test_graph()
+        db_costs = noise_exps.get_db_costs(version=3)
+        sens = noise_exps.get_noise_sensitivities()
+        with tempfile.TemporaryDirectory() as graph_dir:
+            compiled_graphs.export_to_compiled_graph(G, graph_dir, db_costs, sens)
+            self.assertTrue(compiled_graphs.compiled_graph_exists(graph_dir))
+            meta, arrays = compiled_graphs.read_compiled_arrays(graph_dir)
+            self.assertEqual(meta['ecount'], 4)
+            self.assertEqual(meta['noise_sens'], sens)
+            self.assertEqual(arrays[A.edge_uv.value].tolist(), [list(uv) for uv in G.get_edgelist()])
+            self.assertFalse(arrays[E.length.value].flags.writeable)
+            self.assertEqual(arrays[E.id_way.value].tolist(), [0, 0, 1, 1])
+            for edge_id, geom in enumerate(G.es[E.geometry.value]):
+                self.assertTrue(compiled_graphs.get_line_geom(arrays, edge_id).equals(geom))
+            for edge_id, geom in enumerate(G.es[E.geom_wgs.value]):
+                self.assertEqual(compiled_graphs.get_wgs_coords(arrays, edge_id).tolist(), [list(coords) for coords in geom.coords])
+            # estimated exposures to 40 dB are added to edges with noise data
+            self.assertEqual(compiled_graphs.get_noises(arrays, 0), { 50: 3.2, 55: 4.0, 40: round(G.es[0][E.length.value] - 7.2, 2) })
+            self.assertEqual(compiled_graphs.get_noises(arrays, 2), { 40: 20.0 })
+            self.assertEqual(compiled_graphs.get_noises(arrays, 3), None)
+            # edges without noise data get high noise costs
+            self.assertEqual(arrays['nc_0.1'][3], round(20.0 + 20.0 * 20, 2))
+            self.assertEqual(arrays['bnc_0.1'][3], round(22.5 + 20.0 * 20, 2))
+            self.assertEqual(arrays['nc_6'][2], 20.0)
+            expected_cost = round(G.es[0][E.length.value] + noise_exps.get_noise_cost({ 50: 3.2, 55: 4.0 }, db_costs, sen=6), 2)
+            self.assertEqual(arrays['nc_6'][0], expected_cost)
+            # the noise matrix holds the noise exposures with the estimated exposures to 40 dB
+            self.assertEqual(arrays[A.noise_matrix.value].dtype, np.float32)
+            self.assertEqual(compiled_graphs.get_noises_from_bins(arrays[A.noise_matrix.value][0]), compiled_graphs.get_noises(arrays, 0))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+import os
+import time
+import unittest
+import tempfile
+from app.logger import Logger
+from app.file_watcher import FileWatcher
+from app.graph_aqi_updater import UpdateBackoff
+
+logger = Logger(b_printing=False)
+
+class TestFileWatcher(unittest.TestCase):
+
+    def test_file_events(self):
+        with tempfile.TemporaryDirectory() as aqi_dir:
+            watcher = FileWatcher(logger, aqi_dir)
+            if (not watcher.is_event_driven()):
+                self.skipTest('inotify is not available')
+            self.assertEqual(watcher.wait(0.01), [])
+            tmp_file = os.path.join(aqi_dir, 'aqi_2020-01-01T12.npy.tmp')
+            with open(tmp_file, 'wb') as f:
+                f.write(b'aqi')
+            os.replace(tmp_file, os.path.join(aqi_dir, 'aqi_2020-01-01T12.npy'))
+            start_time = time.time()
+            new_files = watcher.wait(5)
+            self.assertLess(time.time() - start_time, 1)
+            # both the closed temporary file and the renamed file are reported
+            self.assertIn('aqi_2020-01-01T12.npy', new_files + watcher.wait(0.01))
+            watcher.close()
+
+    def test_polling_fallback(self):
+        watcher = FileWatcher(logger, 'not/a/directory/')
+        self.assertFalse(watcher.is_event_driven())
+        self.assertEqual(watcher.wait(0.01), [])
+
+class TestUpdateBackoff(unittest.TestCase):
+
+    def test_update_backoff(self):
+        backoff = UpdateBackoff(base_delay=30, max_delay=100)
+        self.assertTrue(backoff.allows_update('aqi_2020-01-01T12.csv', now=0))
+        self.assertEqual(backoff.record_failure('aqi_2020-01-01T12.csv', now=0), 30)
+        self.assertFalse(backoff.allows_update('aqi_2020-01-01T12.csv', now=10))
+        self.assertEqual(backoff.get_remaining_delay(now=10), 20)
+        # new AQI data is not delayed by failures of the previous file
+        self.assertTrue(backoff.allows_update('aqi_2020-01-01T13.csv', now=10))
+        self.assertTrue(backoff.allows_update('aqi_2020-01-01T12.csv', now=30))
+        self.assertEqual(backoff.record_failure('aqi_2020-01-01T12.csv', now=30), 60)
+        self.assertEqual(backoff.record_failure('aqi_2020-01-01T12.csv', now=90), 100)
+        backoff.reset()
+        self.assertEqual(backoff.get_remaining_delay(now=90), 0)
+        self.assertEqual(backoff.record_failure('aqi_2020-01-01T12.csv', now=90), 30)
+
+if __name__ == '__main__':
+    unittest.main()
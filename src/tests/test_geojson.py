@@ -0,0 +1,34 @@
+import unittest
+import json
+import numpy as np
+import utils.geojson as geojson
+import utils.geometry as geom_utils
+
+coords = np.array([[24.9384061234, 60.1699199], [24.93843, 60.16999955555], [24.9, 60.1]])
+
+class TestGeoJson(unittest.TestCase):
+
+    def test_format_coords(self):
+        self.assertEqual(geojson.format_coords(coords[1:], digits=3), b'[[24.938,60.170],[24.900,60.100]]')
+        self.assertEqual(geojson.format_coords(np.empty((0, 2))), b'[]')
+        # parses to the same values as the coordinates rounded with round_coordinates
+        self.assertEqual(
+            [tuple(coord) for coord in json.loads(geojson.format_coords(coords))],
+            geom_utils.round_coordinates([tuple(coord) for coord in coords], digits=6)
+        )
+
+    def test_feature_collection(self):
+        props = { 'id': 'short', 'length': 12.3, 'missing_aqi': False, 'aqi_pcts': { 1: 100.0 } }
+        features = [geojson.get_line_feature(coords, props), geojson.get_line_feature(coords[:2], { 'value': 2 })]
+        FCs = json.loads(geojson.get_json_object({ 'path_FC': geojson.get_feature_collection(features) }))
+        self.assertEqual(list(FCs.keys()), ['path_FC'])
+        self.assertEqual(FCs['path_FC']['type'], 'FeatureCollection')
+        feat = FCs['path_FC']['features'][0]
+        self.assertEqual(feat['type'], 'Feature')
+        self.assertEqual(feat['geometry']['type'], 'LineString')
+        self.assertEqual(feat['geometry']['coordinates'][0], [24.938406, 60.16992])
+        self.assertEqual(feat['properties'], { 'id': 'short', 'length': 12.3, 'missing_aqi': False, 'aqi_pcts': { '1': 100.0 } })
+        self.assertEqual(len(FCs['path_FC']['features'][1]['geometry']['coordinates']), 2)
+
+if __name__ == '__main__':
+    unittest.main()
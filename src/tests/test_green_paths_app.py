@@ -1,10 +1,12 @@
 import unittest
 import pytest
 import time
+import json
 import pandas as pd
 from datetime import datetime
 import app.files as file_utils
 import utils.noise_exposures as noise_exps
+import utils.geometry as geom_utils
 import app.tests as tests
 from app.graph_handler import GraphHandler
 from app.graph_aqi_updater import GraphAqiUpdater
@@ -15,8 +17,8 @@ from app.path_aqi_attrs import PathAqiAttrs
 # initialize graph
 logger = Logger(b_printing=True, log_file='test_green_paths_app.log')
 G = GraphHandler(logger, subset=True, set_noise_costs=True)
-expected_ecount = G.graph.ecount()
-expected_vcount = G.graph.vcount()
+expected_ecount = G.ecount
+expected_vcount = G.vcount
 aqi_updater = GraphAqiUpdater(logger, G, aqi_dir='data/tests/aqi_cache/', start=False)
 aqi_edge_updates_csv = 'aqi_2019-11-08T14.csv'
 aqi_updater.read_update_aqi_to_graph(aqi_edge_updates_csv)
@@ -89,12 +91,19 @@ class TestGreenPaths(unittest.TestCase):
         qp_props = qp_feat['properties']
         self.assertAlmostEqual(qp_props['length'], noise_exps.get_total_noises_len(qp_props['noises']), 1)
 
+    def test_edge_attrs_near_point(self):
+        point = geom_utils.project_geom(geom_utils.get_point_from_lat_lon(od_dict[1]['orig_latLon']))
+        edge_d = G.format_edge_dict_for_debugging(G.find_nearest_edge(point))
+        self.assertEqual(edge_d['nearest_point'][:5], 'POINT')
+        # the debugging edge dict is served as JSON by /edge-attrs-near-point
+        json.dumps(edge_d)
+
     def test_quiet_path_1(self):
         set_stats = { 'sp_count': 1, 'qp_count': 1, 'sp_len': 813.0, 'qp_len_sum': 843.3, 'noise_total_len': 1656.3 }
         test_stats = get_quiet_path_stats(G, od_dict[1])
         self.assertDictEqual(test_stats['set_stats'], set_stats)
-        self.assertEqual(G.graph.ecount(), expected_ecount)
-        self.assertEqual(G.graph.vcount(), expected_vcount)
+        self.assertEqual(G.ecount, expected_ecount)
+        self.assertEqual(G.vcount, expected_vcount)
 
     def test_quiet_path_5(self):
         set_stats = { 'sp_count': 1, 'qp_count': 3, 'sp_len': 1648.8, 'qp_len_sum': 5365.8, 'noise_total_len': 7014.6 }
@@ -119,8 +128,8 @@ class TestGreenPaths(unittest.TestCase):
         self.assertDictEqual(test_stats['set_stats'], set_stats)
         print(test_stats['qp_stats'])
         self.assertDictEqual(test_stats['qp_stats'], qp_stats)
-        self.assertEqual(G.graph.ecount(), expected_ecount)
-        self.assertEqual(G.graph.vcount(), expected_vcount)
+        self.assertEqual(G.ecount, expected_ecount)
+        self.assertEqual(G.vcount, expected_vcount)
 
     def test_quiet_path_6(self):
         set_stats = { 'sp_count': 1, 'qp_count': 3, 'sp_len': 1024.9, 'qp_len_sum': 3697.6, 'noise_total_len': 4722.4 }
@@ -145,29 +154,29 @@ class TestGreenPaths(unittest.TestCase):
         self.assertDictEqual(test_stats['set_stats'], set_stats)
         print(test_stats['qp_stats'])
         self.assertDictEqual(test_stats['qp_stats'], qp_stats)
-        self.assertEqual(G.graph.ecount(), expected_ecount)
-        self.assertEqual(G.graph.vcount(), expected_vcount)
+        self.assertEqual(G.ecount, expected_ecount)
+        self.assertEqual(G.vcount, expected_vcount)
 
     def test_quiet_path_7(self):
         set_stats = { 'sp_count': 1, 'qp_count': 1, 'sp_len': 1054.2, 'qp_len_sum': 1338.5, 'noise_total_len': 2392.7 }
         test_stats = get_quiet_path_stats(G, od_dict[7])
         self.assertDictEqual(test_stats['set_stats'], set_stats)
-        self.assertEqual(G.graph.ecount(), expected_ecount)
-        self.assertEqual(G.graph.vcount(), expected_vcount)
+        self.assertEqual(G.ecount, expected_ecount)
+        self.assertEqual(G.vcount, expected_vcount)
 
     def test_quiet_path_8(self):
         set_stats = { 'sp_count': 1, 'qp_count': 0, 'sp_len': 812.8, 'qp_len_sum': 0.0, 'noise_total_len': 812.8 }
         test_stats = get_quiet_path_stats(G, od_dict[8])
         self.assertDictEqual(test_stats['set_stats'], set_stats)
-        self.assertEqual(G.graph.ecount(), expected_ecount)
-        self.assertEqual(G.graph.vcount(), expected_vcount)
+        self.assertEqual(G.ecount, expected_ecount)
+        self.assertEqual(G.vcount, expected_vcount)
 
     def test_quiet_path_9(self):
         set_stats = { 'sp_count': 1, 'qp_count': 3, 'sp_len': 670.6, 'qp_len_sum': 2325.7, 'noise_total_len': 2996.3 }
         test_stats = get_quiet_path_stats(G, od_dict[9])
         self.assertDictEqual(test_stats['set_stats'], set_stats)
-        self.assertEqual(G.graph.ecount(), expected_ecount)
-        self.assertEqual(G.graph.vcount(), expected_vcount)
+        self.assertEqual(G.ecount, expected_ecount)
+        self.assertEqual(G.vcount, expected_vcount)
 
     def test_clean_path_1(self):
         cp_stats = {
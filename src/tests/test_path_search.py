@@ -0,0 +1,154 @@
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from shapely.geometry import Point, LineString
+import utils.compiled_graphs as compiled_graphs
+import utils.path_search as path_search
+from app.graph_overlay import GraphOverlay
+from utils.igraphs import Edge as E
+
+# a directed square a - b - c - d (both directions) with a diagonal a -> c
+edge_uv = np.array([(0, 1), (1, 0), (1, 2), (2, 1), (2, 3), (3, 2), (3, 0), (0, 3), (0, 2)])
+lengths = np.array([10.0, 10.0, 10.0, 10.0, 10.0, 10.0, 10.0, 10.0, 15.0])
+
+def get_adjacency():
+    return tuple(path_search.as_memoryview(a) for a in compiled_graphs.get_csr_adjacency(edge_uv, 4))
+
+def get_in_adjacency():
+    return tuple(path_search.as_memoryview(a) for a in compiled_graphs.get_csr_adjacency(edge_uv[:, ::-1], 4))
+
+class TestPathSearch(unittest.TestCase):
+
+    def test_least_cost_path(self):
+        weights = path_search.as_memoryview(lengths)
+        self.assertEqual(path_search.find_least_cost_path(*get_adjacency(), weights, 0, 2), [8])
+        self.assertEqual(path_search.find_least_cost_path(*get_adjacency(), weights, 1, 0), [1])
+        costs = lengths.copy()
+        costs[8] = 25.0
+        self.assertIn(path_search.find_least_cost_path(*get_adjacency(), path_search.as_memoryview(costs), 0, 2), [[0, 2], [7, 5]])
+
+    def test_least_cost_paths_by_multiple_costs(self):
+        noise_costs = lengths + np.array([0, 0, 0, 0, 0, 0, 0, 0, 10.0])
+        weights_list = [path_search.as_memoryview(costs) for costs in (lengths, noise_costs)]
+        min_weights = path_search.as_memoryview(compiled_graphs.get_min_costs(lengths, np.full(len(lengths), np.nan)))
+        paths = path_search.find_least_cost_paths(get_adjacency(), get_in_adjacency(), weights_list, min_weights, 0, 2)
+        self.assertEqual(paths[0], [8])
+        self.assertIn(paths[1], [[0, 2], [7, 5]])
+        self.assertEqual(path_search.get_dists_to_node(*get_in_adjacency(), min_weights, 2, 0), ({ 2: 0.0, 1: 10.0, 3: 10.0, 0: 15.0 }, 15.0))
+
+    def test_least_cost_path_by_landmark_bounds(self):
+        min_costs = compiled_graphs.get_min_costs(lengths, np.full(len(lengths), np.nan))
+        landmarks, dists_from, dists_to = compiled_graphs.get_landmarks(edge_uv, 4, min_costs, count=2)
+        dists_from, dists_to = path_search.as_memoryview(dists_from), path_search.as_memoryview(dists_to)
+        self.assertEqual(landmarks.tolist(), [2, 0])
+        # both landmarks give the exact cost from 2 to 0 as the lower bound
+        selected = path_search.select_landmarks(dists_from, dists_to, [2], [0], count=1)
+        self.assertEqual(len(selected), 1)
+        bounds = path_search.LandmarkBounds(dists_from, dists_to, selected, [0])
+        exact_dists, _ = path_search.get_dists_to_node(*get_in_adjacency(), path_search.as_memoryview(min_costs), 0, 2)
+        for node, dist in exact_dists.items():
+            self.assertLessEqual(bounds.get(node), dist)
+        self.assertEqual(bounds.get(2), 20.0)
+        self.assertEqual(bounds.get(4), 0.0)
+        path = path_search.find_least_cost_path(*get_adjacency(), path_search.as_memoryview(lengths), 2, 0, h_dists=bounds)
+        self.assertIn(path, [[3, 1], [5, 6]])
+        # landmark bounds can also guide the search from the destination in the search by multiple costs
+        noise_costs = lengths + np.array([0, 0, 0, 0, 0, 0, 0, 0, 10.0])
+        weights_list = [path_search.as_memoryview(costs) for costs in (lengths, noise_costs)]
+        orig_bounds = path_search.LandmarkBounds(dists_to, dists_from, selected, [0])
+        paths = path_search.find_least_cost_paths(
+            get_adjacency(), get_in_adjacency(), weights_list, path_search.as_memoryview(min_costs), 0, 2, orig_bounds=orig_bounds)
+        self.assertEqual(paths[0], [8])
+        self.assertIn(paths[1], [[0, 2], [7, 5]])
+
+    def test_parallel_least_cost_paths(self):
+        min_costs = compiled_graphs.get_min_costs(lengths, np.full(len(lengths), np.nan))
+        _, dists_from, dists_to = compiled_graphs.get_landmarks(edge_uv, 4, min_costs, count=2)
+        dists_from, dists_to = path_search.as_memoryview(dists_from), path_search.as_memoryview(dists_to)
+        overlay = GraphOverlay(base_vcount=4, base_ecount=len(edge_uv))
+        orig = overlay.add_node(Point(5, 0))
+        overlay.add_edge({ E.uv.value: (orig, 0), E.length.value: 5.0 })
+        overlay.add_edge({ E.uv.value: (orig, 1), E.length.value: 5.0 })
+        dest_bounds = path_search.LandmarkBounds(dists_from, dists_to, [0, 1], [2])
+        self.assertEqual(dest_bounds.get_all().tolist(), [dest_bounds.get(node) for node in range(4)])
+        self.assertEqual(path_search.get_bounds_array(dest_bounds, 5)[4], 0.0)
+        noise_costs = lengths + np.array([0, 0, 10.0, 0, 0, 0, 0, 0, 0])
+        args = (
+            get_adjacency(), get_in_adjacency(), [path_search.as_memoryview(costs) for costs in (lengths, noise_costs)],
+            path_search.as_memoryview(min_costs), orig, 2)
+        kwargs = {
+            'overlay_out_edges': overlay.out_edges,
+            'overlay_in_edges': overlay.in_edges,
+            'overlay_weights_list': [overlay.get_edge_weights(E.length.value)] * 2,
+            'overlay_min_weights': overlay.get_edge_weights(E.length.value),
+            'dest_bounds': dest_bounds
+        }
+        stats = {}
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            paths = path_search.find_least_cost_paths(*args, **kwargs, executor=executor, stats=stats)
+        self.assertEqual(paths, path_search.find_least_cost_paths(*args, **kwargs))
+        self.assertEqual(paths, [[10, 2], [9, 8]])
+        self.assertEqual(len(stats['search_ms']), 2)
+        self.assertIn('backward_search_ms', stats)
+
+    def test_least_cost_path_bidirectional(self):
+        node_xy = np.array([(0, 0), (10, 0), (10, 10), (0, 10)], dtype=np.float64)
+        h_scale = path_search.get_euclidean_heuristic_scale(node_xy, edge_uv, lengths)
+        self.assertEqual(h_scale, 1.0)
+        self.assertEqual(path_search.get_euclidean_heuristic_scale(node_xy, edge_uv, lengths / 2), 0.5)
+        args = (get_adjacency(), get_in_adjacency(), path_search.as_memoryview(lengths), path_search.as_memoryview(node_xy), h_scale)
+        self.assertEqual(path_search.find_least_cost_path_bidirectional(*args, 0, 2), [8])
+        self.assertEqual(path_search.find_least_cost_path_bidirectional(*args, 1, 0), [1])
+        self.assertIn(path_search.find_least_cost_path_bidirectional(*args, 1, 3), [[1, 7], [2, 4]])
+        self.assertIn(path_search.find_least_cost_path_bidirectional(*args, 2, 0), [[3, 1], [5, 6]])
+
+    def test_unreachable_destination(self):
+        adjacency = tuple(path_search.as_memoryview(a) for a in compiled_graphs.get_csr_adjacency(edge_uv[:2], 4))
+        with self.assertRaises(path_search.PathNotFoundException):
+            path_search.find_least_cost_path(*adjacency, path_search.as_memoryview(lengths[:2]), 0, 3)
+
+    def test_least_cost_path_via_overlay(self):
+        overlay = GraphOverlay(base_vcount=4, base_ecount=len(edge_uv))
+        orig = overlay.add_node(Point(5, 0))
+        dest = overlay.add_node(Point(10, 5))
+        self.assertEqual((orig, dest), (4, 5))
+        geom = LineString([(0, 0), (1, 1)])
+        e1 = overlay.add_edge({ E.uv.value: (orig, 1), E.length.value: 5.0, E.geometry.value: geom })
+        overlay.add_edge({ E.uv.value: (orig, 0), E.length.value: 5.0, E.geometry.value: geom })
+        e3 = overlay.add_edge({ E.uv.value: (2, dest), E.length.value: 5.0, E.geometry.value: geom })
+        self.assertEqual(e1, 9)
+        path = path_search.find_least_cost_path(
+            *get_adjacency(), path_search.as_memoryview(lengths), orig, dest,
+            overlay_out_edges=overlay.out_edges, overlay_weights=overlay.get_edge_weights(E.length.value))
+        self.assertEqual(path, [e1, 2, e3])
+
+    def test_concurrent_searches_via_overlays(self):
+        # requests running in parallel threads share the (read-only) base graph and use overlapping ids in their overlays
+        adjacency = get_adjacency()
+        weights = path_search.as_memoryview(lengths)
+        def find_path(dest_base_node: int) -> list:
+            overlay = GraphOverlay(base_vcount=4, base_ecount=len(edge_uv))
+            dest = overlay.add_node(Point(0, 0))
+            overlay.add_edge({ E.uv.value: (dest_base_node, dest), E.length.value: 1.0 })
+            return path_search.find_least_cost_path(
+                *adjacency, weights, 0, dest, overlay_out_edges=overlay.out_edges, overlay_weights=overlay.get_edge_weights(E.length.value))
+        dest_nodes = [1, 2, 3] * 20
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            paths = list(executor.map(find_path, dest_nodes))
+        expected = { 1: [0, 9], 2: [8, 9], 3: [7, 9] }
+        self.assertEqual(paths, [expected[node] for node in dest_nodes])
+
+    def test_least_cost_paths_to_many(self):
+        overlay = GraphOverlay(base_vcount=4, base_ecount=len(edge_uv))
+        dest = overlay.add_node(Point(10, 5))
+        e1 = overlay.add_edge({ E.uv.value: (2, dest), E.length.value: 5.0 })
+        paths = path_search.find_least_cost_paths_to_many(
+            *get_adjacency(), path_search.as_memoryview(lengths), 0, [1, 2, 3, dest],
+            overlay_out_edges=overlay.out_edges, overlay_weights=overlay.get_edge_weights(E.length.value))
+        self.assertEqual(paths, { 1: [0], 2: [8], 3: [7], dest: [8, e1] })
+        # unreachable destinations are omitted
+        adjacency = tuple(path_search.as_memoryview(a) for a in compiled_graphs.get_csr_adjacency(edge_uv[:2], 4))
+        self.assertEqual(path_search.find_least_cost_paths_to_many(*adjacency, path_search.as_memoryview(lengths[:2]), 0, [1, 3]), { 1: [0] })
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+import unittest
+import os
+import tempfile
+from app.logger import Logger
+from app.route_cache import RouteCache, FileRouteCacheBackend, get_route_cache_backend
+import utils.routing as routing_utils
+from utils.igraphs import Edge as E
+
+class TestRouteCache(unittest.TestCase):
+
+    def test_lru_eviction(self):
+        cache = RouteCache(max_size=2)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        self.assertEqual(cache.get('a'), 1)
+        # b is now the least recently used one
+        cache.put('c', 3)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual((cache.get('a'), cache.get('c')), (1, 3))
+        self.assertEqual(len(cache), 2)
+        self.assertEqual((cache.hits, cache.misses), (3, 1))
+
+    def test_invalidate_by_aq_generation(self):
+        cache = RouteCache(max_size=10)
+        cache.put(('od', 1), 'paths 1', generation=1)
+        cache.invalidate(2)
+        self.assertIsNone(cache.get(('od', 1)))
+        # a request that was routed with the previous AQI data is not cached after the invalidation
+        cache.put(('od', 1), 'paths 1', generation=1)
+        self.assertEqual(len(cache), 0)
+        cache.put(('od', 2), 'paths 2', generation=2)
+        self.assertEqual(cache.get_status(), { 'size': 1, 'max_size': 10, 'backend': 'none', 'hits': 0, 'shared_hits': 0, 'misses': 1, 'generation': 2 })
+
+    def test_disabled_cache(self):
+        cache = RouteCache(max_size=0)
+        cache.put('a', 1)
+        self.assertIsNone(cache.get('a'))
+
+    def test_shared_file_backend(self):
+        log = Logger(b_printing=False)
+        with tempfile.TemporaryDirectory() as cache_dir:
+            # the caches of two worker processes share the backend
+            cache_1 = RouteCache(max_size=10, backend=FileRouteCacheBackend(log, cache_dir))
+            cache_2 = RouteCache(max_size=10, backend=FileRouteCacheBackend(log, cache_dir))
+            key = 'walk/quiet/1190/3-4-12/aqi_2020-01-01T12.csv'
+            cache_1.put(key, b'{"path_FC": {}}')
+            self.assertEqual(cache_2.get(key), b'{"path_FC": {}}')
+            self.assertEqual(cache_2.get(key), b'{"path_FC": {}}')
+            self.assertIsNone(cache_2.get(key.replace('T12', 'T13')))
+            self.assertEqual((cache_2.shared_hits, cache_2.hits, cache_2.misses), (1, 1, 1))
+
+    def test_file_backend_pruning(self):
+        log = Logger(b_printing=False)
+        with tempfile.TemporaryDirectory() as cache_dir:
+            backend = FileRouteCacheBackend(log, cache_dir, max_entries=2, prune_interval=1)
+            backend.put('a', b'paths')
+            # make a the least recently used one
+            os.utime(os.path.join(cache_dir, os.listdir(cache_dir)[0]), (0, 0))
+            backend.put('b', b'paths')
+            backend.put('c', b'paths')
+            self.assertEqual(len(os.listdir(cache_dir)), 2)
+            self.assertIsNone(backend.get('a'))
+            self.assertEqual(backend.get('c'), b'paths')
+
+    def test_file_backend_pruning_by_size(self):
+        log = Logger(b_printing=False)
+        with tempfile.TemporaryDirectory() as cache_dir:
+            backend = FileRouteCacheBackend(log, cache_dir, max_bytes=10, prune_interval=1)
+            backend.put('a', b'paths')
+            os.utime(os.path.join(cache_dir, os.listdir(cache_dir)[0]), (0, 0))
+            backend.put('b', b'paths')
+            self.assertEqual(len(os.listdir(cache_dir)), 2)
+            backend.put('c', b'paths')
+            self.assertEqual(len(os.listdir(cache_dir)), 2)
+            self.assertIsNone(backend.get('a'))
+
+    def test_file_backend_failed_write(self):
+        log = Logger(b_printing=False)
+        with tempfile.TemporaryDirectory() as cache_dir:
+            backend = FileRouteCacheBackend(log, cache_dir)
+            # writing a str to a binary file fails after the tmp file is created
+            backend.put('a', 'paths')
+            self.assertEqual(os.listdir(cache_dir), [])
+            self.assertIsNone(backend.get('a'))
+
+    def test_redis_backend_fallback(self):
+        log = Logger(b_printing=False)
+        with tempfile.TemporaryDirectory() as cache_dir:
+            # without the url of redis, the file backend is used
+            self.assertEqual(get_route_cache_backend(log, backend='redis', directory=cache_dir).name, 'file')
+            self.assertEqual(get_route_cache_backend(log, backend='none').name, 'none')
+
+    def test_snapped_node_key(self):
+        self.assertEqual(routing_utils.get_snapped_node_key({ 'node': 5, 'add_links': False }, None), (5,))
+        link_edges = { 'node_from': 3, 'node_to': 4, 'link1': { E.length.value: 12.4 } }
+        self.assertEqual(routing_utils.get_snapped_node_key({ 'node': 10, 'add_links': True }, link_edges), (3, 4, 12))
+        link_edges['link1'][E.length.value] = 11.6
+        self.assertEqual(routing_utils.get_snapped_node_key({ 'node': 10, 'add_links': True }, link_edges), (3, 4, 12))
+        self.assertEqual(routing_utils.get_snapped_node_key({ 'node': 10, 'add_links': True }, link_edges, offset_quantum=5.0), (3, 4, 2))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+import unittest
+import asyncio
+import threading
+from app.logger import Logger
+from app.routing_pool import RoutingPool, RoutingPoolFullException
+
+class TestRoutingPool(unittest.IsolatedAsyncioTestCase):
+
+    async def test_coalesce_identical_requests(self):
+        pool = RoutingPool(Logger(), max_workers=2, max_queued=0)
+        calls = []
+        release = threading.Event()
+        def route(key: str) -> str:
+            calls.append(key)
+            release.wait(5)
+            return key.upper()
+        requests = [asyncio.ensure_future(pool.run_coalesced(key, route, key)) for key in ['a', 'a', 'b', 'a']]
+        await asyncio.sleep(0.05)
+        self.assertEqual(pool.get_status()['in_flight'], 2)
+        release.set()
+        self.assertEqual(await asyncio.gather(*requests), ['A', 'A', 'B', 'A'])
+        self.assertEqual(sorted(calls), ['a', 'b'])
+        self.assertEqual(pool.get_status(), { 'max_tasks': 2, 'pending': 0, 'in_flight': 0, 'run': 2, 'coalesced': 2, 'rejected': 0 })
+        pool.shutdown()
+
+    async def test_reject_when_full(self):
+        pool = RoutingPool(Logger(), max_workers=1, max_queued=1)
+        release = threading.Event()
+        running = [asyncio.ensure_future(pool.run(release.wait, 5)) for _ in range(2)]
+        await asyncio.sleep(0.05)
+        with self.assertRaises(RoutingPoolFullException):
+            await pool.run(release.wait, 5)
+        release.set()
+        self.assertEqual(await asyncio.gather(*running), [True, True])
+        # there is room again once the tasks are done
+        self.assertEqual(await pool.run(sum, [1, 2]), 3)
+        pool.shutdown()
+
+    async def test_cancelled_request_does_not_cancel_coalesced_task(self):
+        pool = RoutingPool(Logger(), max_workers=1, max_queued=0)
+        release = threading.Event()
+        def route() -> str:
+            release.wait(5)
+            return 'paths'
+        first = asyncio.ensure_future(pool.run_coalesced('a', route))
+        second = asyncio.ensure_future(pool.run_coalesced('a', route))
+        await asyncio.sleep(0.05)
+        first.cancel()
+        release.set()
+        self.assertEqual(await second, 'paths')
+        pool.shutdown()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,41 @@
+import unittest
+import numpy as np
+from shapely.geometry import Point, LineString
+from app.snapping_index import SnappingIndex
+
+# a long diagonal edge spanning many cells and two short edges sharing node 2
+node_xy = np.array([[0.0, 0.0], [1000.0, 1000.0], [500.0, 0.0], [600.0, 0.0], [500.0, 100.0]])
+edge_lines = [
+    [(0.0, 0.0), (400.0, 300.0), (1000.0, 1000.0)],
+    [(500.0, 0.0), (600.0, 0.0)],
+    [(500.0, 0.0), (500.0, 100.0)]
+]
+geom_offsets = np.cumsum([0] + [len(line) for line in edge_lines])
+geom_coords = np.array([xy for line in edge_lines for xy in line])
+
+class TestSnappingIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.index = SnappingIndex(node_xy, np.arange(len(edge_lines)), geom_offsets, geom_coords, cell_size=50.0)
+
+    def test_nearest_node(self):
+        self.assertEqual(self.index.find_nearest_node(510.0, 10.0)[0], 2)
+        self.assertEqual(self.index.find_nearest_node(590.0, 30.0)[0], 3)
+        # found with the largest search radius
+        node_id, dist = self.index.find_nearest_node(1300.0, 1000.0)
+        self.assertEqual((node_id, dist), (1, 300.0))
+        self.assertIsNone(self.index.find_nearest_node(5000.0, 5000.0))
+
+    def test_nearest_edge(self):
+        for x, y in [(420.0, 250.0), (700.0, 700.0), (550.0, 20.0), (520.0, 60.0), (900.0, 50.0)]:
+            dists = [LineString(line).distance(Point(x, y)) for line in edge_lines]
+            edge_id, dist, nearest_point = self.index.find_nearest_edge(x, y)
+            self.assertEqual(edge_id, int(np.argmin(dists)))
+            self.assertAlmostEqual(dist, min(dists), places=6)
+            line = LineString(edge_lines[edge_id])
+            self.assertAlmostEqual(Point(nearest_point).distance(line.interpolate(line.project(Point(x, y)))), 0.0, places=6)
+        # of edges at the same distance (from a shared node), the one with the lowest id is returned
+        self.assertEqual(self.index.find_nearest_edge(490.0, -10.0)[0], 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,6 +2,7 @@ import unittest
 import pytest
 import geopandas as gpd
 import time
+import numpy as np
 from shapely.geometry import Point, LineString
 import utils.igraphs as ig_utils
 import utils.geometry as geom_utils
@@ -24,6 +25,10 @@ walk_geom = walk.loc[0, 'geometry']
 logger = Logger(b_printing=True, log_file='test_utilities.log')
 G = GraphHandler(logger, subset=True)
 
+def get_path_aqi_attrs(aqi_exp_list) -> PathAqiAttrs:
+    aqis, lengths = (np.array(values, dtype=np.float64) for values in zip(*aqi_exp_list))
+    return PathAqiAttrs(aqis, aq_exps.get_aqi_classes(aqis), lengths)
+
 def find_edges_between_node_pair(self, graph, source: int, target: int, directed: bool = False) -> List[dict]:
     try:
         if (directed == True):
@@ -336,7 +341,7 @@ class TestAqiExposures(unittest.TestCase):
     
     def test_aqi_attrs(self):
         aqi_exp_list = [ (1.5, 3), (1.25, 5), (2.5, 10), (3.5, 2) ]
-        aqi_attrs = PathAqiAttrs('clean', aqi_exp_list)
+        aqi_attrs = get_path_aqi_attrs(aqi_exp_list)
         aqi_attrs.set_aqi_stats(3 + 5 + 10 + 2)
         self.assertAlmostEqual(aqi_attrs.aqi_m, 2.14, places=2)
         self.assertAlmostEqual(aqi_attrs.aqc, 5.69, places=2)
@@ -347,10 +352,10 @@ class TestAqiExposures(unittest.TestCase):
 
     def test_aqi_diff_attrs(self):
         aqi_exp_list = [ (1.5, 3), (1.25, 5), (2.5, 10), (3.5, 2) ]
-        aqi_attrs = PathAqiAttrs('clean', aqi_exp_list)
+        aqi_attrs = get_path_aqi_attrs(aqi_exp_list)
         aqi_attrs.set_aqi_stats(3 + 5 + 10 + 2)
         s_path_aqi_exp_list = [ (2.5, 1), (2.25, 5), (3.5, 10), (4.5, 2) ]
-        s_path_aqi_attrs = PathAqiAttrs('clean', s_path_aqi_exp_list)
+        s_path_aqi_attrs = get_path_aqi_attrs(s_path_aqi_exp_list)
         s_path_aqi_attrs.set_aqi_stats(3 + 5 + 10 + 2)
         aqi_attrs.set_aqi_diff_attrs(s_path_aqi_attrs, len_diff=2)
         self.assertAlmostEqual(aqi_attrs.aqi_m_diff, -1.07, places=2)
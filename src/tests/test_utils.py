@@ -125,8 +125,6 @@ def get_short_green_paths(logger: Logger, paths_type, G, from_latLon, to_latLon,
         path_FC, edge_FC = path_finder.process_paths_to_FC()
     except Exception as e:
         return None # jsonify({'error': str(e)})
-    finally:
-        path_finder.delete_added_graph_features()
 
     # return jsonify({ 'path_FC': path_FC, 'edge_FC': edge_FC })
 
@@ -6,7 +6,9 @@ exposures to air pollution between paths.
 """
 
 from typing import List, Set, Dict, Tuple
+import numpy as np
 from app.logger import Logger
+from utils.compiled_graphs import round_array
 
 class InvalidAqiException(Exception):
     pass
@@ -60,6 +62,29 @@ def get_aqi_costs(aqi: float, length: float, sens: List[float], length_b: float=
     aq_costs = { prefix +'aqc_'+ str(sen) : calc_aqi_cost(length, aqi_coeff, length_b=length_b, sen=sen) for sen in sens }
     return aq_costs
 
+def get_aqi_coeffs(aqis: np.ndarray) -> np.ndarray:
+    """Returns AQI cost coefficients for an array of AQI values (see get_aqi_coeff). Invalid AQI values (aqi < 0.95) 
+    get the high coefficient 10 as in get_aqi_costs.
+    """
+    return np.where(aqis < 0.95, 10.0, np.where(aqis < 1.0, 0.0, (aqis - 1) / 4))
+
+def get_aqi_cost_arrays(
+    aqis: np.ndarray, 
+    lengths: np.ndarray, 
+    sens: List[float], 
+    lengths_b: np.ndarray = None, 
+    prefix: str = ''
+    ) -> Dict[str, np.ndarray]:
+    """Returns AQI based costs of a set of edges as arrays by cost attribute (e.g. aqc_5), i.e. the same costs as 
+    get_aqi_costs returns for each edge. Bike lengths that are zero or NaN are replaced by lengths.
+    """
+    aqi_coeffs = get_aqi_coeffs(aqis)
+    base_costs = lengths if lengths_b is None else np.where(np.isnan(lengths_b) | (lengths_b == 0), lengths, lengths_b)
+    return { 
+        prefix +'aqc_'+ str(sen) : round_array(base_costs + lengths * aqi_coeffs * sen, 2) 
+        for sen in sens
+    }
+
 def get_aqi_cost_from_exp(aqi_exp: Tuple[float, float], sen: float=1.0) -> float:
     """Returns an AQI cost for a single AQI exposure (aqi, exposure as meters). 
     Length is not included in the cost as base cost.
@@ -83,6 +108,11 @@ def get_aqi_class(aqi: float) -> int:
     elif aqi >= 5.0: return 5
     else: return 0
 
+def get_aqi_classes(aqis: np.ndarray) -> np.ndarray:
+    """Classifies an array of AQI values (see get_aqi_class). Missing AQI values (NaN) get class 0.
+    """
+    return np.where(np.isnan(aqis), 0, np.clip(np.floor(aqis), 1, 5)).astype(np.int64)
+
 def get_aqi_class_exp_list(aqi_exp_list: List[Tuple[float, float]]) -> List[Tuple[int, float]]:
     """Turns a list of AQI exposures to a list of AQI class exposures.
     E.g.[ (1.5, 42.4), (1.1, 13.4), (2.7, 52.3) ] -> [ (1, 42.4), (1, 13.4), (2, 52.3) ]
@@ -127,3 +157,25 @@ def get_mean_aqi(aqi_exp_list: List[Tuple[float, float]]) -> float:
     total_dist = sum([aqi_exp[1] for aqi_exp in aqi_exp_list])
     total_aqi = sum([aqi_exp[0] * aqi_exp[1] for aqi_exp in aqi_exp_list])
     return round(total_aqi/total_dist, 2)
+
+def get_mean_aqi_from_arrays(aqis: np.ndarray, lengths: np.ndarray) -> float:
+    """Returns the mean AQI of a set of edges (e.g. a path) weighted by their lengths (see get_mean_aqi).
+    """
+    return round(float(np.dot(aqis, lengths) / lengths.sum()), 2)
+
+def get_total_aqi_cost_from_arrays(aqis: np.ndarray, lengths: np.ndarray, sen: float = 1) -> float:
+    """Returns the total AQI cost of a set of edges by their AQI values and lengths (see get_total_aqi_cost_from_exps).
+    Raises InvalidAqiException if any of the AQI values is missing or invalid.
+    """
+    if ((np.isnan(aqis) | (aqis < 0.95)).any()):
+        raise InvalidAqiException('Received invalid AQI value: '+ str(aqis[np.isnan(aqis) | (aqis < 0.95)][0]))
+    aqi_coeffs = np.where(aqis < 1.0, 0.0, (aqis - 1) / 4)
+    return sum(round_array(lengths * aqi_coeffs * sen, 2).tolist())
+
+def aggregate_aqi_class_exps_from_arrays(aqi_classes: np.ndarray, lengths: np.ndarray) -> Dict[int, float]:
+    """Returns the exposures (m) to different AQI classes (see aggregate_aqi_class_exps) of a set of edges by their
+    AQI classes and lengths.
+    """
+    classes, class_idxs = np.unique(aqi_classes, return_inverse=True)
+    exps = np.bincount(class_idxs, weights=lengths, minlength=len(classes))
+    return dict(zip(classes.tolist(), round_array(exps, 2).tolist()))
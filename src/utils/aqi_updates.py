@@ -0,0 +1,56 @@
+"""
+This module provides functions for reading and writing AQI update files, i.e. AQI values for the edges of a graph
+(by edge id). Two formats are supported:
+
+    aqi_<YYYY-MM-DDTHH>.csv: A CSV file with columns id_ig and aqi.
+    aqi_<YYYY-MM-DDTHH>.npy: A NumPy array of records (id_ig: int32, aqi: float32) sorted by id_ig.
+
+The binary (.npy) format is read as a memory map, so reading it takes practically no time or memory regardless of
+the number of edges, whereas parsing the CSV format requires building a DataFrame of all updates.
+
+"""
+
+import os
+from typing import Tuple
+import numpy as np
+import pandas as pd
+from utils.igraphs import Edge as E
+
+aqi_update_dtype = np.dtype([(E.id_ig.name, np.int32), (E.aqi.name, np.float32)])
+aqi_update_extensions = ['.npy', '.csv']
+
+def write_aqi_update_npy(file_path: str, edge_ids: np.ndarray, aqis: np.ndarray) -> None:
+    """Writes AQI updates to a file in the binary format. The file is first written with a temporary name and then
+    renamed, so that a reader never sees a partially written file.
+    """
+    updates = np.empty(len(edge_ids), dtype=aqi_update_dtype)
+    order = np.argsort(edge_ids, kind='stable')
+    updates[E.id_ig.name] = np.asarray(edge_ids)[order]
+    updates[E.aqi.name] = np.asarray(aqis)[order]
+    tmp_file_path = file_path +'.tmp'
+    with open(tmp_file_path, 'wb') as tmp_file:
+        np.save(tmp_file, updates, allow_pickle=False)
+    os.replace(tmp_file_path, file_path)
+
+def read_aqi_update_npy(file_path: str) -> Tuple[np.ndarray, np.ndarray]:
+    """Returns the edge ids (memory-mapped) and AQI values of an AQI update file in the binary format. The AQI values are 
+    rounded to 5 decimals when converted from float32, so that they equal the values of the CSV format (e.g. 2.96 
+    instead of 2.9600000381).
+    """
+    updates = np.load(file_path, mmap_mode='r', allow_pickle=False)
+    if (updates.dtype != aqi_update_dtype):
+        raise ValueError(f'Unexpected dtype of AQI updates: {updates.dtype} (expected {aqi_update_dtype})')
+    return updates[E.id_ig.name], np.round(updates[E.aqi.name].astype(np.float64), 5)
+
+def read_aqi_update_csv(file_path: str) -> Tuple[np.ndarray, np.ndarray]:
+    """Returns the edge ids and AQI values of an AQI update file in the CSV format as arrays.
+    """
+    updates = pd.read_csv(file_path, usecols=[E.id_ig.name, E.aqi.name])
+    return updates[E.id_ig.name].to_numpy(), updates[E.aqi.name].to_numpy(dtype=np.float64)
+
+def read_aqi_update_file(file_path: str) -> Tuple[np.ndarray, np.ndarray]:
+    """Returns the edge ids and AQI values of an AQI update file (in either format, by file extension).
+    """
+    if (file_path.endswith('.npy')):
+        return read_aqi_update_npy(file_path)
+    return read_aqi_update_csv(file_path)
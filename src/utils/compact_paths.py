@@ -0,0 +1,154 @@
+"""
+This module provides functions for writing paths to compact alternatives of the GeoJSON response: either as a JSON
+object with the path geometries as encoded polylines or as a binary with varint encoded coordinates. In both formats,
+the coordinates are delta encoded integers (degrees * 10^precision) and the edge groups of the paths (e.g. by noise
+level or AQI class) are given as coordinate index ranges of the paths instead of duplicated lines.
+
+Polyline format (JSON):
+    precision: The number of decimals of the coordinates (6).
+    paths: A list of paths as { polyline, properties }. The polylines follow the encoded polyline algorithm format
+        (e.g. of Google Maps) with lat, lon coordinate order.
+    edge_groups: { attr, groups }, where groups is a list of [path index, coordinate start, coordinate end, value]
+        (coordinate end is exclusive).
+
+Binary format:
+    magic: b'GPB1'
+    header length: uint32 (little endian)
+    header: A JSON object (UTF-8) with precision, paths as a list of { coord_count, properties } and edge_groups
+        (as in the polyline format).
+    coordinates: Zigzag varint (protobuf style) encoded lon, lat deltas of the coordinates of all paths (in order of
+        the paths), the first coordinate of each path being relative to (0, 0).
+
+"""
+
+from typing import List, Tuple
+import json
+import struct
+import numpy as np
+import utils.geojson as geojson
+
+binary_magic = b'GPB1'
+
+def get_coord_deltas(coords: np.ndarray, precision: int = 6) -> np.ndarray:
+    """Returns coordinates (an array of n x 2) as integers (coordinate * 10^precision) delta encoded by rows, i.e. the
+    first row is relative to (0, 0) and the others to the previous row.
+    """
+    ints = np.round(coords[:, :2] * 10 ** precision).astype(np.int64)
+    return np.diff(ints, axis=0, prepend=np.zeros((1, 2), dtype=np.int64))
+
+def zigzag_encode(values: np.ndarray) -> np.ndarray:
+    """Maps signed integers to non-negative integers (0, -1, 1, -2... to 0, 1, 2, 3...) so that numbers with small
+    absolute values get short encodings.
+    """
+    values = values.astype(np.int64)
+    return (values << 1) ^ (values >> 63)
+
+def split_to_chunks(values: np.ndarray, bits: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Splits non-negative integers to chunks of bits (the least significant chunk first) as in varint encoding.
+
+    Returns:
+        The chunks of all values (in order) and a boolean array telling whether a value continues after the chunk.
+    """
+    chunk_counts = np.ones(len(values), dtype=np.int64)
+    rest = values >> bits
+    while (rest.any()):
+        chunk_counts += rest > 0
+        rest = rest >> bits
+    offsets = np.cumsum(chunk_counts) - chunk_counts
+    chunks = np.zeros(chunk_counts.sum(), dtype=np.int64)
+    continues = np.zeros(len(chunks), dtype=bool)
+    for chunk_idx in range(chunk_counts.max() if len(values) else 0):
+        has_chunk = chunk_counts > chunk_idx
+        positions = offsets[has_chunk] + chunk_idx
+        chunks[positions] = (values[has_chunk] >> (bits * chunk_idx)) & ((1 << bits) - 1)
+        continues[positions] = chunk_counts[has_chunk] > chunk_idx + 1
+    return chunks, continues
+
+def encode_polyline(coords: np.ndarray, precision: int = 6) -> str:
+    """Encodes coordinates (an array of n x 2 in lon, lat order) to a polyline (with lat, lon order).
+    """
+    values = zigzag_encode(get_coord_deltas(coords, precision=precision)[:, ::-1].ravel())
+    chunks, continues = split_to_chunks(values, 5)
+    return (chunks + np.where(continues, 0x20, 0) + 63).astype(np.uint8).tobytes().decode('ascii')
+
+def decode_polyline(polyline: str, precision: int = 6) -> np.ndarray:
+    """Decodes a polyline to coordinates (an array of n x 2 in lon, lat order).
+    """
+    values, value, shift = [], 0, 0
+    for char in polyline.encode('ascii'):
+        chunk = char - 63
+        value |= (chunk & 0x1f) << shift
+        shift += 5
+        if (chunk < 0x20):
+            values.append(~(value >> 1) if value & 1 else value >> 1)
+            value, shift = 0, 0
+    lat_lons = np.cumsum(np.array(values, dtype=np.int64).reshape(-1, 2), axis=0) / 10 ** precision
+    return lat_lons[:, ::-1]
+
+def encode_varints(values: np.ndarray) -> bytes:
+    """Encodes signed integers as zigzag varints (as in protobuf).
+    """
+    chunks, continues = split_to_chunks(zigzag_encode(values), 7)
+    return (chunks | np.where(continues, 0x80, 0)).astype(np.uint8).tobytes()
+
+def get_polyline_paths(
+    coord_arrays: List[np.ndarray],
+    props: List[dict],
+    edge_group_attr: str,
+    edge_groups: List[list],
+    precision: int = 6
+    ) -> bytes:
+    """Returns paths (coordinate arrays & properties) and their edge groups in the polyline format as JSON bytes.
+    """
+    return geojson.dumps({
+        'precision': precision,
+        'paths': [
+            { 'polyline': encode_polyline(coords, precision=precision), 'properties': path_props }
+            for coords, path_props in zip(coord_arrays, props)
+        ],
+        'edge_groups': { 'attr': edge_group_attr, 'groups': edge_groups }
+    })
+
+def get_binary_paths(
+    coord_arrays: List[np.ndarray],
+    props: List[dict],
+    edge_group_attr: str,
+    edge_groups: List[list],
+    precision: int = 6
+    ) -> bytes:
+    """Returns paths (coordinate arrays & properties) and their edge groups in the binary format.
+    """
+    header = geojson.dumps({
+        'precision': precision,
+        'paths': [
+            { 'coord_count': len(coords), 'properties': path_props }
+            for coords, path_props in zip(coord_arrays, props)
+        ],
+        'edge_groups': { 'attr': edge_group_attr, 'groups': edge_groups }
+    })
+    deltas = [get_coord_deltas(coords, precision=precision).ravel() for coords in coord_arrays]
+    coords = encode_varints(np.concatenate(deltas)) if deltas else b''
+    return binary_magic + struct.pack('<I', len(header)) + header + coords
+
+def read_binary_paths(data: bytes) -> Tuple[dict, List[np.ndarray]]:
+    """Reads paths written in the binary format. Returns the header and the coordinate arrays of the paths.
+    """
+    if (data[:4] != binary_magic):
+        raise ValueError('not a binary paths response')
+    header_len = struct.unpack('<I', data[4:8])[0]
+    header = json.loads(data[8:8 + header_len])
+    values, value, shift = [], 0, 0
+    for byte in data[8 + header_len:]:
+        value |= (byte & 0x7f) << shift
+        shift += 7
+        if (byte < 0x80):
+            values.append(~(value >> 1) if value & 1 else value >> 1)
+            value, shift = 0, 0
+    deltas = np.array(values, dtype=np.int64).reshape(-1, 2)
+    coord_arrays = []
+    offset = 0
+    for path in header['paths']:
+        count = path['coord_count']
+        coord_arrays.append(np.cumsum(deltas[offset:offset + count], axis=0) / 10 ** header['precision'])
+        offset += count
+    return header, coord_arrays
@@ -0,0 +1,469 @@
+"""
+This module provides functions for compiling a graph (read from GraphML) to a compact binary format and for reading
+the compiled graph back. Reading GraphML is slow since every edge and node attribute is stored as a string that needs to be
+evaluated (ast.literal_eval, wkt.loads) at startup. In the compiled format, the attributes are stored as NumPy arrays
+that can be read (almost) as is.
+
+A compiled graph is a directory containing a meta.json file and the following arrays as .npy files:
+    edge_uv: Source and target nodes of the edges (ecount x 2).
+    out_offsets, out_edges, out_targets: CSR adjacency of the graph (outgoing edges and their target nodes by source node).
+    in_offsets, in_edges, in_sources: Reverse CSR adjacency of the graph (incoming edges and their source nodes by target node).
+    min_costs: Lower bounds for all edge costs (length, bike length and the noise & AQ costs derived from them).
+    landmarks, landmark_dists_from, landmark_dists_to: Landmark nodes and the least costs (by min_costs) from and to them 
+        from all nodes (vcount x landmark count), used as A* lower bounds (ALT). 
+    node_xy: Coordinates of the nodes (vcount x 2).
+    geom_offsets, geom_coords, has_geom: Packed coordinate buffer of the projected edge geometries (EPSG:3879).
+    wgs_ranges, wgs_reversed, wgs_coords, has_geom_wgs: Packed coordinate buffer of the edge geometries in WGS84 
+        (EPSG:4326), pre-rounded to 6 decimals for path output. The edges of a way share their coordinates: the
+        coordinates of an edge are wgs_coords[start:end] by wgs_ranges, reversed if wgs_reversed is set.
+    noise_offsets, noise_dbs, noise_exps, noises_missing: Offsets table and values of the noise exposure dictionaries.
+    noise_matrix: The noise exposures (incl. the estimated exposures to 40 dB) as a dense float32 matrix of exposures (m)
+        by edge and dB level (ecount x 40), so that the exposures of a path are a sum of its rows.
+    e_<attr>: Edge attribute columns, i.e. lengths and noise costs (e.g. e_l, e_nc_0.1, e_bnc_0.1).
+
+The arrays are read as read-only memory maps, so that all (gunicorn) worker processes share the same physical pages
+of the graph via the page cache instead of holding private copies of it.
+
+"""
+
+import os
+import json
+from enum import Enum
+from datetime import datetime
+from typing import List, Set, Dict, Tuple
+import numpy as np
+import igraph as ig
+from shapely.geometry import Point, LineString
+import utils.noise_exposures as noise_exps
+from app.logger import Logger
+from utils.igraphs import Edge as E, Node as N
+
+version = 1.5
+landmark_count = 16
+noise_db_bins = noise_exps.noise_db_bins
+
+class GraphArray(Enum):
+    edge_uv = 'edge_uv'
+    out_offsets = 'out_offsets'
+    out_edges = 'out_edges'
+    out_targets = 'out_targets'
+    in_offsets = 'in_offsets'
+    in_edges = 'in_edges'
+    in_sources = 'in_sources'
+    min_costs = 'min_costs'
+    landmarks = 'landmarks'
+    landmark_dists_from = 'landmark_dists_from'
+    landmark_dists_to = 'landmark_dists_to'
+    node_xy = 'node_xy'
+    geom_offsets = 'geom_offsets'
+    geom_coords = 'geom_coords'
+    wgs_ranges = 'wgs_ranges'
+    wgs_reversed = 'wgs_reversed'
+    wgs_coords = 'wgs_coords'
+    has_geom = 'has_geom'
+    has_geom_wgs = 'has_geom_wgs'
+    noise_offsets = 'noise_offsets'
+    noise_dbs = 'noise_dbs'
+    noise_exps = 'noise_exps'
+    noises_missing = 'noises_missing'
+    noise_matrix = 'noise_matrix'
+
+# edge attributes that are compiled as columns (attribute: dtype)
+edge_attr_columns = {
+    E.id_way: np.int64,
+    E.length: np.float64,
+    E.length_b: np.float64
+}
+
+def get_compiled_graph_dir(graph_file: str) -> str:
+    """Returns the name of the directory of a compiled graph, e.g. graphs/hma.graphml -> graphs/hma_compiled/.
+    """
+    return os.path.splitext(graph_file)[0] + '_compiled/'
+
+def compiled_graph_exists(graph_dir: str) -> bool:
+    return os.path.isfile(os.path.join(graph_dir, 'meta.json'))
+
+def get_csr_adjacency(edge_uv: np.ndarray, vcount: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Returns the outgoing edges of the nodes in compressed sparse row (CSR) format: out_offsets (vcount + 1),
+    out_edges (ids of the edges ordered by source node) and out_targets (target nodes of the out_edges).
+    """
+    out_edges = np.argsort(edge_uv[:, 0], kind='stable').astype(np.int32)
+    out_counts = np.bincount(edge_uv[:, 0], minlength=vcount)
+    out_offsets = np.zeros(vcount + 1, dtype=np.int64)
+    np.cumsum(out_counts, out=out_offsets[1:])
+    out_targets = edge_uv[out_edges, 1].astype(np.int32)
+    return out_offsets, out_edges, out_targets
+
+def get_min_costs(lengths: np.ndarray, lengths_b: np.ndarray) -> np.ndarray:
+    """Returns lower bounds for the costs of the edges. All costs are either length or bike length (if set) plus a 
+    non-negative exposure based cost rounded to cm, hence the lesser of the lengths floored to cm is a lower bound 
+    for all of them.
+    """
+    lengths_b = np.where(lengths_b > 0, lengths_b, lengths)
+    return np.floor(np.fmin(lengths, lengths_b) * 100) / 100
+
+def get_landmarks(
+    edge_uv: np.ndarray, 
+    vcount: int, 
+    weights: np.ndarray, 
+    count: int = landmark_count, 
+    directed: bool = True
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Selects landmark nodes by farthest selection (each landmark is the node farthest from the previous ones) and
+    calculates the least costs from the landmarks to all nodes and from all nodes to the landmarks.
+
+    Returns:
+        The landmarks and the least costs from and to the landmarks as arrays of shape (vcount x count) 
+        (inf for nodes that cannot be reached).
+    """
+    G = ig.Graph(n=vcount, edges=edge_uv.tolist(), directed=directed)
+    weights = weights.tolist()
+    count = min(count, vcount)
+    landmarks = np.zeros(count, dtype=np.int32)
+    dists_from = np.empty((vcount, count), dtype=np.float64)
+    dists_to = np.empty((vcount, count), dtype=np.float64)
+    # start from the node farthest from an arbitrary node
+    min_dists = np.array(G.distances(source=0, weights=weights, mode='out')[0], dtype=np.float64)
+    for idx in range(count):
+        landmarks[idx] = np.argmax(np.where(np.isfinite(min_dists), min_dists, -1))
+        dists_from[:, idx] = G.distances(source=int(landmarks[idx]), weights=weights, mode='out')[0]
+        dists_to[:, idx] = G.distances(source=int(landmarks[idx]), weights=weights, mode='in')[0]
+        min_dists = dists_from[:, idx] if (idx == 0) else np.minimum(min_dists, dists_from[:, idx])
+    return landmarks, dists_from, dists_to
+
+def pack_line_coords(geoms: list) -> Tuple[np.ndarray, np.ndarray]:
+    """Packs the coordinates of a list of line geometries to a single coordinate buffer (n x 2) with offsets (len(geoms) + 1).
+    Geometries other than LineStrings (e.g. None) are packed as empty coordinate ranges.
+    """
+    counts = np.array([len(geom.coords) if isinstance(geom, LineString) else 0 for geom in geoms], dtype=np.int64)
+    offsets = np.zeros(len(geoms) + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    coords = np.empty((offsets[-1], 2), dtype=np.float64)
+    for idx, geom in enumerate(geoms):
+        if (counts[idx] > 0):
+            coords[offsets[idx]:offsets[idx+1]] = np.asarray(geom.coords)[:, :2]
+    return offsets, coords
+
+def pack_shared_line_coords(geoms: list, id_ways: list, ndigits: int = 6) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Packs the (rounded) coordinates of a list of line geometries to a single coordinate buffer (n x 2) in which the 
+    coordinates shared by the edges of a way are stored only once, i.e. an edge having the same or the reversed 
+    coordinates of a previously packed edge of the same way refers to the coordinates of that edge. Geometries other 
+    than LineStrings (e.g. None) are packed as empty coordinate ranges.
+
+    Returns:
+        The coordinate buffer, the coordinate ranges of the edges (len(geoms) x 2: start, end) and a boolean array
+        telling whether the coordinates of the edges are reversed.
+    """
+    ranges = np.zeros((len(geoms), 2), dtype=np.int64)
+    reversed_coords = np.zeros(len(geoms), dtype=bool)
+    coord_arrays = []
+    way_coords: Dict[int, List[Tuple[int, int, np.ndarray]]] = {}
+    coord_count = 0
+    for idx, (geom, id_way) in enumerate(zip(geoms, id_ways)):
+        if (not isinstance(geom, LineString)):
+            ranges[idx] = coord_count
+            continue
+        coords = round_array(np.asarray(geom.coords, dtype=np.float64)[:, :2], ndigits)
+        shared = False
+        for start, end, way_edge_coords in way_coords.get(id_way, []) if (id_way is not None) else []:
+            if (np.array_equal(coords, way_edge_coords) or np.array_equal(coords, way_edge_coords[::-1])):
+                ranges[idx] = (start, end)
+                reversed_coords[idx] = not np.array_equal(coords, way_edge_coords)
+                shared = True
+                break
+        if shared:
+            continue
+        ranges[idx] = (coord_count, coord_count + len(coords))
+        if (id_way is not None):
+            way_coords.setdefault(id_way, []).append((coord_count, coord_count + len(coords), coords))
+        coord_arrays.append(coords)
+        coord_count += len(coords)
+    coords = np.concatenate(coord_arrays) if coord_arrays else np.empty((0, 2), dtype=np.float64)
+    return coords, ranges, reversed_coords
+
+def get_coords(arrays: Dict[str, np.ndarray], edge_id: int) -> np.ndarray:
+    """Returns the projected coordinates of an edge as a read-only view (n x 2) to the packed coordinates.
+    """
+    start, end = arrays[GraphArray.geom_offsets.value][edge_id:edge_id+2].tolist()
+    return arrays[GraphArray.geom_coords.value][start:end]
+
+def get_wgs_coords(arrays: Dict[str, np.ndarray], edge_id: int) -> np.ndarray:
+    """Returns the (rounded) WGS84 coordinates of an edge as a read-only view (n x 2) to the packed coordinates.
+    """
+    start, end = arrays[GraphArray.wgs_ranges.value][edge_id].tolist()
+    coords = arrays[GraphArray.wgs_coords.value][start:end]
+    return coords[::-1] if arrays[GraphArray.wgs_reversed.value][edge_id] else coords
+
+def get_range_indexes(starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    """Returns the indexes of ranges [start, end) concatenated (in order) to a single array.
+    """
+    counts = ends - starts
+    return np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+
+def get_edges_coords(arrays: Dict[str, np.ndarray], edge_ids: np.ndarray, wgs: bool = False) -> Tuple[np.ndarray, np.ndarray]:
+    """Returns the (projected or WGS84) coordinates of a sequence of edges (e.g. a path) concatenated to a single array
+    (n x 2) as gathered from the packed coordinates at once (see get_coords and get_wgs_coords).
+
+    Returns:
+        The coordinates and the number of coordinates of each edge.
+    """
+    if (not wgs):
+        offsets = arrays[GraphArray.geom_offsets.value]
+        starts, ends = offsets[edge_ids], offsets[edge_ids + 1]
+        return arrays[GraphArray.geom_coords.value][get_range_indexes(starts, ends)], ends - starts
+    ranges = arrays[GraphArray.wgs_ranges.value][edge_ids]
+    starts, ends = ranges[:, 0], ranges[:, 1]
+    counts = ends - starts
+    idxs = get_range_indexes(starts, ends)
+    # the coordinates of a reversed edge are read from end - 1 to start
+    reversed_coords = np.repeat(arrays[GraphArray.wgs_reversed.value][edge_ids], counts)
+    idxs = np.where(reversed_coords, np.repeat(starts + ends - 1, counts) - idxs, idxs)
+    return arrays[GraphArray.wgs_coords.value][idxs], counts
+
+def get_line_geom(arrays: Dict[str, np.ndarray], edge_id: int, wgs: bool = False) -> LineString:
+    """Returns the geometry of an edge as LineString (or None if the edge has no geometry) from the packed coordinates.
+    """
+    if (not wgs):
+        if (not arrays[GraphArray.has_geom.value][edge_id]):
+            return None
+        return LineString(get_coords(arrays, edge_id))
+    if (not arrays[GraphArray.has_geom_wgs.value][edge_id]):
+        return None
+    return LineString(get_wgs_coords(arrays, edge_id))
+
+def pack_noises(noises_list: List[Dict[int, float]]) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Packs a list of noise exposure dictionaries to arrays of offsets, dB levels and exposures (m). Missing noise data
+    (None) is recorded to a separate mask in order to distinguish it from empty noise exposures ({}).
+    """
+    noises_missing = np.array([noises is None for noises in noises_list], dtype=bool)
+    counts = np.array([len(noises) if noises else 0 for noises in noises_list], dtype=np.int64)
+    offsets = np.zeros(len(noises_list) + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    dbs = np.fromiter((db for noises in noises_list if noises for db in noises.keys()), dtype=np.int16, count=offsets[-1])
+    exps = np.fromiter((exp for noises in noises_list if noises for exp in noises.values()), dtype=np.float64, count=offsets[-1])
+    return offsets, dbs, exps, noises_missing
+
+def unpack_noises(offsets: np.ndarray, dbs: np.ndarray, exps: np.ndarray, noises_missing: np.ndarray) -> List[Dict[int, float]]:
+    dbs_list = dbs.tolist()
+    exps_list = exps.tolist()
+    return [
+        None if missing else dict(zip(dbs_list[start:end], exps_list[start:end]))
+        for start, end, missing in zip(offsets[:-1].tolist(), offsets[1:].tolist(), noises_missing.tolist())
+    ]
+
+def get_noises(arrays: Dict[str, np.ndarray], edge_id: int) -> Dict[int, float]:
+    """Returns the noise exposures of an edge as dictionary (or None if noise data is missing for the edge).
+    """
+    if (arrays[GraphArray.noises_missing.value][edge_id]):
+        return None
+    start, end = arrays[GraphArray.noise_offsets.value][edge_id:edge_id+2].tolist()
+    return dict(zip(
+        arrays[GraphArray.noise_dbs.value][start:end].tolist(),
+        arrays[GraphArray.noise_exps.value][start:end].tolist()))
+
+def get_noises_from_bins(noise_bins: np.ndarray) -> Dict[int, float]:
+    """Returns noise exposures by dB level (see noise_exposures.aggregate_exposure_bins) as a noise exposure dictionary of the dB levels with
+    exposures, rounded as in noise_exposures.aggregate_exposures.
+    """
+    dbs = np.flatnonzero(noise_bins)
+    return dict(zip((dbs + noise_db_bins[0]).tolist(), round_array(noise_bins[dbs], 2).tolist()))
+
+def get_compiled_arrays(G: ig.Graph) -> Tuple[dict, Dict[str, np.ndarray]]:
+    """Returns the metadata and the arrays of a graph (read from GraphML) in the compiled graph format.
+    """
+    vcount = G.vcount()
+    ecount = G.ecount()
+    arrays: Dict[str, np.ndarray] = {}
+
+    edge_uv = np.array(G.get_edgelist(), dtype=np.int32).reshape(ecount, 2)
+    out_offsets, out_edges, out_targets = get_csr_adjacency(edge_uv, vcount)
+    arrays[GraphArray.edge_uv.value] = edge_uv
+    arrays[GraphArray.out_offsets.value] = out_offsets
+    arrays[GraphArray.out_edges.value] = out_edges
+    arrays[GraphArray.out_targets.value] = out_targets
+    # reverse adjacency is the CSR adjacency of the graph with reversed edges
+    in_offsets, in_edges, in_sources = get_csr_adjacency(edge_uv[:, ::-1], vcount)
+    arrays[GraphArray.in_offsets.value] = in_offsets
+    arrays[GraphArray.in_edges.value] = in_edges
+    arrays[GraphArray.in_sources.value] = in_sources
+
+    arrays[GraphArray.node_xy.value] = np.array(
+        [(geom.x, geom.y) if isinstance(geom, Point) else (np.nan, np.nan) for geom in G.vs[N.geometry.value]],
+        dtype=np.float64).reshape(vcount, 2)
+
+    geom_offsets, geom_coords = pack_line_coords(G.es[E.geometry.value])
+    wgs_coords, wgs_ranges, wgs_reversed = pack_shared_line_coords(G.es[E.geom_wgs.value], G.es[E.id_way.value])
+    arrays[GraphArray.geom_offsets.value] = geom_offsets
+    arrays[GraphArray.geom_coords.value] = geom_coords
+    arrays[GraphArray.wgs_ranges.value] = wgs_ranges
+    arrays[GraphArray.wgs_reversed.value] = wgs_reversed
+    arrays[GraphArray.wgs_coords.value] = wgs_coords
+    arrays[GraphArray.has_geom.value] = np.array([isinstance(geom, LineString) for geom in G.es[E.geometry.value]], dtype=bool)
+    arrays[GraphArray.has_geom_wgs.value] = np.array([isinstance(geom, LineString) for geom in G.es[E.geom_wgs.value]], dtype=bool)
+
+    noise_offsets, noise_dbs, noise_exps, noises_missing = pack_noises(G.es[E.noises.value])
+    arrays[GraphArray.noise_offsets.value] = noise_offsets
+    arrays[GraphArray.noise_dbs.value] = noise_dbs
+    arrays[GraphArray.noise_exps.value] = noise_exps
+    arrays[GraphArray.noises_missing.value] = noises_missing
+
+    for attr, dtype in edge_attr_columns.items():
+        values = [value if value is not None else np.nan for value in G.es[attr.value]]
+        arrays[attr.value] = np.array(values, dtype=dtype)
+    arrays[GraphArray.min_costs.value] = get_min_costs(arrays[E.length.value], arrays[E.length_b.value])
+    landmarks, dists_from, dists_to = get_landmarks(edge_uv, vcount, arrays[GraphArray.min_costs.value], directed=G.is_directed())
+    arrays[GraphArray.landmarks.value] = landmarks
+    arrays[GraphArray.landmark_dists_from.value] = dists_from
+    arrays[GraphArray.landmark_dists_to.value] = dists_to
+
+    meta = {
+        'version': version,
+        'directed': G.is_directed(),
+        'vcount': vcount,
+        'ecount': ecount,
+        'edge_attrs': [attr.value for attr in edge_attr_columns.keys()],
+        'noise_sens': []
+    }
+    return meta, arrays
+
+def round_array(values: np.ndarray, ndigits: int) -> np.ndarray:
+    """Rounds an array of floats like the built-in round() does for each value. np.round scales the values by 
+    10**ndigits before rounding, which may round values lying (almost) halfway between two roundings the other way.
+    Such values are rounded with round(). The values are rounded as float64 (e.g. float32 rows of noise_matrix).
+    """
+    values = np.asarray(values, dtype=np.float64)
+    rounded = np.round(values, ndigits)
+    scaled = values * 10**ndigits
+    near_half = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    if (near_half.any()):
+        rounded[near_half] = [round(value, ndigits) for value in values[near_half].tolist()]
+    return rounded
+
+def get_noise_matrix(offsets: np.ndarray, dbs: np.ndarray, exps: np.ndarray, dtype=np.float64) -> np.ndarray:
+    """Returns the packed noise exposures as a dense matrix of exposures (m) by edge and dB level (ecount x 40), 
+    where the columns are the dB levels 40-79 (noise_db_bins). Missing noise data results in rows of zeros.
+    """
+    ecount = len(offsets) - 1
+    rows = np.repeat(np.arange(ecount), np.diff(offsets))
+    matrix = np.zeros((ecount, len(noise_db_bins)), dtype=np.float64)
+    np.add.at(matrix, (rows, dbs.astype(np.int64) - noise_db_bins[0]), exps)
+    return matrix.astype(dtype, copy=False)
+
+def get_mean_noise_levels(arrays: Dict[str, np.ndarray]) -> np.ndarray:
+    """Returns the mean noise levels of all edges (see noise_exposures.get_mean_noise_level) from the packed noise
+    exposures. Edges without noise exposures (or with length 0) get mean noise level 0.
+    """
+    offsets = np.asarray(arrays[GraphArray.noise_offsets.value])
+    lengths = np.asarray(arrays[E.length.value], dtype=np.float64)
+    counts = np.diff(offsets)
+    rows = np.repeat(np.arange(len(lengths)), counts)
+    weights = (np.asarray(arrays[GraphArray.noise_dbs.value], dtype=np.float64) + 2.5) * np.asarray(arrays[GraphArray.noise_exps.value])
+    sum_dbs = np.bincount(rows, weights=weights, minlength=len(lengths))
+    has_noises = (counts > 0) & (lengths > 0)
+    mean_dbs = np.zeros(len(lengths), dtype=np.float64)
+    mean_dbs[has_noises] = round_array(sum_dbs[has_noises] / lengths[has_noises], 1)
+    return mean_dbs
+
+def get_db_cost_vector(db_costs: Dict[int, float]) -> np.ndarray:
+    """Returns the noise cost coefficients of the dB levels 40-79 (noise_db_bins) as a vector.
+    """
+    return np.array([db_costs.get(db, 0.0) for db in noise_db_bins.tolist()], dtype=np.float64)
+
+def add_noise_cost_arrays(meta: dict, arrays: Dict[str, np.ndarray], db_costs: Dict[int, float], sens: List[float]) -> None:
+    """Adds estimated exposures to noise level of 40 dB to the noise arrays and noise cost columns (nc_<sen> & bnc_<sen>) 
+    for the given noise sensitivities to the arrays of a compiled graph. The noise costs of all sensitivities are
+    calculated at once as the product of the (edges x dB levels) exposure matrix and the dB costs. The exposure
+    matrix is added to the arrays as float32 (noise_matrix).
+    """
+    lengths = np.asarray(arrays[E.length.value], dtype=np.float64)
+    lengths_b = np.asarray(arrays[E.length_b.value], dtype=np.float64)
+    has_geom = np.asarray(arrays[GraphArray.has_geom.value], dtype=bool)
+    offsets = np.asarray(arrays[GraphArray.noise_offsets.value])
+    dbs = np.asarray(arrays[GraphArray.noise_dbs.value])
+    exps = np.asarray(arrays[GraphArray.noise_exps.value])
+    noises_missing = np.asarray(arrays[GraphArray.noises_missing.value], dtype=bool)
+    counts = np.diff(offsets)
+    rows = np.repeat(np.arange(len(lengths)), counts)
+
+    # first add estimated exposure to noise level of 40 dB to edge noises (replacing existing 40 dB exposures)
+    total_exps = round_array(np.bincount(rows, weights=exps, minlength=len(lengths)), 3)
+    db_40_exps = np.where(lengths == 0.0, 0.0, round_array(lengths - total_exps, 2))
+    add_db_40 = (db_40_exps > 0.0) & ~noises_missing
+    exps = np.where(add_db_40[rows] & (dbs == 40), db_40_exps[rows], exps)
+    new_db_40 = add_db_40 & (np.bincount(rows[dbs == 40], minlength=len(lengths)) == 0)
+    # new exposures are appended to the noises of the edges (as the last item)
+    new_rows = np.flatnonzero(new_db_40)
+    all_rows = np.concatenate([rows, new_rows])
+    order = np.argsort(all_rows, kind='stable')
+    dbs = np.concatenate([dbs, np.full(len(new_rows), 40, dtype=dbs.dtype)])[order]
+    exps = np.concatenate([exps, db_40_exps[new_rows]])[order]
+    counts = counts + new_db_40
+    offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+
+    # then calculate noise costs
+    noise_matrix = get_noise_matrix(offsets, dbs, exps)
+    base_costs = noise_matrix @ get_db_cost_vector(db_costs)
+    noise_costs = round_array(base_costs[:, np.newaxis] * np.array(sens, dtype=np.float64)[np.newaxis, :], 2)
+    # edges outside the extent of the noise data (having valid geometry) get high noise costs to avoid them in 
+    # finding quiet paths and all edges without geometry get noise cost 0
+    no_noises = (counts == 0) & has_geom
+    noise_costs[no_noises] = (lengths * 20)[no_noises, np.newaxis]
+    noise_costs[~has_geom] = 0.0
+    bike_lengths = np.where(np.isnan(lengths_b) | (lengths_b == 0), lengths, lengths_b)
+
+    costs = {}
+    for idx, sen in enumerate(sens):
+        costs['nc_'+ str(sen)] = round_array(lengths + noise_costs[:, idx], 2)
+        costs['bnc_'+ str(sen)] = round_array(bike_lengths + noise_costs[:, idx], 2) # biking costs
+
+    arrays[GraphArray.noise_offsets.value] = offsets
+    arrays[GraphArray.noise_dbs.value] = dbs
+    arrays[GraphArray.noise_exps.value] = exps
+    arrays[GraphArray.noises_missing.value] = noises_missing
+    arrays[GraphArray.noise_matrix.value] = noise_matrix.astype(np.float32)
+    # the noise costs of the previous sensitivities (if any, e.g. of a compiled graph) are replaced
+    prev_costs = [prefix + str(sen) for sen in meta['noise_sens'] for prefix in ('nc_', 'bnc_')]
+    for attr in prev_costs:
+        arrays.pop(attr, None)
+    arrays.update(costs)
+    meta['edge_attrs'] = [attr for attr in meta['edge_attrs'] if attr not in prev_costs and attr not in costs] + list(costs.keys())
+    meta['noise_sens'] = sens
+
+def export_to_compiled_graph(
+    G: ig.Graph, 
+    graph_dir: str, 
+    db_costs: Dict[int, float], 
+    noise_sens: List[float], 
+    source: str = '', 
+    log: Logger = None
+    ) -> None:
+    """Writes a graph (read from GraphML) with noise costs to a directory in the compiled graph format.
+    """
+    meta, arrays = get_compiled_arrays(G)
+    add_noise_cost_arrays(meta, arrays, db_costs, noise_sens)
+    os.makedirs(graph_dir, exist_ok=True)
+    for name, array in arrays.items():
+        file_name = name if name in GraphArray.__members__ else 'e_'+ name
+        np.save(os.path.join(graph_dir, file_name +'.npy'), array, allow_pickle=False)
+
+    meta['source'] = source
+    meta['compiled_utc'] = datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%S')
+    with open(os.path.join(graph_dir, 'meta.json'), 'w') as meta_file:
+        json.dump(meta, meta_file, indent=2)
+    if (log is not None): log.info(f'compiled graph of {meta["ecount"]} edges to {graph_dir}')
+
+def read_compiled_arrays(graph_dir: str, mmap: bool = True) -> Tuple[dict, Dict[str, np.ndarray]]:
+    """Returns the metadata and the arrays of a compiled graph. By default, the arrays are memory-mapped read-only,
+    in which case the pages of the arrays are shared between all processes that read the same compiled graph. 
+    """
+    with open(os.path.join(graph_dir, 'meta.json'), 'r') as meta_file:
+        meta = json.load(meta_file)
+    if (meta['version'] != version):
+        raise ValueError(f'Compiled graph version {meta["version"]} is not supported (expected {version})')
+    arrays = {}
+    for name in [array.value for array in GraphArray]:
+        arrays[name] = np.load(os.path.join(graph_dir, name +'.npy'), mmap_mode='r' if mmap else None, allow_pickle=False)
+    for name in meta['edge_attrs']:
+        arrays[name] = np.load(os.path.join(graph_dir, 'e_'+ name +'.npy'), mmap_mode='r' if mmap else None, allow_pickle=False)
+    return meta, arrays
@@ -0,0 +1,49 @@
+"""
+This module provides functions for writing GeoJSON FeatureCollections of paths directly to JSON (bytes) from
+coordinate arrays, i.e. without building the FeatureCollections as nested dictionaries and (rounded) coordinate tuples
+first. Coordinates are written with a fixed number of decimals. The (small) property dictionaries of the features are
+serialized with orjson if it is installed and with the json module of the standard library otherwise.
+
+"""
+
+from typing import List, Dict
+import json
+import numpy as np
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def dumps(obj) -> bytes:
+    """Serializes an object (e.g. a property dictionary of a feature) to JSON bytes.
+    """
+    if (orjson is not None):
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, separators=(',', ':')).encode('utf-8')
+
+def format_coords(coords: np.ndarray, digits: int = 6) -> bytes:
+    """Returns coordinates (an array of n x 2) as a JSON array of [x, y] arrays with a fixed number of decimals.
+    """
+    if (len(coords) == 0):
+        return b'[]'
+    coord_format = f'[%.{digits}f,%.{digits}f]'
+    return ('['+ ','.join([coord_format] * len(coords)) % tuple(coords[:, :2].ravel().tolist()) +']').encode('ascii')
+
+def get_line_feature(coords: np.ndarray, props: dict, digits: int = 6) -> bytes:
+    """Returns a GeoJSON feature with a LineString geometry (from an array of coordinates) and properties as JSON bytes.
+    """
+    return b''.join([
+        b'{"type":"Feature","properties":', dumps(props),
+        b',"geometry":{"coordinates":', format_coords(coords, digits=digits), b',"type":"LineString"}}'
+    ])
+
+def get_feature_collection(features: List[bytes]) -> bytes:
+    """Returns a GeoJSON FeatureCollection of features (already serialized to JSON bytes) as JSON bytes.
+    """
+    return b'{"type":"FeatureCollection","features":['+ b','.join(features) + b']}'
+
+def get_json_object(members: Dict[str, bytes]) -> bytes:
+    """Returns a JSON object of members whose values are already serialized to JSON bytes (e.g. FeatureCollections).
+    """
+    return b'{'+ b','.join(dumps(name) + b':'+ value for name, value in members.items()) + b'}'
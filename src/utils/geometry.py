@@ -5,6 +5,8 @@ Supported features include e.g. reprojection, finding nearest point on a line an
 """
 
 from typing import List, Set, Dict, Tuple
+import threading
+import numpy as np
 import pyproj
 from pyproj import CRS
 from shapely.geometry import Point, LineString
@@ -22,24 +24,37 @@ def get_point_from_lat_lon(latLon: Dict[str, float]) -> Point:
 def round_coordinates(coords_list: List[tuple], digits=6) -> List[tuple]:
     return [ (round(coords[0], digits), round(coords[1], digits)) for coords in coords_list]
 
-__projections = {
-    (4326, 3879): pyproj.Transformer.from_crs(
-        crs_from=CRS('epsg:4326'), 
-        crs_to=CRS('epsg:3879'),
-        always_xy=True),
-    (3879, 4326): pyproj.Transformer.from_crs(
-        crs_from=CRS('epsg:3879'), 
-        crs_to=CRS('epsg:4326'),
-        always_xy=True)
-}
+# transformers are not shared between threads (routing requests may run in parallel threads)
+__thread_projections = threading.local()
+
+def __get_projection(geom_epsg: int, to_epsg: int) -> pyproj.Transformer:
+    """Returns a transformer between two CRSs (EPSG 4326 and 3879), created once per thread.
+    """
+    projections = getattr(__thread_projections, 'projections', None)
+    if (projections is None):
+        projections = {}
+        __thread_projections.projections = projections
+    if ((geom_epsg, to_epsg) not in projections):
+        projections[(geom_epsg, to_epsg)] = pyproj.Transformer.from_crs(
+            crs_from=CRS('epsg:'+ str(geom_epsg)), 
+            crs_to=CRS('epsg:'+ str(to_epsg)),
+            always_xy=True)
+    return projections[(geom_epsg, to_epsg)]
 
 def project_geom(geom, geom_epsg: int = 4326, to_epsg: int = 3879):
     """Projects Shapely geometry object (e.g. Point or LineString) to another CRS. 
     The default conversion is from EPSG 4326 to 3879.
     """
-    project = __projections[(geom_epsg, to_epsg)]
+    project = __get_projection(geom_epsg, to_epsg)
     return transform(project.transform, geom)
 
+def project_lat_lons(lats: List[float], lons: List[float], to_epsg: int = 3879) -> np.ndarray:
+    """Projects many WGS84 coordinates to another CRS at once (faster than projecting the points one by one). 
+    Returns the projected coordinates as an array of (x, y) rows.
+    """
+    xs, ys = __get_projection(4326, to_epsg).transform(np.asarray(lons, dtype=np.float64), np.asarray(lats, dtype=np.float64))
+    return np.column_stack((xs, ys))
+
 def split_line_at_point(log, line: LineString, split_point: Point, tolerance: float=0.01) -> List[LineString]:
     """Splits a line at nearest intersecting point.
     Returns:
@@ -7,9 +7,15 @@ between paths.
 
 from typing import List, Set, Dict, Tuple
 from collections import defaultdict
+import numpy as np
 from shapely.geometry import LineString
 from utils.igraphs import Edge as E
 
+# dB levels of the columns of noise exposure matrices and the bins of aggregated noise exposures
+noise_db_bins = np.arange(40, 80)
+# lower limits of the dB ranges (see get_noise_range)
+noise_ranges = np.array([40, 50, 55, 60, 65, 70], dtype=np.int64)
+
 def calc_db_cost_v2(db) -> float:
     """Returns a noise cost for given dB based on a linear scale (dB >= 45 & dB <= 75).
     """
@@ -58,6 +64,11 @@ def get_noise_range(db: float) -> int:
     elif db >= 50.0: return 50
     else: return 40
 
+def get_noise_ranges(dbs: np.ndarray) -> np.ndarray:
+    """Returns the lower limits of the dB ranges (see get_noise_range) of an array of dB values.
+    """
+    return noise_ranges[np.digitize(dbs, noise_ranges[1:])]
+
 def get_noise_range_exps(noises: dict, total_length: float) -> Dict[int, float]:
     """Calculates aggregated exposures to different noise level ranges.
 
@@ -132,6 +143,34 @@ def get_noise_cost(noises: Dict[int, float] = {}, db_costs: Dict[int, float] = {
         noise_cost = sum([db_costs[db] * length * sen for db, length in noises.items()])
         return round(noise_cost, 2)
 
+def aggregate_exposure_bins(noise_matrix: np.ndarray, edge_ids: np.ndarray) -> np.ndarray:
+    """Aggregates noise exposures of a set of edges (e.g. a path) as a vector of exposures (m) by dB level
+    (noise_db_bins) by summing the rows of the edges in a noise exposure matrix (edges x dB levels).
+    """
+    return noise_matrix[edge_ids].sum(axis=0, dtype=np.float64)
+
+def get_mean_noise_level_from_bins(noise_bins: np.ndarray, length: float) -> float:
+    """Returns a mean noise level (see get_mean_noise_level) from a vector of noise exposures by dB level.
+    """
+    return round(float(noise_bins @ (noise_db_bins + 2.5)) / length, 1)
+
+def get_noise_cost_from_bins(noise_bins: np.ndarray, db_cost_vector: np.ndarray, sen: float = 1) -> float:
+    """Returns a total noise cost (see get_noise_cost) from a vector of noise exposures by dB level and a vector of 
+    the noise cost coefficients of the dB levels (noise_db_bins).
+    """
+    return round(float(noise_bins @ db_cost_vector) * sen, 2)
+
+def get_noise_range_exps_from_bins(noise_bins: np.ndarray) -> Dict[int, float]:
+    """Calculates aggregated exposures to different noise level ranges (see get_noise_range_exps) from a vector of 
+    noise exposures by dB level. Only the ranges with exposures are included.
+    """
+    range_exps = np.add.reduceat(noise_bins, noise_ranges - noise_db_bins[0])
+    has_exps = range_exps > 0
+    return { 
+        db_range: round(exp, 2) for db_range, exp 
+        in zip(noise_ranges[has_exps].tolist(), range_exps[has_exps].tolist())
+    }
+
 def interpolate_link_noises(link_len_ratio: float, link_geom: LineString, edge_geom: LineString, edge_noises: dict) -> dict:
     """Interpolates noise exposures for a split edge by multiplying each contaminated distance with a proportion
     between the edge length to the length of the original edge.
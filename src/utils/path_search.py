@@ -0,0 +1,666 @@
+"""
+This module provides functions for finding least cost paths in a graph stored in compressed sparse row (CSR) format
+(see utils/compiled_graphs.py). The search can consult a per-request overlay of new nodes and edges (e.g. the edges
+linking origin and destination to the graph), so the base graph is never modified during routing.
+
+Lower bounds for the costs to a destination can also be derived from precomputed least costs from and to a set of
+landmark nodes by the triangle inequality (ALT, see LandmarkBounds).
+
+A single least cost path can also be searched with bidirectional A* (find_least_cost_path_bidirectional), which uses
+straight-line distances between the nodes as (scaled) lower bounds for the costs.
+
+Least cost paths for a set of cost attributes (e.g. length and the noise costs of all noise sensitivities) are searched
+with find_least_cost_paths, which runs a single backward search from the destination by the lower bounds of the edge
+costs and reuses its settled distances as a (consistent) A* heuristic in the searches by the individual cost attributes.
+The backward search can itself be guided towards the origin by landmark bounds (see DistsToNode).
+
+The searches by the individual cost attributes are independent of each other, so find_least_cost_paths can also run
+them in parallel in the threads of an executor. In parallel, the searches are run by a kernel that works on NumPy arrays
+and is compiled with numba (if installed) to run without holding the GIL (find_least_cost_path_nogil).
+
+Paths from one origin to many destinations (e.g. in batch routing) can be searched at once with 
+find_least_cost_paths_to_many.
+
+"""
+
+from typing import List, Set, Dict, Tuple
+from concurrent.futures import Executor
+from enum import Enum
+from math import hypot
+from heapq import heappush, heappop
+import time
+import numpy as np
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+class SearchAlgorithm(Enum):
+    DIJKSTRA = 'dijkstra'
+    BIDIRECTIONAL_ASTAR = 'bidirectional_astar'
+    ASTAR_LANDMARKS = 'astar_landmarks'
+
+class PathNotFoundException(Exception):
+    pass
+
+def as_memoryview(array: np.ndarray) -> memoryview:
+    """Returns a memoryview of an array. Indexing a memoryview returns Python numbers, which is a lot faster
+    than indexing a NumPy array in a loop. The view shares the memory of the array (e.g. a memory-mapped array).
+    """
+    return memoryview(np.ascontiguousarray(array))
+
+class LandmarkBounds:
+    """Lower bounds for the costs from the nodes of a graph to a destination, derived from the least costs from and to 
+    a set of landmarks by the triangle inequality: cost(v, t) >= cost(L, t) - cost(L, v) and cost(v, t) >= cost(v, L) - cost(t, L).
+    The bounds are consistent for any edge costs that are not less than the costs by which the landmark costs were 
+    calculated, so they can be used as the h_dists (A* heuristic) of find_least_cost_path.
+
+    If the destination is not a node of the base graph (e.g. a new node of a graph overlay), the bounds are calculated to
+    the base nodes (anchors) through which the destination is reached. The bounds are zero for nodes that are not in
+    the base graph.
+
+    Attributes:
+        dists_from: The least costs from the landmarks to all nodes of the base graph (vcount x landmark count).
+        dists_to: The least costs from all nodes of the base graph to the landmarks (vcount x landmark count).
+        landmarks: The indexes of the landmarks to use (the columns of dists_from & dists_to).
+        anchor_dists: The least costs from and to the landmarks of the anchors as lists of (landmark index, from, to).
+        bounds: The bounds calculated so far by node.
+    """
+
+    def __init__(self, dists_from: memoryview, dists_to: memoryview, landmarks: List[int], anchors: List[int]):
+        self.landmark_count = dists_from.shape[1]
+        self.base_vcount = dists_from.shape[0]
+        # flat views are faster to index than 2d views
+        self.dists_from = dists_from.cast('B').cast('d')
+        self.dists_to = dists_to.cast('B').cast('d')
+        self.anchor_dists = [
+            [(idx, dists_from[anchor, idx], dists_to[anchor, idx]) for idx in landmarks]
+            for anchor in anchors
+        ]
+        self.bounds: Dict[int, float] = {}
+
+    def get(self, node: int, default: float = 0.0) -> float:
+        bound = self.bounds.get(node)
+        if (bound is None):
+            bound = self.__get_bound(node) if (node < self.base_vcount and self.anchor_dists) else 0.0
+            self.bounds[node] = bound
+        return bound
+
+    def __get_bound(self, node: int) -> float:
+        offset = node * self.landmark_count
+        dists_from, dists_to = self.dists_from, self.dists_to
+        bound = np.inf
+        for anchor_dists in self.anchor_dists:
+            anchor_bound = 0.0
+            for idx, anchor_from, anchor_to in anchor_dists:
+                from_bound = anchor_from - dists_from[offset + idx]
+                to_bound = dists_to[offset + idx] - anchor_to
+                if (from_bound > anchor_bound): anchor_bound = from_bound
+                if (to_bound > anchor_bound): anchor_bound = to_bound
+            if (anchor_bound < bound): bound = anchor_bound
+        return bound
+
+    def get_all(self) -> np.ndarray:
+        """Returns the bounds of all nodes of the base graph as an array (calculated at once, without caching them).
+        """
+        if (not self.anchor_dists):
+            return np.zeros(self.base_vcount)
+        dists_from = np.asarray(self.dists_from).reshape(self.base_vcount, self.landmark_count)
+        dists_to = np.asarray(self.dists_to).reshape(self.base_vcount, self.landmark_count)
+        bounds = np.full(self.base_vcount, np.inf)
+        for anchor_dists in self.anchor_dists:
+            anchor_bounds = np.zeros(self.base_vcount)
+            for idx, anchor_from, anchor_to in anchor_dists:
+                # fmax ignores the NaNs of infinite costs (inf - inf) as the comparisons of __get_bound do
+                np.fmax(anchor_bounds, anchor_from - dists_from[:, idx], out=anchor_bounds)
+                np.fmax(anchor_bounds, dists_to[:, idx] - anchor_to, out=anchor_bounds)
+            np.minimum(bounds, anchor_bounds, out=bounds)
+        return bounds
+
+def get_bounds_array(bounds: Dict[int, float], vcount: int) -> np.ndarray:
+    """Returns lower bounds (a dictionary or LandmarkBounds) for the nodes 0...vcount-1 as an array (0 if not given).
+    """
+    if (isinstance(bounds, LandmarkBounds)):
+        bounds_array = np.zeros(max(vcount, bounds.base_vcount))
+        bounds_array[:bounds.base_vcount] = bounds.get_all()
+        return bounds_array[:vcount]
+    bounds_array = np.zeros(vcount)
+    for node, bound in bounds.items():
+        bounds_array[node] = bound
+    return bounds_array
+
+def select_landmarks(
+    dists_from: memoryview, 
+    dists_to: memoryview, 
+    orig_anchors: List[int], 
+    dest_anchors: List[int], 
+    count: int = 4
+    ) -> List[int]:
+    """Returns the indexes of the landmarks that give the highest lower bounds for the cost between the origin and the
+    destination (only landmarks with finite costs from and to the anchors of the destination are considered).
+    """
+    landmark_bounds = []
+    for idx in range(dists_from.shape[1]):
+        dest_dists = [(dists_from[anchor, idx], dists_to[anchor, idx]) for anchor in dest_anchors]
+        if (not all(np.isfinite(dist) for dists in dest_dists for dist in dists)):
+            continue
+        bound = min(
+            max(dest_from - dists_from[orig, idx], dists_to[orig, idx] - dest_to)
+            for orig in orig_anchors for dest_from, dest_to in dest_dists
+        )
+        landmark_bounds.append((bound, idx))
+    landmark_bounds.sort(reverse=True)
+    return [idx for _, idx in landmark_bounds[:count]]
+
+def get_path_edges(pred_edges: Dict[int, int], edge_sources: Dict[int, int], dest_node: int) -> List[int]:
+    """Returns the edges of a path (ordered from origin to destination) from a dictionary of predecessor edges of the nodes.
+    """
+    path = []
+    node = dest_node
+    while node in pred_edges:
+        edge_id = pred_edges[node]
+        path.append(edge_id)
+        node = edge_sources[edge_id]
+    path.reverse()
+    return path
+
+def find_least_cost_path(
+    out_offsets: memoryview,
+    out_edges: memoryview,
+    out_targets: memoryview,
+    weights: memoryview,
+    orig_node: int,
+    dest_node: int,
+    overlay_out_edges: Dict[int, List[Tuple[int, int]]] = {},
+    overlay_weights: Dict[int, float] = {},
+    h_dists: Dict[int, float] = {},
+    h_default: float = 0.0,
+    stats: dict = None
+    ) -> List[int]:
+    """Finds a least cost path between two nodes with Dijkstra's algorithm, or with A* if lower bounds for the costs from
+    the nodes to the destination are given (h_dists & h_default). The search is stopped once the destination is settled.
+
+    Args:
+        out_offsets, out_edges, out_targets: The outgoing edges of the nodes of the base graph in CSR format.
+        weights: The costs of the edges of the base graph (by edge id).
+        orig_node: The id of the origin node.
+        dest_node: The id of the destination node.
+        overlay_out_edges: Additional outgoing edges by source node as lists of (edge id, target node).
+        overlay_weights: The costs of the additional edges (by edge id).
+        h_dists: Lower bounds for the costs from the nodes to the destination (must be consistent), either as a dictionary
+            or e.g. as LandmarkBounds.
+        h_default: A lower bound for the costs to the destination from the nodes that are not in h_dists.
+        stats: An optional dictionary to which the number of settled nodes is set (for benchmarking).
+    Returns:
+        The least cost path as a sequence of edge ids.
+    Raises:
+        PathNotFoundException if the destination cannot be reached from the origin.
+    """
+    base_vcount = len(out_offsets) - 1
+    dists: Dict[int, float] = { orig_node: 0.0 }
+    pred_edges: Dict[int, int] = {}
+    edge_sources: Dict[int, int] = {}
+    settled: Set[int] = set()
+    heap = [(h_dists.get(orig_node, h_default), orig_node)]
+
+    while heap:
+        _, node = heappop(heap)
+        if (node in settled):
+            continue
+        if (node == dest_node):
+            if (stats is not None): stats['settled'] = len(settled)
+            return get_path_edges(pred_edges, edge_sources, dest_node)
+        settled.add(node)
+        dist = dists[node]
+
+        if (node < base_vcount):
+            for idx in range(out_offsets[node], out_offsets[node+1]):
+                target = out_targets[idx]
+                new_dist = dist + weights[out_edges[idx]]
+                if (new_dist < dists.get(target, np.inf)):
+                    dists[target] = new_dist
+                    pred_edges[target] = out_edges[idx]
+                    edge_sources[out_edges[idx]] = node
+                    heappush(heap, (new_dist + h_dists.get(target, h_default), target))
+
+        for edge_id, target in overlay_out_edges.get(node, ()):
+            new_dist = dist + overlay_weights[edge_id]
+            if (new_dist < dists.get(target, np.inf)):
+                dists[target] = new_dist
+                pred_edges[target] = edge_id
+                edge_sources[edge_id] = node
+                heappush(heap, (new_dist + h_dists.get(target, h_default), target))
+
+    raise PathNotFoundException(f'No path from {orig_node} to {dest_node}')
+
+def find_least_cost_paths_to_many(
+    out_offsets: memoryview,
+    out_edges: memoryview,
+    out_targets: memoryview,
+    weights: memoryview,
+    orig_node: int,
+    dest_nodes: List[int],
+    overlay_out_edges: Dict[int, List[Tuple[int, int]]] = {},
+    overlay_weights: Dict[int, float] = {}
+    ) -> Dict[int, List[int]]:
+    """Finds least cost paths from one origin to many destinations with a single search (Dijkstra's algorithm), which 
+    is stopped once all destinations are settled. This is faster than searching the paths one by one (even with A*) 
+    when there are many destinations around the origin.
+
+    Returns:
+        The least cost paths as sequences of edge ids by destination node (unreachable destinations are omitted).
+    """
+    base_vcount = len(out_offsets) - 1
+    dists: Dict[int, float] = { orig_node: 0.0 }
+    pred_edges: Dict[int, int] = {}
+    edge_sources: Dict[int, int] = {}
+    settled: Set[int] = set()
+    remaining = set(dest_nodes)
+    heap = [(0.0, orig_node)]
+
+    while heap and remaining:
+        dist, node = heappop(heap)
+        if (node in settled):
+            continue
+        settled.add(node)
+        remaining.discard(node)
+
+        if (node < base_vcount):
+            for idx in range(out_offsets[node], out_offsets[node+1]):
+                target = out_targets[idx]
+                new_dist = dist + weights[out_edges[idx]]
+                if (new_dist < dists.get(target, np.inf)):
+                    dists[target] = new_dist
+                    pred_edges[target] = out_edges[idx]
+                    edge_sources[out_edges[idx]] = node
+                    heappush(heap, (new_dist, target))
+
+        for edge_id, target in overlay_out_edges.get(node, ()):
+            new_dist = dist + overlay_weights[edge_id]
+            if (new_dist < dists.get(target, np.inf)):
+                dists[target] = new_dist
+                pred_edges[target] = edge_id
+                edge_sources[edge_id] = node
+                heappush(heap, (new_dist, target))
+
+    return { 
+        dest_node: get_path_edges(pred_edges, edge_sources, dest_node) 
+        for dest_node in dest_nodes if dest_node in settled 
+    }
+
+def get_euclidean_heuristic_scale(node_xy: np.ndarray, edge_uv: np.ndarray, min_costs: np.ndarray) -> float:
+    """Returns the largest coefficient (at most 1) by which the straight-line distances between the nodes can be
+    multiplied to get lower bounds for the costs between the nodes (i.e. a consistent A* heuristic). The coefficient
+    is less than 1 only if some edges have lower costs than the distances between their nodes (e.g. bike lengths, 
+    rounding of lengths or edges without geometry). 
+    """
+    if (np.isnan(node_xy).any()):
+        return 0.0
+    dists = np.hypot(*(node_xy[edge_uv[:, 0]] - node_xy[edge_uv[:, 1]]).T)
+    has_dist = dists > 0
+    if (not has_dist.any()):
+        return 1.0
+    return float(min(1.0, np.min(min_costs[has_dist] / dists[has_dist])))
+
+def find_least_cost_path_bidirectional(
+    out_adjacency: Tuple[memoryview, memoryview, memoryview],
+    in_adjacency: Tuple[memoryview, memoryview, memoryview],
+    weights: memoryview,
+    node_xy: memoryview,
+    h_scale: float,
+    orig_node: int,
+    dest_node: int,
+    overlay_out_edges: Dict[int, List[Tuple[int, int]]] = {},
+    overlay_in_edges: Dict[int, List[Tuple[int, int]]] = {},
+    overlay_weights: Dict[int, float] = {},
+    overlay_node_xy: Dict[int, Tuple[float, float]] = {},
+    stats: dict = None
+    ) -> List[int]:
+    """Finds a least cost path between two nodes with bidirectional A*. The searches from the origin and from the 
+    destination share the average of the (scaled) straight-line distances to the destination and from the origin 
+    as their potential, which keeps the reduced edge costs non-negative in both directions. The search is stopped 
+    once the sum of the least keys of the searches exceeds the cost of the best path found.
+
+    Args:
+        out_adjacency: The outgoing edges of the nodes of the base graph in CSR format (offsets, edges, targets).
+        in_adjacency: The incoming edges of the nodes of the base graph in CSR format (offsets, edges, sources).
+        weights: The costs of the edges of the base graph (by edge id).
+        node_xy: The (projected) coordinates of the nodes of the base graph (vcount x 2).
+        h_scale: A coefficient for the straight-line distances (see get_euclidean_heuristic_scale).
+        orig_node: The id of the origin node.
+        dest_node: The id of the destination node.
+        overlay_out_edges: Additional outgoing edges by source node as lists of (edge id, target node).
+        overlay_in_edges: Additional incoming edges by target node as lists of (edge id, source node).
+        overlay_weights: The costs of the additional edges (by edge id).
+        overlay_node_xy: The coordinates of the additional nodes.
+        stats: An optional dictionary to which the number of settled nodes is set (for benchmarking).
+    Returns:
+        The least cost path as a sequence of edge ids.
+    Raises:
+        PathNotFoundException if the destination cannot be reached from the origin.
+    """
+    if (orig_node == dest_node):
+        return []
+    base_vcount = len(node_xy)
+    orig_x, orig_y = overlay_node_xy[orig_node] if orig_node in overlay_node_xy else (node_xy[orig_node, 0], node_xy[orig_node, 1])
+    dest_x, dest_y = overlay_node_xy[dest_node] if dest_node in overlay_node_xy else (node_xy[dest_node, 0], node_xy[dest_node, 1])
+    potentials: Dict[int, float] = {}
+
+    def get_potential(node: int) -> float:
+        potential = potentials.get(node)
+        if (potential is None):
+            x, y = overlay_node_xy[node] if node in overlay_node_xy else (node_xy[node, 0], node_xy[node, 1])
+            potential = h_scale * (hypot(dest_x - x, dest_y - y) - hypot(x - orig_x, y - orig_y)) / 2
+            potentials[node] = potential
+        return potential
+
+    # state of the search from the origin (0) and from the destination (1)
+    dists: Tuple[Dict[int, float], Dict[int, float]] = ({ orig_node: 0.0 }, { dest_node: 0.0 })
+    pred_edges: Tuple[Dict[int, Tuple[int, int]], Dict[int, Tuple[int, int]]] = ({}, {})
+    settled: Tuple[Set[int], Set[int]] = (set(), set())
+    heaps = ([(get_potential(orig_node), orig_node)], [(-get_potential(dest_node), dest_node)])
+    adjacencies = (out_adjacency, in_adjacency)
+    overlay_edges = (overlay_out_edges, overlay_in_edges)
+    best_cost = np.inf
+    meeting_node = None
+
+    while heaps[0] and heaps[1]:
+        if (heaps[0][0][0] + heaps[1][0][0] >= best_cost):
+            break
+        # expand the search with the smaller least key
+        direction = 0 if (heaps[0][0][0] <= heaps[1][0][0]) else 1
+        _, node = heappop(heaps[direction])
+        if (node in settled[direction]):
+            continue
+        settled[direction].add(node)
+        node_dists, other_dists, node_preds = dists[direction], dists[1 - direction], pred_edges[direction]
+        dist = node_dists[node]
+        sign = 1 if (direction == 0) else -1
+
+        neighbours = []
+        if (node < base_vcount):
+            offsets, edges, nodes = adjacencies[direction]
+            neighbours = [(edges[idx], nodes[idx], weights[edges[idx]]) for idx in range(offsets[node], offsets[node+1])]
+        neighbours += [(edge_id, other, overlay_weights[edge_id]) for edge_id, other in overlay_edges[direction].get(node, ())]
+
+        for edge_id, other, weight in neighbours:
+            new_dist = dist + weight
+            if (new_dist < node_dists.get(other, np.inf)):
+                node_dists[other] = new_dist
+                node_preds[other] = (edge_id, node)
+                heappush(heaps[direction], (new_dist + sign * get_potential(other), other))
+            if (other in other_dists and new_dist + other_dists[other] < best_cost):
+                best_cost = new_dist + other_dists[other]
+                meeting_node = other
+
+    if (stats is not None): stats['settled'] = len(settled[0]) + len(settled[1])
+    if (meeting_node is None):
+        raise PathNotFoundException(f'No path from {orig_node} to {dest_node}')
+
+    path = []
+    node = meeting_node
+    while node in pred_edges[0]:
+        edge_id, node = pred_edges[0][node]
+        path.append(edge_id)
+    path.reverse()
+    node = meeting_node
+    while node in pred_edges[1]:
+        edge_id, node = pred_edges[1][node]
+        path.append(edge_id)
+    return path
+
+def get_dists_to_node(
+    in_offsets: memoryview,
+    in_edges: memoryview,
+    in_sources: memoryview,
+    weights: memoryview,
+    node: int,
+    stop_node: int,
+    overlay_in_edges: Dict[int, List[Tuple[int, int]]] = {},
+    overlay_weights: Dict[int, float] = {},
+    h_dists: Dict[int, float] = {}
+    ) -> Tuple[Dict[int, float], float]:
+    """Calculates the least costs from the nodes of the graph to the given node with Dijkstra's algorithm over the 
+    incoming edges, or with A* towards stop_node if lower bounds for the costs from stop_node to the nodes are given
+    (h_dists). The search is stopped once stop_node is settled.
+
+    Returns:
+        The least costs to the node from all settled nodes and the least cost from stop_node. For any node v that was 
+        not settled, cost(v, node) >= cost(stop_node, node) - h_dists(v).
+    Raises:
+        PathNotFoundException if the node cannot be reached from stop_node.
+    """
+    base_vcount = len(in_offsets) - 1
+    dists: Dict[int, float] = { node: 0.0 }
+    settled: Dict[int, float] = {}
+    heap = [(h_dists.get(node, 0.0), node)]
+
+    while heap:
+        _, current = heappop(heap)
+        if (current in settled):
+            continue
+        dist = dists[current]
+        settled[current] = dist
+        if (current == stop_node):
+            return settled, dist
+
+        if (current < base_vcount):
+            for idx in range(in_offsets[current], in_offsets[current+1]):
+                source = in_sources[idx]
+                new_dist = dist + weights[in_edges[idx]]
+                if (new_dist < dists.get(source, np.inf)):
+                    dists[source] = new_dist
+                    heappush(heap, (new_dist + h_dists.get(source, 0.0), source))
+
+        for edge_id, source in overlay_in_edges.get(current, ()):
+            new_dist = dist + overlay_weights[edge_id]
+            if (new_dist < dists.get(source, np.inf)):
+                dists[source] = new_dist
+                heappush(heap, (new_dist + h_dists.get(source, 0.0), source))
+
+    raise PathNotFoundException(f'No path from {stop_node} to {node}')
+
+class DistsToNode:
+    """Lower bounds for the costs to a node from the results of a (partial) backward search from it (get_dists_to_node): 
+    the least costs from the settled nodes and cost(stop_node, node) - orig_bounds(v) for the others, tightened by
+    dest_bounds (e.g. LandmarkBounds to the node) if given. The bounds are consistent if orig_bounds is (it is 
+    the heuristic of the backward search).
+    """
+
+    def __init__(self, dists: Dict[int, float], stop_dist: float, orig_bounds: Dict[int, float] = {}, dest_bounds: Dict[int, float] = {}):
+        self.dists = dists
+        self.stop_dist = stop_dist
+        self.orig_bounds = orig_bounds
+        self.dest_bounds = dest_bounds
+
+    def get(self, node: int, default: float = 0.0) -> float:
+        dist = self.dists.get(node)
+        if (dist is None):
+            dist = max(self.stop_dist - self.orig_bounds.get(node, 0.0), self.dest_bounds.get(node, 0.0))
+            self.dists[node] = dist
+        return dist
+
+    def get_all(self, vcount: int) -> np.ndarray:
+        """Returns the bounds of the nodes 0...vcount-1 as an array.
+        """
+        dists = np.fmax(self.stop_dist - get_bounds_array(self.orig_bounds, vcount), get_bounds_array(self.dest_bounds, vcount))
+        nodes = np.fromiter(self.dists.keys(), dtype=np.int64, count=len(self.dists))
+        dists[nodes] = np.fromiter(self.dists.values(), dtype=np.float64, count=len(self.dists))
+        return dists
+
+def get_overlay_edge_arrays(
+    overlay_out_edges: Dict[int, List[Tuple[int, int]]], 
+    overlay_weights: Dict[int, float]
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Returns the additional edges of a graph overlay as arrays of source nodes, edge ids, target nodes and costs.
+    """
+    edges = [(source, edge_id, target) for source, out_edges in overlay_out_edges.items() for edge_id, target in out_edges]
+    sources, edge_ids, targets = (np.array([edge[i] for edge in edges], dtype=np.int64) for i in range(3))
+    return sources, edge_ids, targets, np.array([overlay_weights[edge_id] for edge_id in edge_ids.tolist()], dtype=np.float64)
+
+def find_least_cost_path_nogil(
+    out_offsets: np.ndarray,
+    out_edges: np.ndarray,
+    out_targets: np.ndarray,
+    weights: np.ndarray,
+    overlay_sources: np.ndarray,
+    overlay_edges: np.ndarray,
+    overlay_targets: np.ndarray,
+    overlay_weights: np.ndarray,
+    h_dists: np.ndarray,
+    orig_node: int,
+    dest_node: int
+    ) -> np.ndarray:
+    """Same as find_least_cost_path (A*), but for arrays only, so that it can be compiled with numba (to run without the
+    GIL): the additional edges of the overlay are given as arrays (see get_overlay_edge_arrays) and the lower bounds for
+    the costs to the destination as an array of all nodes (including the new nodes of the overlay).
+
+    Returns:
+        The least cost path as an array of edge ids (empty if the destination cannot be reached from the origin).
+    """
+    base_vcount = len(out_offsets) - 1
+    vcount = len(h_dists)
+    dists = np.full(vcount, np.inf)
+    pred_edges = np.full(vcount, -1, dtype=np.int64)
+    pred_nodes = np.full(vcount, -1, dtype=np.int64)
+    settled = np.zeros(vcount, dtype=np.bool_)
+    dists[orig_node] = 0.0
+    heap = [(h_dists[orig_node], np.int64(orig_node))]
+
+    while len(heap) > 0:
+        _, node = heappop(heap)
+        if (settled[node]):
+            continue
+        if (node == dest_node):
+            count = 0
+            while (pred_edges[node] != -1):
+                count += 1
+                node = pred_nodes[node]
+            path = np.empty(count, dtype=np.int64)
+            node = dest_node
+            for idx in range(count - 1, -1, -1):
+                path[idx] = pred_edges[node]
+                node = pred_nodes[node]
+            return path
+        settled[node] = True
+        dist = dists[node]
+
+        if (node < base_vcount):
+            for idx in range(out_offsets[node], out_offsets[node+1]):
+                target = np.int64(out_targets[idx])
+                new_dist = dist + weights[out_edges[idx]]
+                if (new_dist < dists[target]):
+                    dists[target] = new_dist
+                    pred_edges[target] = out_edges[idx]
+                    pred_nodes[target] = node
+                    heappush(heap, (new_dist + h_dists[target], target))
+
+        for idx in range(len(overlay_sources)):
+            if (overlay_sources[idx] == node):
+                target = overlay_targets[idx]
+                new_dist = dist + overlay_weights[idx]
+                if (new_dist < dists[target]):
+                    dists[target] = new_dist
+                    pred_edges[target] = overlay_edges[idx]
+                    pred_nodes[target] = node
+                    heappush(heap, (new_dist + h_dists[target], target))
+
+    return np.empty(0, dtype=np.int64)
+
+if (numba is not None):
+    find_least_cost_path_nogil = numba.njit(nogil=True, cache=True)(find_least_cost_path_nogil)
+
+def compile_nogil_kernel() -> bool:
+    """Compiles find_least_cost_path_nogil (with a search in a graph of two nodes), so that it is not compiled during
+    the first routing request. Returns False if numba is not installed (and the kernel would hold the GIL).
+    """
+    if (numba is None):
+        return False
+    no_edges = np.empty(0, dtype=np.int64)
+    find_least_cost_path_nogil(
+        np.array([0, 1, 1], dtype=np.int64), np.array([0], dtype=np.int64), np.array([1], dtype=np.int64), np.ones(1),
+        no_edges, no_edges, no_edges, np.empty(0), np.zeros(2), 0, 1)
+    return True
+
+def __timed_search(search, *args) -> Tuple[List[int], float]:
+    start_time = time.perf_counter()
+    path = search(*args)
+    return path, (time.perf_counter() - start_time) * 1000
+
+def find_least_cost_paths(
+    out_adjacency: Tuple[memoryview, memoryview, memoryview],
+    in_adjacency: Tuple[memoryview, memoryview, memoryview],
+    weights_list: List[memoryview],
+    min_weights: memoryview,
+    orig_node: int,
+    dest_node: int,
+    overlay_out_edges: Dict[int, List[Tuple[int, int]]] = {},
+    overlay_in_edges: Dict[int, List[Tuple[int, int]]] = {},
+    overlay_weights_list: List[Dict[int, float]] = None,
+    overlay_min_weights: Dict[int, float] = {},
+    orig_bounds: Dict[int, float] = {},
+    dest_bounds: Dict[int, float] = {},
+    executor: Executor = None,
+    stats: dict = None
+    ) -> List[List[int]]:
+    """Finds least cost paths between two nodes by multiple edge costs. First, the least costs to the destination by the
+    lower bounds of the edge costs (min_weights) are calculated once. These are then used as the heuristic of A* searches
+    by each of the edge costs, which settle only the nodes on and near the least cost paths instead of all nodes within 
+    the cost of the path from the origin (as Dijkstra's algorithm would). If lower bounds for the costs from the origin
+    are given (orig_bounds, e.g. LandmarkBounds), the search from the destination is guided towards the origin with A*
+    and settles only a fraction of the nodes within the cost of the path.
+
+    Args:
+        out_adjacency: The outgoing edges of the nodes of the base graph in CSR format (offsets, edges, targets).
+        in_adjacency: The incoming edges of the nodes of the base graph in CSR format (offsets, edges, sources).
+        weights_list: The costs of the edges of the base graph by which the least cost paths are searched.
+        min_weights: Lower bounds for the costs of the edges of the base graph (for all costs in weights_list).
+        orig_node: The id of the origin node.
+        dest_node: The id of the destination node.
+        overlay_out_edges: Additional outgoing edges by source node as lists of (edge id, target node).
+        overlay_in_edges: Additional incoming edges by target node as lists of (edge id, source node).
+        overlay_weights_list: The costs of the additional edges (by edge id) for each costs in weights_list.
+        overlay_min_weights: Lower bounds for the costs of the additional edges.
+        orig_bounds: Consistent lower bounds for the costs (by min_weights) from the origin to the nodes.
+        dest_bounds: Consistent lower bounds for the costs (by min_weights) from the nodes to the destination.
+        executor: An optional executor (e.g. ThreadPoolExecutor) in which the searches by the edge costs are run in 
+            parallel with find_least_cost_path_nogil.
+        stats: An optional dictionary to which the durations of the backward search and the searches by each of the 
+            edge costs are set (in ms) as backward_search_ms and search_ms.
+    Returns:
+        The least cost paths as sequences of edge ids (in the order of weights_list).
+    Raises:
+        PathNotFoundException if the destination cannot be reached from the origin.
+    """
+    start_time = time.perf_counter()
+    dists, stop_dist = get_dists_to_node(
+        *in_adjacency, min_weights, dest_node, orig_node, overlay_in_edges, overlay_min_weights, orig_bounds)
+    h_dists = DistsToNode(dists, stop_dist, orig_bounds, dest_bounds)
+    if (stats is not None): stats['backward_search_ms'] = (time.perf_counter() - start_time) * 1000
+    if (overlay_weights_list is None):
+        overlay_weights_list = [{}] * len(weights_list)
+
+    if (executor is None):
+        searches = [
+            __timed_search(find_least_cost_path, *out_adjacency, weights, orig_node, dest_node, overlay_out_edges, overlay_weights, h_dists)
+            for weights, overlay_weights in zip(weights_list, overlay_weights_list)
+        ]
+    else:
+        # the arrays are views of the same memory as the memoryviews (and shared by all searches)
+        out_arrays = [np.asarray(view) for view in out_adjacency]
+        vcount = max([len(out_adjacency[0]) - 1] + [node + 1 for node in overlay_out_edges] + [
+            target + 1 for out_edges in overlay_out_edges.values() for _, target in out_edges])
+        h_array = h_dists.get_all(vcount)
+        futures = [
+            executor.submit(
+                __timed_search, find_least_cost_path_nogil, *out_arrays, np.asarray(weights), 
+                *get_overlay_edge_arrays(overlay_out_edges, overlay_weights), h_array, orig_node, dest_node)
+            for weights, overlay_weights in zip(weights_list, overlay_weights_list)
+        ]
+        searches = [(path.tolist(), duration) for path, duration in (future.result() for future in futures)]
+        if (orig_node != dest_node and any(not path for path, _ in searches)):
+            raise PathNotFoundException(f'No path from {orig_node} to {dest_node}')
+
+    if (stats is not None): stats['search_ms'] = [duration for _, duration in searches]
+    return [path for path, _ in searches]
@@ -10,23 +10,18 @@ from typing import List, Set, Dict, Tuple
 import time
 from shapely.geometry import Point, LineString
 from app.graph_handler import GraphHandler
+from app.graph_overlay import GraphOverlay
 from app.logger import Logger
 from utils.igraphs import Edge as E, Node as N
 
-def __get_closest_point_on_line(line: LineString, point: Point) -> Point:
-    """Finds the closest point on a line to given point and returns it as Point.
-    """
-    projected = line.project(point)
-    closest_point = line.interpolate(projected)
-    return closest_point
-
-def get_nearest_node(log: Logger, G: GraphHandler, point: Point, link_edges: dict=None, long_distance: bool=False) -> Dict:
+def get_nearest_node(log: Logger, G: GraphHandler, overlay: GraphOverlay, point: Point, link_edges: dict=None, long_distance: bool=False) -> Dict:
     """Finds (or creates) the nearest node to a given point. 
     If the nearest node is further than the nearest edge to the point, a new node is created
     on the nearest edge on the nearest point on the edge.
 
     Args:
         G: A GraphHandler instance used in routing.
+        overlay: A GraphOverlay instance holding the new nodes & edges of the routing request.
         point: A location as shapely Point.
         edge_gdf: A GeoDataFrame containing edges of the graph (and line geometries).
         node_gdf: A GeoDataFrame containing nodes of the graph (and point geometries).
@@ -45,17 +40,17 @@ def get_nearest_node(log: Logger, G: GraphHandler, point: Point, link_edges: dic
         'nearest_edge_point' which is a Shapely Point object located on the nearest point on the nearest edge.
         (The last two objects are needed for creating the linking edges for newly created nodes)
     """
-    nearest_edge = G.find_nearest_edge(point)
+    nearest_edge = G.find_nearest_edge(point, overlay)
     if (nearest_edge is None):
         raise Exception('Nearest edge not found')
     nearest_node: int = G.find_nearest_node(point)
     start_time = time.time()
     nearest_node_geom = G.get_node_point_geom(nearest_node)
-    nearest_edge_point = __get_closest_point_on_line(nearest_edge[E.geometry.value], point)
+    nearest_edge_point = nearest_edge['nearest_point']
     nearest_node_vs_edge_dist = nearest_node_geom.distance(point) - nearest_edge['dist']
 
     # use the nearest node if it is on the nearest edge and at least almost as near as the nearest edge
-    # this can give a significant performance boost since adding (and deleting) linking edges to the graph is avoided 
+    # this can give a significant performance boost since creating linking edges is avoided 
     if (not link_edges): # check only if new node was not created for origin (no need to try to avoid creating new node for destination)
         acceptable_od_offset = 20 if not long_distance else 30
         if (nearest_node_vs_edge_dist < acceptable_od_offset and nearest_node in nearest_edge[E.uv.value]):
@@ -68,20 +63,64 @@ def get_nearest_node(log: Logger, G: GraphHandler, point: Point, link_edges: dic
             nearest_edge = link_edges['link1']
         if (nearest_edge_point.distance(link_edges['link2'][E.geometry.value]) < 0.2):
             nearest_edge = link_edges['link2']
-    # create a new node on the nearest edge to the graph
-    new_node = G.add_new_node_to_graph(nearest_edge_point)
-    # new edges from the new node to existing nodes need to be created to the graph
+    # create a new node on the nearest edge (to the overlay of the graph)
+    new_node = overlay.add_node(nearest_edge_point)
+    # new edges from the new node to existing nodes need to be created to the overlay
     # hence return the geometry of the nearest edge and the nearest point on the nearest edge
     links_to = { 'nearest_edge': nearest_edge, 'nearest_edge_point': nearest_edge_point }
     log.duration(start_time, 'got geoms for adding node & links', unit='ms')
     return { 'node': new_node, 'offset': round(nearest_edge_point.distance(point), 1), 'add_links': True, **links_to }
 
-def get_orig_dest_nodes_and_linking_edges(log: Logger, G: GraphHandler, orig_point: Point, dest_point: Point, aq_sens: List[float], noise_sens: List[float], db_costs: Dict[int,float]):
+def get_orig_node_and_linking_edges(log: Logger, G: GraphHandler, overlay: GraphOverlay, orig_point: Point, aq_sens: List[float], noise_sens: List[float], db_costs: Dict[int,float], long_distance: bool = False) -> Tuple[dict, dict]:
+    """Finds (or creates) the origin node and the new edges linking it to the graph (see get_orig_dest_nodes_and_linking_edges).
+    """
+    try:
+        orig_link_edges = None
+        orig_node = get_nearest_node(log, G, overlay, orig_point, long_distance=long_distance)
+        # add linking edges to overlay if new node was created on the nearest edge
+        if (orig_node and orig_node['add_links']):
+            orig_link_edges = G.create_linking_edges_for_new_node(
+                overlay, orig_node['node'], orig_node['nearest_edge_point'], orig_node['nearest_edge'], aq_sens, noise_sens, db_costs, True)
+        return orig_node, orig_link_edges
+    except Exception:
+        raise Exception('Could not find origin')
+
+def get_dest_node_and_linking_edges(log: Logger, G: GraphHandler, overlay: GraphOverlay, dest_point: Point, orig_link_edges: dict, aq_sens: List[float], noise_sens: List[float], db_costs: Dict[int,float], long_distance: bool = False) -> Tuple[dict, dict]:
+    """Finds (or creates) the destination node and the new edges linking it to the graph (see get_orig_dest_nodes_and_linking_edges).
+    The new destination node only has incoming edges, so the same overlay (and origin) can be shared by many destinations.
+    """
+    try:
+        dest_link_edges = None
+        dest_node = get_nearest_node(log, G, overlay, dest_point, link_edges=orig_link_edges, long_distance=long_distance)
+        # add linking edges to overlay if new node was created on the nearest edge
+        if (dest_node and dest_node['add_links']):
+            dest_link_edges = G.create_linking_edges_for_new_node(
+                overlay, dest_node['node'], dest_node['nearest_edge_point'], dest_node['nearest_edge'], aq_sens, noise_sens, db_costs, False)
+        return dest_node, dest_link_edges
+    except Exception:
+        raise Exception('Could not find destination')
+
+def get_snapped_node_key(node: dict, link_edges: dict, offset_quantum: float = 1.0) -> tuple:
+    """Returns a key that identifies the location of an origin or destination node on the graph (e.g. for caching
+    routing responses). A new node is identified by the edge on which it was created and its offset (m) along the edge, 
+    quantized to offset_quantum: nodes created within the same quantum of the same edge get the same key.
+    """
+    if (not node['add_links']):
+        return (node['node'],)
+    link_from_length = link_edges['link1'][E.length.value]
+    return (link_edges['node_from'], link_edges['node_to'], int(round(link_from_length / offset_quantum)))
+
+def is_long_distance(orig_point: Point, dest_point: Point) -> bool:
+    return orig_point.distance(dest_point) > 5000
+
+def get_orig_dest_nodes_and_linking_edges(log: Logger, G: GraphHandler, overlay: GraphOverlay, orig_point: Point, dest_point: Point, aq_sens: List[float], noise_sens: List[float], db_costs: Dict[int,float]):
     """Finds the nearest nodes to origin and destination as well as the newly created edges that connect 
-    the origin and destination nodes to the graph.
+    the origin and destination nodes to the graph. The new nodes and edges are added to the given overlay 
+    (the graph itself is not modified).
 
     Args:
         G: A GraphHandler instance used in routing.
+        overlay: A GraphOverlay instance holding the new nodes & edges of the routing request.
         orig_point: An origin location as shapely Point.
         dest_point: A destination location shapely Point.
         edge_gdf: A GeoDataFrame containing edges of the graph (and line geometries).
@@ -95,27 +134,9 @@ def get_orig_dest_nodes_and_linking_edges(log: Logger, G: GraphHandler, orig_poi
         dest_link_edges: The newly created edges (dict) that link the destination node to the graph.
         If some of these are not found, None is returned respectively.
     """
-    orig_link_edges = None
-    dest_link_edges = None
-    long_distance: bool = orig_point.distance(dest_point) > 5000
-
-    try:
-        orig_node = get_nearest_node(log, G, orig_point, long_distance=long_distance)
-        # add linking edges to graph if new node was created on the nearest edge
-        if (orig_node and orig_node['add_links']):
-            orig_link_edges = G.create_linking_edges_for_new_node(
-                orig_node['node'], orig_node['nearest_edge_point'], orig_node['nearest_edge'], aq_sens, noise_sens, db_costs, True)
-    except Exception:
-        raise Exception('Could not find origin')
-    try:
-        dest_node = get_nearest_node(log, G, dest_point, link_edges=orig_link_edges, long_distance=long_distance)
-        # add linking edges to graph if new node was created on the nearest edge
-        if (dest_node and dest_node['add_links']):
-            dest_link_edges = G.create_linking_edges_for_new_node(
-                dest_node['node'], dest_node['nearest_edge_point'], dest_node['nearest_edge'], aq_sens, noise_sens, db_costs, False)
-    except Exception:
-        raise Exception('Could not find destination')
-
-    G.load_new_edges_to_graph()
-
+    long_distance = is_long_distance(orig_point, dest_point)
+    orig_node, orig_link_edges = get_orig_node_and_linking_edges(
+        log, G, overlay, orig_point, aq_sens, noise_sens, db_costs, long_distance=long_distance)
+    dest_node, dest_link_edges = get_dest_node_and_linking_edges(
+        log, G, overlay, dest_point, orig_link_edges, aq_sens, noise_sens, db_costs, long_distance=long_distance)
     return orig_node, dest_node, orig_link_edges, dest_link_edges